@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк asyncio-фасада: данные одного экрана и потоковая выгрузка.
+
+screen — независимые чтения одного экрана: задача, проект, пользователь, счётчики
+         по статусам, прогресс проектов, загрузка пользователей, поиск
+  sync        — подряд синхронными контроллерами (цикл событий стоит всё это время)
+  await       — подряд через AsyncControllers
+  gather      — asyncio.gather через AsyncControllers (чтения идут в потоках исполнителя
+                параллельно: sqlite3 отпускает GIL на время выполнения запроса)
+stream — все задачи: sync iter_tasks в цикле событий против async for по фасаду
+
+lag ms — наибольшая задержка тика «пульса» цикла событий (каждую 1 мс) за замер.
+
+    python benchmarks/bench_async.py --rows 100000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from controllers.async_controllers import AsyncControllers
+from controllers.project_controller import ProjectController
+from controllers.task_controller import TaskController
+from controllers.user_controller import UserController
+from database.database_manager import DatabaseManager
+from models.project import Project
+from models.task import Task
+from models.user import User
+
+_STATUSES = ("pending", "in_progress", "completed")
+
+
+def _fill(db, rows):
+    base = datetime(2025, 1, 1)
+    users = db.add_users_many(User(f"u{i}", f"u{i}@a.b", "developer") for i in range(50))
+    projects = db.add_projects_many(
+        Project(f"p{i}", "", base, base + timedelta(days=90)) for i in range(20)
+    )
+    tasks = (
+        Task(f"task {i} report", f"description {i}", 1 + i % 3, base + timedelta(minutes=i),
+             projects[i % len(projects)], users[i % len(users)])
+        for i in range(rows)
+    )
+    db.add_tasks_many(tasks, chunk_size=5_000)
+    db.update_tasks_where({"priority": 3}, status="completed")
+
+
+def _screen_calls(tasks, projects, users):
+    calls = [
+        lambda: tasks.get_task(1),
+        lambda: projects.get_project(1),
+        lambda: users.get_user(1),
+        lambda: projects.get_all_project_progress(),
+        lambda: users.get_all_user_workloads(),
+        lambda: tasks.search_tasks("777", limit=20),
+    ]
+    calls += [lambda s=s: tasks.count_tasks(status=s) for s in _STATUSES]
+    return calls
+
+
+async def _heartbeat(lag, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lag[0] = max(lag[0], time.perf_counter() - started - 0.001)
+
+
+async def _timed(coro_fn, repeat):
+    lag, stop = [0.0], asyncio.Event()
+    beat = asyncio.create_task(_heartbeat(lag, stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await coro_fn()
+    seconds = (time.perf_counter() - started) / repeat
+    stop.set()
+    await beat
+    return seconds, lag[0]
+
+
+async def _screen_sync(calls):
+    for call in calls:
+        call()
+
+
+async def _screen_await(calls):
+    for call in calls:
+        await call()
+
+
+async def _screen_gather(calls):
+    await asyncio.gather(*(call() for call in calls))
+
+
+async def _stream_sync(tasks):
+    for _ in tasks.iter_tasks(batch_size=1000):
+        pass
+
+
+async def _stream_async(tasks):
+    async for _ in tasks.iter_tasks(batch_size=1000):
+        pass
+
+
+async def _bench(db, repeat, workers):
+    sync = (TaskController(db), ProjectController(db), UserController(db))
+    results = {}
+    async with AsyncControllers(db, max_workers=workers) as c:
+        sync_calls = _screen_calls(*sync)
+        async_calls = _screen_calls(c.tasks, c.projects, c.users)
+        await _screen_gather(async_calls)  # прогрев
+        results["screen sync"] = await _timed(partial(_screen_sync, sync_calls), repeat)
+        results["screen await"] = await _timed(partial(_screen_await, async_calls), repeat)
+        results["screen gather"] = await _timed(partial(_screen_gather, async_calls), repeat)
+        results["stream sync"] = await _timed(partial(_stream_sync, sync[0]), 1)
+        results["stream async"] = await _timed(partial(_stream_async, c.tasks), 1)
+    return results
+
+
+def run(rows, repeat, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        try:
+            db.migrate()
+            with db.profile("bulk_load"):
+                _fill(db, rows)
+            results = asyncio.run(_bench(db, repeat, workers))
+        finally:
+            db.close()
+
+    print(f"tasks: {rows}, executor threads: {workers}, screen repeats: {repeat}")
+    print(f"{'':>14} {'ms':>8} {'lag ms':>8}")
+    for label, (seconds, lag) in results.items():
+        print(f"{label:>14} {seconds * 1000:8.1f} {lag * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.workers)
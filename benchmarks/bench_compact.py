@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк компактной раскладки (даты — секунды эпохи, статусы/роли — коды)
+против текстовой: размер строк tasks на диске и время загрузки задач.
+
+scan s   — диапазон по due_date + статус целиком в SQLite (COUNT без индекса по дате)
+fetch s  — чтение всех строк курсором, без перевода значений
+models s — iter_tasks контроллера: строки -> словари -> Task
+Время — лучший из --repeat проходов: одиночный замер на 1 CPU гуляет на десятки процентов.
+
+models s у раскладок примерно равны — это известная цена: datetime из секунд эпохи
+в Python собирается дольше, чем разбирается ISO-строка (fromisoformat написан на C),
+и это съедает выигрыш от более коротких строк. Раскладка экономит место и ускоряет
+фильтры в SQL, но загрузку моделей заметно не ускоряет.
+
+    python benchmarks/bench_compact.py --rows 1000000 --repeat 3
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from controllers.task_controller import TaskController
+from database.database_manager import DatabaseManager
+from models.project import Project
+from models.task import Task
+from models.user import User
+
+_STATUSES = ("pending", "in_progress", "completed")
+
+
+def _tasks(rows, project_ids, user_ids):
+    base = datetime(2025, 1, 1)
+    for i in range(rows):
+        t = Task(f"task {i}", "", 1 + i % 3, base + timedelta(minutes=i),
+                 project_ids[i % len(project_ids)], user_ids[i % len(user_ids)])
+        t.status = _STATUSES[i % 3]
+        yield t
+
+
+def _build(path, rows, compact):
+    db = DatabaseManager(path, profile="bulk_load", compact=compact)
+    db.migrate()
+    user_ids = db.add_users_many(
+        User(f"u{i}", f"u{i}@example.com", "developer") for i in range(100)
+    )
+    project_ids = db.add_projects_many(
+        Project(f"p{i}", "", datetime(2025, 1, 1), datetime(2026, 1, 1)) for i in range(100)
+    )
+    started = time.perf_counter()
+    with db.profile("bulk_load"):
+        db.add_tasks_many(_tasks(rows, project_ids, user_ids), chunk_size=5_000)
+    insert_s = time.perf_counter() - started
+    db.conn.execute("VACUUM")
+    # bulk_load пишет в WAL: без checkpoint страницы VACUUM лежат в -wal, а не в файле базы
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return db, insert_s
+
+
+def _tasks_table_stats(db):
+    # payload — байты самих записей, pgsize — занятые страницы (таблица без индексов)
+    payload, pages = db.conn.execute(
+        "SELECT SUM(payload), SUM(pgsize) FROM dbstat WHERE name = 'tasks'"
+    ).fetchone()
+    return payload, pages
+
+
+def _scan(db):
+    # полный проход по таблице с условиями на дату и статус; в текстовой раскладке
+    # это сравнение строк, в компактной — целых
+    encode = db._codec.encode
+    lo = encode("tasks", "due_date", datetime(2025, 3, 1))
+    hi = encode("tasks", "due_date", datetime(2025, 9, 1))
+    done = encode("tasks", "status", "completed")
+    db.conn.execute(
+        "SELECT COUNT(*) FROM tasks NOT INDEXED "
+        "WHERE due_date >= ? AND due_date < ? AND status != ?",
+        (lo, hi, done),
+    ).fetchone()
+
+
+def _fetch(db):
+    for _ in db.conn.execute("SELECT * FROM tasks"):
+        pass
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows, repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for compact in (False, True):
+            label = "compact" if compact else "text"
+            db, insert_s = _build(os.path.join(tmp, f"{label}.db"), rows, compact)
+            try:
+                payload, pages = _tasks_table_stats(db)
+                ctrl = TaskController(db)
+                results[label] = {
+                    "insert_s": insert_s,
+                    "row_bytes": payload / rows,
+                    "table_mib": pages / 2 ** 20,
+                    "file_mib": os.path.getsize(os.path.join(tmp, f"{label}.db")) / 2 ** 20,
+                    "scan_s": _timed(lambda: _scan(db), repeat),
+                    "fetch_s": _timed(lambda: _fetch(db), repeat),
+                    "models_s": _timed(
+                        lambda: sum(1 for _ in ctrl.iter_tasks(batch_size=10_000)), repeat
+                    ),
+                }
+            finally:
+                db.close()
+
+    print(f"tasks: {rows}, best of {repeat}")
+    print(f"{'':>10} {'insert s':>9} {'row B':>7} {'tasks MiB':>10} {'file MiB':>9} "
+          f"{'scan s':>7} {'fetch s':>8} {'models s':>9}")
+    for label, r in results.items():
+        print(f"{label:>10} {r['insert_s']:9.2f} {r['row_bytes']:7.1f} {r['table_mib']:10.1f} "
+              f"{r['file_mib']:9.1f} {r['scan_s']:7.3f} {r['fetch_s']:8.2f} {r['models_s']:9.2f}")
+    text, compact = results["text"], results["compact"]
+    for key in ("row_bytes", "table_mib", "scan_s", "fetch_s", "models_s"):
+        print(f"{key}: {100 * (compact[key] / text[key] - 1):+.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
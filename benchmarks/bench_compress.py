@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сжатых описаний: одна и та же база до и после compress_descriptions.
+
+file MiB  — размер файла после VACUUM
+scan s    — COUNT(*) по дате и статусу полным проходом tasks (описания не нужны)
+full s    — get_all_tasks(): все строки с описаниями (для сжатых — с распаковкой)
+list s    — get_all_tasks(columns=...) без описаний, как в TaskView
+search s  — 200 запросов search_tasks по FTS (limit 20)
+
+    python benchmarks/bench_compress.py --rows 100000 --desc-bytes 4096
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database.database_manager import DatabaseManager
+from models.task import Task
+
+_COLUMNS = ("id", "title", "priority", "status", "due_date", "project_id", "assignee_id")
+# словарь описаний: текст похож на живой (повторяющаяся лексика), а не на один повтор строки
+_WORDS = [f"w{i}" for i in range(2000)] + ["ошибка", "отчёт", "клиент", "релиз", "тест"] * 40
+
+
+def _tasks(rows, desc_bytes):
+    rnd = random.Random(1)
+    base = datetime(2025, 1, 1)
+    for i in range(rows):
+        words = []
+        size = 0
+        while size < desc_bytes:
+            w = rnd.choice(_WORDS)
+            words.append(w)
+            size += len(w.encode("utf-8")) + 1
+        yield Task(f"task {i}", " ".join(words), 1 + i % 3, base + timedelta(minutes=i), None, None)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _scan(db):
+    db.conn.execute(
+        "SELECT COUNT(*) FROM tasks NOT INDEXED WHERE due_date >= ? AND status != ?",
+        ("2025-02-01", "completed"),
+    ).fetchone()
+
+
+def _search(db):
+    # четырёхзначные слова: префиксный поиск не захватывает соседние токены
+    for i in range(200):
+        db.search_tasks(f"w{1000 + i}", limit=20)
+
+
+def _measure(path):
+    db = DatabaseManager(path)
+    try:
+        db.get_all_tasks()  # прогрев страничного кеша
+        return {
+            "file_mib": os.path.getsize(path) / 2 ** 20,
+            "scan_s": _timed(lambda: _scan(db)),
+            "full_s": _timed(db.get_all_tasks),
+            "list_s": _timed(lambda: db.get_all_tasks(columns=_COLUMNS)),
+            "search_s": _timed(lambda: _search(db)),
+        }
+    finally:
+        db.close()
+
+
+def run(rows, desc_bytes, threshold):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, "plain.db")
+        db = DatabaseManager(plain, profile="bulk_load")
+        db.migrate()
+        db.add_tasks_many(_tasks(rows, desc_bytes), chunk_size=5_000)
+        db.conn.execute("VACUUM")
+        db.close()
+        packed = os.path.join(tmp, "compressed.db")
+        shutil.copy(plain, packed)
+
+        results["plain"] = _measure(plain)
+        db = DatabaseManager(packed)
+        started = time.perf_counter()
+        report = db.compress_descriptions(threshold=threshold, vacuum=True)
+        convert_s = time.perf_counter() - started
+        db.close()
+        results["compressed"] = _measure(packed)
+
+    print(f"tasks: {rows}, description: {desc_bytes} B, threshold: {threshold} B")
+    print(f"compress_descriptions: {convert_s:.1f} s, {report['tasks']} rows, "
+          f"{report['text_bytes'] / 2 ** 20:.1f} -> {report['blob_bytes'] / 2 ** 20:.1f} MiB, "
+          f"decode {report['decode_us']:.1f} us/row")
+    print(f"{'':>11} {'file MiB':>9} {'scan s':>7} {'full s':>7} {'list s':>7} {'search s':>9}")
+    for label, r in results.items():
+        print(f"{label:>11} {r['file_mib']:9.1f} {r['scan_s']:7.3f} {r['full_s']:7.2f} "
+              f"{r['list_s']:7.2f} {r['search_s']:9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--desc-bytes", type=int, default=4096)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+    run(args.rows, args.desc_bytes, args.threshold)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк очереди записи с групповым коммитом против коммита на каждый вызов.
+
+--threads потоков вызывают add_task/update_task вперемешку, каждый --ops раз.
+direct — каждый вызов пишет и коммитит сам (потоки по очереди берут блокировку писателя);
+group  — DatabaseManager(group_commit=--batch): пишущий поток фиксирует группами.
+Для профиля durable (synchronous=FULL) каждый COMMIT — fsync, для balanced — нет.
+
+ops/s — вызовов записи в секунду всеми потоками; p50/p99 ms — задержка вызова
+(до COMMIT своей группы); group — средний размер группы.
+
+    python benchmarks/bench_group_commit.py --threads 8 --ops 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database.database_manager import DatabaseManager
+from models.task import Task
+
+
+def _worker(db, seed, ops):
+    rnd = random.Random(seed)
+    due = datetime(2025, 1, 1)
+    latencies = []
+    ids = []
+    for i in range(ops):
+        started = time.perf_counter()
+        if ids and rnd.random() < 0.5:
+            db.update_task(rnd.choice(ids), priority=rnd.randint(1, 3))
+        else:
+            ids.append(db.add_task(Task(f"t{seed}-{i}", "", 1, due + timedelta(minutes=i),
+                                        None, None)))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _measure(path, profile, threads, ops, batch):
+    db = DatabaseManager(path, profile=profile, group_commit=batch)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            parts = list(pool.map(lambda seed: _worker(db, seed, ops), range(threads)))
+        seconds = time.perf_counter() - started
+        stats = db.write_queue_stats()
+    finally:
+        db.close()
+    latencies = sorted(x for part in parts for x in part)
+    n = len(latencies)
+    return {
+        "ops_s": n / seconds,
+        "p50_ms": latencies[n // 2] * 1000,
+        "p99_ms": latencies[int(n * 0.99)] * 1000,
+        "group": stats["avg_group"] if stats else 1.0,
+    }
+
+
+def run(threads, ops, batch):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ("durable", "balanced"):
+            for label, size in (("direct", 0), ("group", batch)):
+                path = os.path.join(tmp, f"{profile}-{label}.db")
+                DatabaseManager(path).migrate()
+                rows.append((profile, label, _measure(path, profile, threads, ops, size)))
+
+    print(f"threads: {threads}, calls per thread: {ops}, group_commit: {batch}")
+    print(f"{'':>17} {'ops/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'group':>6}")
+    for profile, label, r in rows:
+        print(f"{profile:>9} {label:>7} {r['ops_s']:8.0f} {r['p50_ms']:7.3f} {r['p99_ms']:7.2f} "
+              f"{r['group']:6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    run(args.threads, args.ops, args.batch)
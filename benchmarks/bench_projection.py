@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проекции колонок: список задач целиком (SELECT *) против колонок таблицы
+TaskView (без description) на задачах с длинными описаниями.
+
+full      — get_all_tasks(): все колонки, Task с описаниями
+projected — get_all_tasks(columns=...): description не читается
+lazy 500  — projected + обращение к description первых 500 задач (один догрузочный запрос)
+
+    python benchmarks/bench_projection.py --rows 100000 --desc-bytes 4096
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from controllers.task_controller import TaskController
+from database.database_manager import DatabaseManager
+from models.task import Task
+
+# колонки таблицы в views/task_view.py
+_COLUMNS = ("id", "title", "priority", "status", "due_date", "project_id", "assignee_id")
+
+
+def _tasks(rows, desc_bytes):
+    base = datetime(2025, 1, 1)
+    words = ("lorem ipsum dolor sit amet " * (desc_bytes // 27 + 1))[:desc_bytes]
+    for i in range(rows):
+        yield Task(f"task {i}", words, 1 + i % 3, base + timedelta(minutes=i), None, None)
+
+
+def _measure(fn):
+    # время — отдельным прогоном: под tracemalloc оно искажается в разы
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def _lazy(ctrl):
+    tasks = ctrl.get_all_tasks(columns=_COLUMNS)
+    return sum(len(t.description) for t in tasks[:500]), tasks
+
+
+def run(rows, desc_bytes):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), profile="bulk_load")
+        try:
+            db.migrate()
+            db.add_tasks_many(_tasks(rows, desc_bytes), chunk_size=5_000)
+            db.use_profile("balanced")
+            ctrl = TaskController(db)
+            # прогрев страничного кеша, чтобы первый замер не платил за диск
+            db.get_all_tasks()
+            results.append(("full", *_measure(ctrl.get_all_tasks)))
+            results.append(("projected", *_measure(lambda: ctrl.get_all_tasks(columns=_COLUMNS))))
+            results.append(("lazy 500", *_measure(lambda: _lazy(ctrl))))
+        finally:
+            db.close()
+
+    print(f"tasks: {rows}, description: {desc_bytes} B")
+    print(f"{'':>10} {'s':>7} {'peak MiB':>9}")
+    for label, seconds, peak in results:
+        print(f"{label:>10} {seconds:7.3f} {peak / 2 ** 20:9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--desc-bytes", type=int, default=4096)
+    args = parser.parse_args()
+    run(args.rows, args.desc_bytes)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк массовых переназначений и удаления пользователей на большом tasks.
+
+reassign      — reassign_tasks: все задачи одного пользователя другому, один UPDATE
+move          — move_tasks: все задачи одного проекта в другой, один UPDATE
+move loop     — то же построчно: update_task на каждую задачу в одной транзакции
+delete 1x1    — delete_user по одному (каскад ON DELETE SET NULL по индексу assignee_id)
+delete noidx  — то же без индекса assignee_id: каждый каскад сканирует tasks целиком
+delete many   — delete_users_many(..., reassign_to=...) одной транзакцией
+
+    python benchmarks/bench_reassign.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database.database_manager import DatabaseManager
+from models.project import Project
+from models.task import Task
+from models.user import User
+
+_USERS = 1000
+_PROJECTS = 100
+# сколько пользователей удаляем в каждом из сценариев delete
+_DELETES = 20
+
+
+def _tasks(rows, project_ids, user_ids):
+    base = datetime(2025, 1, 1)
+    for i in range(rows):
+        yield Task(f"task {i}", "", 1 + i % 3, base + timedelta(minutes=i),
+                   project_ids[i % len(project_ids)], user_ids[i % len(user_ids)])
+
+
+def _build(path, rows):
+    db = DatabaseManager(path, profile="bulk_load")
+    db.migrate()
+    user_ids = db.add_users_many(
+        User(f"u{i}", f"u{i}@example.com", "developer") for i in range(_USERS)
+    )
+    project_ids = db.add_projects_many(
+        Project(f"p{i}", "", datetime(2025, 1, 1), datetime(2026, 1, 1)) for i in range(_PROJECTS)
+    )
+    db.add_tasks_many(_tasks(rows, project_ids, user_ids), chunk_size=5_000)
+    db.use_profile("balanced")
+    return db, user_ids, project_ids
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def _move_loop(db, from_project, to_project):
+    ids = [r["id"] for r in db.find_tasks(project_id=from_project)]
+    with db.transaction():
+        for task_id in ids:
+            db.update_task(task_id, project_id=to_project)
+    return len(ids)
+
+
+def _delete_one_by_one(db, user_ids):
+    return sum(db.delete_user(u) for u in user_ids)
+
+
+def run(rows):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db, users, projects = _build(os.path.join(tmp, "bench.db"), rows)
+        try:
+            results.append(("reassign", *_timed(lambda: db.reassign_tasks(users[0], users[1]))))
+            results.append(("move", *_timed(lambda: db.move_tasks(projects[0], projects[1]))))
+            results.append(("move loop", *_timed(lambda: _move_loop(db, projects[2], projects[3]))))
+            batch = iter(users[10:10 + 3 * _DELETES])
+            take = lambda: [next(batch) for _ in range(_DELETES)]  # noqa: E731
+            one_by_one = take()
+            results.append(("delete 1x1", *_timed(lambda: _delete_one_by_one(db, one_by_one))))
+            db.conn.execute("DROP INDEX idx_tasks_assignee_id")
+            no_index = take()
+            results.append(("delete noidx", *_timed(lambda: _delete_one_by_one(db, no_index))))
+            db.conn.execute("CREATE INDEX idx_tasks_assignee_id ON tasks(assignee_id)")
+            many = take()
+            results.append((
+                "delete many",
+                *_timed(lambda: db.delete_users_many(many, reassign_to=users[-1])),
+            ))
+            assert db.verify_task_counters() == []
+        finally:
+            db.close()
+
+    print(f"tasks: {rows}, users: {_USERS}, projects: {_PROJECTS}")
+    print(f"{'':>13} {'ms':>9} {'rows':>8}")
+    for label, seconds, count in results:
+        print(f"{label:>13} {seconds * 1000:9.1f} {count:8d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    run(parser.parse_args().rows)
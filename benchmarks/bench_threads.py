@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк чтения из пула потоков, пока другой поток пишет транзакциями.
+
+Писатель в цикле обновляет по --tx-rows задач одной транзакцией и держит её ещё
+--hold-ms (ввод-вывод приложения до COMMIT); --readers потоков читают get_task_by_id
+и страницы page_tasks. Работа внутри транзакции на Python делит GIL с читателями,
+поэтому выигрыш виден на времени, когда писатель ждёт, а не считает.
+
+readers   — чтение через соединения-читатели потоков (WAL-снимки, писателя не ждут)
+shared    — все потоки читают через одно соединение писателя и ждут его COMMIT
+            (так вёл себя менеджер до пула)
+
+reads/s — чтений за секунду всеми потоками; p50/p99 ms — задержка одного чтения;
+tx/s — транзакций писателя за секунду.
+
+    python benchmarks/bench_threads.py --rows 50000 --readers 4 --hold-ms 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database.database_manager import DatabaseManager
+from models.task import Task
+
+
+def _tasks(rows):
+    base = datetime(2025, 1, 1)
+    for i in range(rows):
+        yield Task(f"task {i}", "", 1 + i % 3, base + timedelta(minutes=i), None, None)
+
+
+def _writer(db, rows, tx_rows, hold, stop):
+    rnd = random.Random(0)
+    done = 0
+    while not stop.is_set():
+        with db.transaction():
+            for _ in range(tx_rows):
+                db.update_task(rnd.randint(1, rows), priority=rnd.randint(1, 3))
+            time.sleep(hold)
+        done += 1
+    return done
+
+
+def _reader(db, rows, seed, stop):
+    rnd = random.Random(seed)
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        if rnd.random() < 0.8:
+            db.get_task_by_id(rnd.randint(1, rows))
+        else:
+            db.page_tasks(after_id=rnd.randint(0, rows - 50), limit=50)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _measure(db, rows, readers, tx_rows, hold, seconds):
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=readers + 1) as pool:
+        writer = pool.submit(_writer, db, rows, tx_rows, hold, stop)
+        reads = [pool.submit(_reader, db, rows, i, stop) for i in range(readers)]
+        time.sleep(seconds)
+        stop.set()
+        latencies = sorted(x for f in reads for x in f.result())
+        commits = writer.result()
+    n = len(latencies)
+    return {
+        "reads_s": n / seconds,
+        "p50_ms": latencies[n // 2] * 1000,
+        "p99_ms": latencies[int(n * 0.99)] * 1000,
+        "tx_s": commits / seconds,
+    }
+
+
+def run(rows, readers, tx_rows, hold_ms, seconds):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = DatabaseManager(path, profile="bulk_load")
+        db.migrate()
+        db.add_tasks_many(_tasks(rows), chunk_size=5_000)
+        db.close()
+        for label in ("readers", "shared"):
+            db = DatabaseManager(path)
+            try:
+                if label == "shared":
+                    # как у базы в памяти: чтения ждут блокировку писателя
+                    db._in_memory = True
+                results[label] = _measure(db, rows, readers, tx_rows, hold_ms / 1000, seconds)
+            finally:
+                db.close()
+
+    print(f"tasks: {rows}, reader threads: {readers}, write tx: {tx_rows} rows + {hold_ms} ms, "
+          f"{seconds} s")
+    print(f"{'':>8} {'reads/s':>9} {'p50 ms':>7} {'p99 ms':>8} {'tx/s':>6}")
+    for label, r in results.items():
+        print(f"{label:>8} {r['reads_s']:9.0f} {r['p50_ms']:7.3f} {r['p99_ms']:8.2f} "
+              f"{r['tx_s']:6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--tx-rows", type=int, default=200)
+    parser.add_argument("--hold-ms", type=float, default=20.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    run(args.rows, args.readers, args.tx_rows, args.hold_ms, args.seconds)
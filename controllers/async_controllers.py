@@ -0,0 +1,161 @@
+"""
+asyncio-фасад над контроллерами и DatabaseManager.
+
+Каждый публичный метод синхронного объекта становится корутиной: вызов уходит
+в отдельный ThreadPoolExecutor, цикл событий не блокируется. Потоки исполнителя
+читают каждый через своё соединение-читатель DatabaseManager (WAL-снимки), поэтому
+независимые чтения идут параллельно:
+
+    async with AsyncControllers(db) as c:
+        task, project, user = await asyncio.gather(
+            c.tasks.get_task(1), c.projects.get_project(2), c.users.get_user(3)
+        )
+        async for t in c.tasks.iter_tasks(batch_size=500):
+            ...
+
+iter_* возвращают асинхронные итераторы: страницы выбираются в исполнителе
+по batch_size строк, наружу строки отдаются по одной.
+Контекстные менеджеры (transaction(), profile()) фасад не оборачивает: вход и выход
+попали бы в разные потоки исполнителя, а писатель помнит транзакцию за потоком.
+Такие блоки пишут в одной синхронной функции: await adb.run(fn), где fn
+открывает with adb.sync.transaction().
+Отложенные поля (columns=...) догружаются при обращении синхронно — в цикле
+событий их стоит догрузить заранее: await c.tasks.load_deferred(tasks).
+"""
+
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, update_wrapper
+from itertools import islice
+
+from controllers.project_controller import ProjectController
+from controllers.task_controller import TaskController
+from controllers.user_controller import UserController
+
+# потоков в исполнителе по умолчанию
+_MAX_WORKERS = 4
+# сколько строк iter_* выбирается за один переход в исполнитель, если batch_size не задан
+_STREAM_CHUNK = 500
+
+
+def _take(it, n):
+    return list(islice(it, n))
+
+
+def _is_context_manager(fn):
+    # @contextmanager оставляет исходную функцию-генератор в __wrapped__
+    return inspect.isgeneratorfunction(getattr(fn, "__wrapped__", None))
+
+
+class AsyncFacade:
+    """
+    Асинхронная обёртка над синхронным объектом target.
+    executor — общий исполнитель (не закрывается фасадом); None — свой на max_workers потоков.
+    """
+
+    def __init__(self, target, executor=None, max_workers=_MAX_WORKERS):
+        self.sync = target
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db-async"
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        """Выполнить fn(*args, **kwargs) в исполнителе фасада."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def stream(self, fn, *args, **kwargs):
+        """async for по синхронному итератору fn(...): пачками в исполнителе."""
+        chunk = kwargs.get("batch_size") or _STREAM_CHUNK
+        it = await self.run(fn, *args, **kwargs)
+        while True:
+            rows = await self.run(_take, it, chunk)
+            for row in rows:
+                yield row
+            if len(rows) < chunk:
+                return
+
+    def __getattr__(self, name):
+        if name == "sync":
+            raise AttributeError(name)
+        attr = getattr(self.sync, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        call = self._wrap(name, attr)
+        update_wrapper(call, attr)
+        # следующие обращения находят обёртку сразу, без __getattr__
+        self.__dict__[name] = call
+        return call
+
+    def _wrap(self, name, attr):
+        if name.startswith("iter_"):
+            def call(*args, **kwargs):
+                return self.stream(attr, *args, **kwargs)
+        elif _is_context_manager(attr):
+            def call(*args, **kwargs):
+                raise TypeError(
+                    f"{name}() is a context manager and cannot run on the executor; "
+                    f"use it inside a function passed to run(): with facade.sync.{name}(...)"
+                )
+        else:
+            async def call(*args, **kwargs):
+                return await self.run(attr, *args, **kwargs)
+        return call
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def aclose(self):
+        # shutdown ждёт потоки — не в цикле событий
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class AsyncDatabaseManager(AsyncFacade):
+    """Методы DatabaseManager как корутины: строки-словари, как у синхронного API."""
+
+
+class AsyncTaskController(AsyncFacade):
+    def __init__(self, db_manager, executor=None, max_workers=_MAX_WORKERS):
+        super().__init__(TaskController(db_manager), executor, max_workers)
+
+
+class AsyncProjectController(AsyncFacade):
+    def __init__(self, db_manager, executor=None, max_workers=_MAX_WORKERS):
+        super().__init__(ProjectController(db_manager), executor, max_workers)
+
+
+class AsyncUserController(AsyncFacade):
+    def __init__(self, db_manager, executor=None, max_workers=_MAX_WORKERS):
+        super().__init__(UserController(db_manager), executor, max_workers)
+
+
+class AsyncControllers:
+    """Три асинхронных контроллера одной базы на общем исполнителе (для gather по экрану)."""
+
+    def __init__(self, db_manager, max_workers=_MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-async")
+        self.tasks = AsyncTaskController(db_manager, self.executor)
+        self.projects = AsyncProjectController(db_manager, self.executor)
+        self.users = AsyncUserController(db_manager, self.executor)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def aclose(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
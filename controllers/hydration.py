@@ -0,0 +1,144 @@
+"""
+Строки DatabaseManager -> модели. Единый путь чтения для всех контроллеров.
+
+Строки уже прошли валидацию при записи, поэтому модели собираются через
+from_row, без повторных проверок конструкторов. None (строка не найдена)
+проходит насквозь. С identity (IdentityMap) одна строка — один экземпляр.
+
+Строки задач могут быть неполными (проекция колонок): недостающие поля
+догружает DeferredLoader — одним запросом сразу на окно объектов пачки.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+from models.project import Project
+from models.task import Task
+from models.user import User
+
+# сколько объектов пачки догружается одним запросом
+_DEFERRED_WINDOW = 500
+
+
+class DeferredLoader:
+    """
+    Отложенные колонки для объектов одной выборки.
+    fetch(ids) -> {id: {колонка: значение}} читает только недостающие колонки.
+    Обращение к такому полю у любого объекта загружает его и следующие
+    ещё не загруженные объекты пачки (до window штук) одним запросом.
+    Очередь пачки общая для потоков и правится под блокировкой; запрос идёт без неё.
+    """
+
+    def __init__(self, fetch, objs, window=None):
+        self._fetch = fetch
+        self._window = window or _DEFERRED_WINDOW
+        self._pending = OrderedDict((obj.id, weakref.ref(obj)) for obj in objs)
+        self._lock = threading.Lock()
+        for obj in objs:
+            obj._deferred = self
+
+    def load(self, obj=None):
+        """Догрузить obj и следующие ожидающие объекты пачки."""
+        batch = []
+        with self._lock:
+            if obj is not None:
+                self._pending.pop(obj.id, None)
+                batch.append(obj)
+            while len(batch) < self._window and self._pending:
+                pending = self._pending.popitem(last=False)[1]()
+                if pending is not None:
+                    batch.append(pending)
+        self.load_now(batch)
+
+    def load_now(self, objs):
+        # объект могли перезагрузить полной строкой или другой проекцией — его не трогаем
+        objs = [o for o in objs if o._deferred is self]
+        if not objs:
+            return
+        with self._lock:
+            for o in objs:
+                self._pending.pop(o.id, None)
+        rows = self._fetch([o.id for o in objs])
+        for o in objs:
+            row = rows.get(o.id)
+            if row is not None:
+                o.load_deferred(row)
+            else:
+                # строку успели удалить: поля останутся незаполненными
+                o._deferred = None
+
+
+def load_deferred(objs):
+    """Догрузить отложенные колонки сразу у всех objs: по одному запросу на выборку."""
+    groups = {}
+    for obj in objs:
+        loader = obj._deferred
+        if loader is not None:
+            groups.setdefault(loader, []).append(obj)
+    for loader, group in groups.items():
+        loader.load_now(group)
+
+
+def _one(cls, row, identity):
+    if identity is not None:
+        return identity.load(cls, row)
+    return None if row is None else cls.from_row(row)
+
+
+def _many(cls, rows, identity):
+    if identity is not None:
+        return identity.load_many(cls, rows)
+    from_row = cls.from_row
+    return [from_row(r) for r in rows]
+
+
+def _iter(cls, rows, identity):
+    if identity is not None:
+        load = identity.load
+        for r in rows:
+            yield load(cls, r)
+    else:
+        from_row = cls.from_row
+        for r in rows:
+            yield from_row(r)
+
+
+def to_task(row, identity=None):
+    return _one(Task, row, identity)
+
+
+def to_tasks(rows, identity=None, fetch_deferred=None):
+    """fetch_deferred — догрузка колонок, не выбранных проекцией (см. DeferredLoader)."""
+    tasks = _many(Task, rows, identity)
+    if fetch_deferred is not None and tasks:
+        DeferredLoader(fetch_deferred, tasks)
+    return tasks
+
+
+def iter_to_tasks(rows, identity=None):
+    return _iter(Task, rows, identity)
+
+
+def to_project(row, identity=None):
+    return _one(Project, row, identity)
+
+
+def to_projects(rows, identity=None):
+    return _many(Project, rows, identity)
+
+
+def iter_to_projects(rows, identity=None):
+    return _iter(Project, rows, identity)
+
+
+def to_user(row, identity=None):
+    return _one(User, row, identity)
+
+
+def to_users(rows, identity=None):
+    return _many(User, rows, identity)
+
+
+def iter_to_users(rows, identity=None):
+    return _iter(User, rows, identity)
@@ -0,0 +1,194 @@
+import threading
+import weakref
+
+from models.project import Project
+from models.task import Task
+from models.user import User
+
+# меньше этого размера мёртвые ссылки не вычищаем
+_MIN_PRUNE_SIZE = 1024
+
+# чем перечитать строку загруженного экземпляра после отката транзакции
+_GETTERS = {Task: "get_task_by_id", Project: "get_project_by_id", User: "get_user_by_id"}
+
+
+class IdentityMap:
+    """
+    Один живой экземпляр модели на (класс, id) в пределах одной базы.
+    Ссылки слабые: объект живёт, пока его держит кто-то кроме карты.
+
+    WeakValueDictionary не используется: его KeyedRef с колбэком создаётся
+    на Python-уровне и втрое замедляет загрузку списков. Здесь обычные
+    weakref.ref, а мёртвые записи вычищаются, когда карта вырастает вдвое.
+
+    Контроллеры одной базы могут работать из разных потоков: загрузка и правка
+    карты идут под блокировкой, чтобы два потока не создали два экземпляра одной строки.
+
+    С db_manager карта помнит экземпляры, загруженные или правленные внутри
+    transaction(): после отката они перечитываются из базы (или уходят из карты,
+    если строки больше нет), чтобы не показывать незафиксированные значения.
+    """
+
+    def __init__(self, db_manager=None):
+        self._refs = {}  # класс -> {id: weakref.ref}
+        self._prune_at = {}
+        self._lock = threading.Lock()
+        # слабая ссылка: менеджер держит карту через свой hook, не наоборот
+        self._db = weakref.ref(db_manager) if db_manager is not None else None
+        self._touched = set()  # (класс, id), тронутые в открытой транзакции
+        if db_manager is not None:
+            db_manager.add_transaction_hook(self._transaction_ended)
+
+    def __len__(self):
+        with self._lock:
+            refs = [ref for refs in self._refs.values() for ref in refs.values()]
+        return sum(1 for ref in refs if ref() is not None)
+
+    def get(self, cls, obj_id):
+        with self._lock:
+            ref = self._refs.get(cls, {}).get(obj_id)
+        return ref() if ref is not None else None
+
+    def load(self, cls, row):
+        """
+        Экземпляр для строки БД. Уже загруженный обновляется на месте,
+        поэтому все ссылки на него видят свежие значения.
+        """
+        if row is None:
+            return None
+        in_tx = self._in_transaction()
+        with self._lock:
+            refs = self._refs.get(cls)
+            if refs is None:
+                refs = self._refs[cls] = {}
+                self._prune_at[cls] = _MIN_PRUNE_SIZE
+            obj_id = row["id"]
+            ref = refs.get(obj_id)
+            obj = ref() if ref is not None else None
+            if obj is None:
+                obj = cls.from_row(row)
+                refs[obj_id] = weakref.ref(obj)
+                if len(refs) > self._prune_at[cls]:
+                    self._prune(cls)
+            else:
+                obj.load_row(row)
+            if in_tx:
+                self._touched.add((cls, obj_id))
+            return obj
+
+    def load_many(self, cls, rows):
+        """load для списка строк; тот же цикл без вызова метода на каждую строку."""
+        in_tx = self._in_transaction()
+        with self._lock:
+            refs = self._refs.get(cls)
+            if refs is None:
+                refs = self._refs[cls] = {}
+                self._prune_at[cls] = _MIN_PRUNE_SIZE
+            from_row, ref_type = cls.from_row, weakref.ref
+            res = []
+            for row in rows:
+                obj_id = row["id"]
+                ref = refs.get(obj_id)
+                obj = ref() if ref is not None else None
+                if obj is None:
+                    obj = from_row(row)
+                    refs[obj_id] = ref_type(obj)
+                else:
+                    obj.load_row(row)
+                res.append(obj)
+            if len(refs) > self._prune_at[cls]:
+                self._prune(cls)
+            if in_tx:
+                self._touched.update((cls, obj.id) for obj in res)
+            return res
+
+    def _prune(self, cls):
+        refs = self._refs[cls]
+        for obj_id in [i for i, ref in refs.items() if ref() is None]:
+            del refs[obj_id]
+        self._prune_at[cls] = max(_MIN_PRUNE_SIZE, 2 * len(refs))
+
+    def evict(self, cls, obj_id):
+        with self._lock:
+            self._refs.get(cls, {}).pop(obj_id, None)
+
+    def instances(self, cls):
+        with self._lock:
+            refs = list(self._refs.get(cls, {}).values())
+        return [obj for obj in (ref() for ref in refs) if obj is not None]
+
+    def null_references(self, cls, field, obj_id):
+        # повторяет ON DELETE SET NULL для уже загруженных объектов
+        self.replace_references(cls, field, (obj_id,), None)
+
+    def replace_references(self, cls, field, old_ids, new_id):
+        """field in old_ids -> new_id у загруженных экземпляров cls (переназначения, каскады)."""
+        old_ids = set(old_ids)
+        # без блокировки карты: getattr может догружать отложенные поля из базы
+        changed = [obj for obj in self.instances(cls) if getattr(obj, field) in old_ids]
+        for obj in changed:
+            setattr(obj, field, new_id)
+        self._touch(cls, [obj.id for obj in changed])
+
+    def assign(self, cls, ids, field, value):
+        """field = value у загруженных экземпляров cls с этими id (после массового UPDATE)."""
+        changed = []
+        for obj_id in ids:
+            obj = self.get(cls, obj_id)
+            if obj is not None:
+                setattr(obj, field, value)
+                changed.append(obj_id)
+        self._touch(cls, changed)
+
+    # ---------- транзакции ----------
+    def _in_transaction(self):
+        db = self._db() if self._db is not None else None
+        return db is not None and db.in_transaction
+
+    def _touch(self, cls, ids):
+        if ids and self._in_transaction():
+            with self._lock:
+                self._touched.update((cls, obj_id) for obj_id in ids)
+
+    def _transaction_ended(self, committed):
+        db = self._db()
+        with self._lock:
+            touched = list(self._touched)
+            # после отката вложенного блока внешняя транзакция ещё может откатиться
+            if db is None or not db.in_transaction:
+                self._touched.clear()
+        if not committed and db is not None:
+            self._refresh(db, touched)
+
+    def _refresh(self, db, touched):
+        for cls, obj_id in touched:
+            obj = self.get(cls, obj_id)
+            if obj is None:
+                continue
+            try:
+                row = getattr(db, _GETTERS[cls])(obj_id)
+            except Exception:
+                # перечитать не вышло — экземпляр просто забываем, откат важнее
+                row = None
+            if row is None:
+                self.evict(cls, obj_id)
+            else:
+                obj.load_row(row)
+
+    def clear(self):
+        with self._lock:
+            self._refs.clear()
+            self._prune_at.clear()
+
+
+_MAPS = weakref.WeakKeyDictionary()
+_MAPS_LOCK = threading.Lock()
+
+
+def identity_map_for(db_manager):
+    """Общая карта для всех контроллеров, работающих с одним DatabaseManager."""
+    with _MAPS_LOCK:
+        imap = _MAPS.get(db_manager)
+        if imap is None:
+            imap = _MAPS[db_manager] = IdentityMap(db_manager)
+    return imap
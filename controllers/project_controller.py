@@ -1,5 +1,9 @@
+from collections.abc import Mapping
 from datetime import datetime
-from models.project import Project
+from controllers.hydration import iter_to_projects, to_project, to_projects
+from controllers.identity_map import identity_map_for
+from models.project import Project, time_progress
+from models.task import Task
 
 
 def _coerce_id(v):
@@ -17,62 +21,94 @@ def _ensure_dt(v):
     return v if isinstance(v, datetime) else datetime.fromisoformat(v)
 
 
+def _progress(counts, now=None):
+    # есть задачи — доля завершённых, иначе временной прогресс как в Project.get_progress
+    if counts["total"]:
+        return float(counts["completed"] * 100.0 / counts["total"])
+    start, end = _ensure_dt(counts["start_date"]), _ensure_dt(counts["end_date"])
+    return float(time_progress(start, end, now))
+
+
 class ProjectController:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.identity = identity_map_for(db_manager)
 
     def add_project(self, name, description, start_date, end_date):
         p = Project(name, description, start_date, end_date)
         p.id = self.db.add_project(p)
         return _IntId(p.id)  # int-like с .id
 
+    def add_projects_many(self, items):
+        """
+        Массовое добавление. items: объекты Project, словари с аргументами add_project
+        или кортежи (name, description, start_date, end_date). Каждая строка проходит
+        валидацию Project (готовые объекты — Project.validate() в DatabaseManager).
+        """
+        def build(item):
+            if isinstance(item, Project):
+                return item
+            if isinstance(item, Mapping):
+                return Project(**item)
+            return Project(*item)
+
+        return [_IntId(i) for i in self.db.add_projects_many(build(item) for item in items)]
+
     def get_project(self, project_id):
         project_id = _coerce_id(project_id)
-        r = self.db.get_project_by_id(project_id)
-        if not r:
-            return None
-        p = Project(r["name"], r["description"], _ensure_dt(r["start_date"]), _ensure_dt(r["end_date"]))
-        p.id = r["id"]; p.status = r["status"]
-        return p
-
-    def update_project(self, project_id, **kwargs):
+        return to_project(self.db.get_project_by_id(project_id), self.identity)
+
+    def update_project(self, project_id, returning=False, **kwargs):
+        """Как TaskController.update_task: rowcount или, с returning=True, Project."""
         project_id = _coerce_id(project_id)
         # допускаем строки дат
         if "start_date" in kwargs and isinstance(kwargs["start_date"], str):
             kwargs["start_date"] = datetime.fromisoformat(kwargs["start_date"])
         if "end_date" in kwargs and isinstance(kwargs["end_date"], str):
             kwargs["end_date"] = datetime.fromisoformat(kwargs["end_date"])
+        if returning or (kwargs and self.identity.get(Project, project_id) is not None):
+            row = self.db.update_project(project_id, returning=True, **kwargs)
+            p = to_project(row, self.identity)
+            return p if returning else int(p is not None)
         return self.db.update_project(project_id, **kwargs)
 
     def get_all_projects(self):
-        res = []
-        for r in self.db.get_all_projects():
-            p = Project(r["name"], r["description"], _ensure_dt(r["start_date"]), _ensure_dt(r["end_date"]))
-            p.id = r["id"]; p.status = r["status"]
-            res.append(p)
-        return res
+        return to_projects(self.db.get_all_projects(), self.identity)
 
-    
+    def page_projects(self, after_id=None, limit=50):
+        return to_projects(self.db.page_projects(_coerce_id(after_id), limit), self.identity)
+
+    def iter_projects(self, batch_size=500):
+        return iter_to_projects(self.db.iter_projects(batch_size), self.identity)
+
+    def count_projects(self, **filters):
+        return self.db.count_projects(filters)
 
     def delete_project(self, project_id):
         project_id = _coerce_id(project_id)
-        return self.db.delete_project(project_id) > 0
-
+        deleted = self.db.delete_project(project_id) > 0
+        if deleted:
+            self.identity.evict(Project, project_id)
+            self.identity.null_references(Task, "project_id", project_id)
+        return deleted
+
+    def move_tasks(self, from_project, to_project):
+        """Все задачи from_project -> to_project (None — без проекта) одним UPDATE; число задач."""
+        from_id, to_id = _coerce_id(from_project), _coerce_id(to_project)
+        ids = self.db.move_tasks(from_id, to_id, return_ids=True)
+        self.identity.assign(Task, ids, "project_id", to_id)
+        return len(ids)
 
     def get_project_progress(self, project_id):
         project_id = _coerce_id(project_id)
-        tasks = self.db.get_tasks_by_project(project_id)
-        if tasks:
-            total = len(tasks)
-            done = sum(1 for t in tasks if t["status"] == "completed")
-            return float(done * 100.0 / total)
-        p = self.get_project(project_id)
-        return float(p.get_progress()) if p else 0.0
+        counts = self.db.get_project_task_counts(project_id)
+        return _progress(counts) if counts else 0.0
+
+    def get_all_project_progress(self):
+        """{project_id: прогресс в %} для всех проектов за один запрос."""
+        now = datetime.utcnow()
+        return {c["id"]: _progress(c, now) for c in self.db.get_all_project_task_counts()}
 
     def update_project_status(self, project_id, new_status):
-        p = self.get_project(project_id)
-        if p is None:
-            return None
-        p.update_status(new_status)
-        self.db.update_project(p.id, status=p.status)
-        return self.get_project(p.id)
+        Project.validate_status(new_status)
+        return self.update_project(project_id, returning=True, status=new_status)
@@ -1,5 +1,9 @@
+from collections.abc import Mapping
 from datetime import datetime
-from models.task import Task
+from functools import partial
+from controllers.hydration import iter_to_tasks, load_deferred, to_task, to_tasks
+from controllers.identity_map import identity_map_for
+from models.task import ROW_FIELDS, Task
 
 
 def _coerce_id(v):
@@ -13,90 +17,197 @@ class _IntId(int):
         return obj
 
 
+# порядок позиционных аргументов add_task (для кортежей в add_tasks_many)
+_ADD_TASK_ARGS = ("title", "description", "priority", "due_date", "project_id", "assignee_id")
+
+
 def _ensure_dt(v):
     return v if isinstance(v, datetime) else datetime.fromisoformat(v)
 
 
+def _task_filters(**filters):
+    res = {k: v for k, v in filters.items() if v is not None}
+    for k in ("project_id", "assignee_id"):
+        if k in res:
+            res[k] = _coerce_id(res[k])
+    for k in ("due_before", "due_after"):
+        if k in res:
+            res[k] = _ensure_dt(res[k])
+    if "priority" in res:
+        p = res["priority"]
+        res["priority"] = [int(x) for x in p] if isinstance(p, (list, tuple, set)) else int(p)
+    return res
+
+
+def _task_predicate(filters):
+    # фильтр массового UPDATE: None — это IS NULL, а не «условие не задано»,
+    # иначе {"project_id": None, ...} молча расширил бы UPDATE
+    nulls = {k: None for k, v in filters.items() if v is None}
+    if "due_before" in nulls or "due_after" in nulls:
+        raise ValueError("due_before/due_after must not be None")
+    res = _task_filters(**filters)
+    res.update(nulls)
+    return res
+
+
 class TaskController:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.identity = identity_map_for(db_manager)
 
-    def add_task(self, title, description, priority, due_date, project_id, assignee_id):
+    def add_task(
+        self, title, description, priority, due_date, project_id, assignee_id, status=None
+    ):
         project_id = _coerce_id(project_id)
         assignee_id = _coerce_id(assignee_id)
         t = Task(title, description, int(priority), due_date, project_id, assignee_id)
+        if status is not None:
+            # начальный статус пишем тем же INSERT, без отдельного UPDATE
+            t.update_status(status)
         t.id = self.db.add_task(t)
         return _IntId(t.id)  # int-like с .id
 
+    def add_tasks_many(self, items):
+        """
+        Массовое добавление. items: объекты Task, словари с аргументами add_task
+        или кортежи в порядке аргументов add_task. Каждая строка проходит валидацию Task
+        (готовые объекты — Task.validate() в DatabaseManager.add_tasks_many).
+        """
+        def build(item):
+            if isinstance(item, Task):
+                return item
+            if isinstance(item, Mapping):
+                kwargs = dict(item)
+            elif len(item) == len(_ADD_TASK_ARGS):
+                kwargs = dict(zip(_ADD_TASK_ARGS, item))
+            else:
+                raise ValueError(f"task tuple must have {len(_ADD_TASK_ARGS)} items: {item!r}")
+            kwargs["project_id"] = _coerce_id(kwargs.get("project_id"))
+            kwargs["assignee_id"] = _coerce_id(kwargs.get("assignee_id"))
+            kwargs["priority"] = int(kwargs["priority"])
+            return Task(**kwargs)
+
+        return [_IntId(i) for i in self.db.add_tasks_many(build(item) for item in items)]
+
     def get_task(self, task_id):
         task_id = _coerce_id(task_id)
-        r = self.db.get_task_by_id(task_id)
-        if not r:
-            return None
-        t = Task(r["title"], r["description"], r["priority"],
-                 _ensure_dt(r["due_date"]), r["project_id"], r["assignee_id"])
-        t.id = r["id"]
-        t.status = r["status"]
-        return t
-
-    def get_all_tasks(self):
-        res = []
-        for r in self.db.get_all_tasks():
-            t = Task(r["title"], r["description"], r["priority"],
-                     _ensure_dt(r["due_date"]), r["project_id"], r["assignee_id"])
-            t.id = r["id"]
-            t.status = r["status"]
-            res.append(t)
-        return res
-
-    def update_task(self, task_id, **kwargs):
+        return to_task(self.db.get_task_by_id(task_id), self.identity)
+
+    def _to_tasks(self, rows, columns):
+        # с проекцией недостающие колонки догружаются пачкой при первом обращении
+        if columns is None:
+            return to_tasks(rows, self.identity)
+        deferred = [c for c in ROW_FIELDS if c != "id" and c not in columns]
+        fetch = partial(self.db.get_task_columns, columns=deferred) if deferred else None
+        return to_tasks(rows, self.identity, fetch)
+
+    def get_all_tasks(self, columns=None):
+        """
+        columns — какие колонки читать, например ("title", "status"). Остальные поля
+        (description и т.п.) загрузятся при первом обращении, одним запросом на пачку задач.
+        Так же работают все списочные методы ниже.
+        """
+        return self._to_tasks(self.db.get_all_tasks(columns=columns), columns)
+
+    def page_tasks(self, after_id=None, limit=50, columns=None):
+        """Страница задач после after_id (id или Task последней показанной строки)."""
+        return self._to_tasks(self.db.page_tasks(_coerce_id(after_id), limit, columns), columns)
+
+    def iter_tasks(self, batch_size=500, columns=None):
+        """Генератор Task: в памяти одновременно не больше batch_size строк."""
+        if columns is None:
+            return iter_to_tasks(self.db.iter_tasks(batch_size), self.identity)
+        return self._iter_pages(batch_size, columns)
+
+    def _iter_pages(self, batch_size, columns):
+        # постранично, чтобы у каждой страницы был свой загрузчик отложенных колонок
+        after_id = None
+        while True:
+            page = self.page_tasks(after_id, batch_size, columns)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1].id
+
+    def load_deferred(self, tasks):
+        """Догрузить невыбранные колонки сразу для всех tasks (например, описания к экспорту)."""
+        load_deferred(tasks)
+
+    def find_tasks(self, status=None, priority=None, project_id=None, assignee_id=None,
+                   due_before=None, due_after=None, order_by="id", limit=None, columns=None):
+        """
+        Фильтрация на стороне SQLite. None — фильтр не задан; status/priority
+        принимают и одно значение, и список. order_by: колонка, "-колонка" — по убыванию.
+        """
+        filters = _task_filters(status=status, priority=priority, project_id=project_id,
+                                assignee_id=assignee_id, due_before=due_before, due_after=due_after)
+        rows = self.db.find_tasks(order_by=order_by, limit=limit, columns=columns, **filters)
+        return self._to_tasks(rows, columns)
+
+    def count_tasks(self, **filters):
+        """Количество задач без загрузки строк: count_tasks(status="pending", project_id=1)."""
+        return self.db.count_tasks(_task_filters(**filters))
+
+    def update_task(self, task_id, returning=False, **kwargs):
+        """
+        Возвращает число обновлённых строк, с returning=True — обновлённый Task (None, если нет).
+        Загруженный экземпляр обновляется на месте тем же UPDATE ... RETURNING.
+        """
         task_id = _coerce_id(task_id)
         # допускаем строки дат
         if "due_date" in kwargs and isinstance(kwargs["due_date"], str):
             kwargs["due_date"] = datetime.fromisoformat(kwargs["due_date"])
+        if returning or (kwargs and self.identity.get(Task, task_id) is not None):
+            t = to_task(self.db.update_task(task_id, returning=True, **kwargs), self.identity)
+            return t if returning else int(t is not None)
         return self.db.update_task(task_id, **kwargs)
 
     def delete_task(self, task_id):
         task_id = _coerce_id(task_id)
-        return self.db.delete_task(task_id) > 0
-
-    def search_tasks(self, query):
-        # вернём объекты Task для консистентности
-        items = []
-        for r in self.db.search_tasks(query):
-            t = Task(r["title"], r["description"], r["priority"],
-                     _ensure_dt(r["due_date"]), r["project_id"], r["assignee_id"])
-            t.id = r["id"]; t.status = r["status"]
-            items.append(t)
-        return items
-
-    def update_task_status(self, task_id, new_status):
-        t = self.get_task(task_id)
-        if t is None:
-            return None
-        t.update_status(new_status)
-        self.db.update_task(t.id, status=t.status)
-        return self.get_task(t.id)
+        deleted = self.db.delete_task(task_id) > 0
+        if deleted:
+            self.identity.evict(Task, task_id)
+        return deleted
 
-    def get_overdue_tasks(self):
-        return [t for t in self.get_all_tasks() if t.is_overdue()]
+    def search_tasks(self, query, limit=None, rank=False, columns=None):
+        # вернём объекты Task для консистентности; rank=True — сначала самые релевантные
+        rows = self.db.search_tasks(query, limit=limit, rank=rank, columns=columns)
+        return self._to_tasks(rows, columns)
 
-    def get_tasks_by_project(self, project_id):
+    def update_task_status(self, task_id, new_status):
+        # проверка в Python, затем один UPDATE ... RETURNING вместо чтения до и после
+        Task.validate_status(new_status)
+        return self.update_task(task_id, returning=True, status=new_status)
+
+    def update_tasks_status(self, ids_or_filter, new_status, return_ids=False):
+        """
+        Массовая смена статуса одним UPDATE: список id/Task или фильтр как у find_tasks
+        ({"project_id": 3, "status": "in_progress"}; None — IS NULL). Возвращает число
+        изменённых задач, с return_ids=True — их id. Загруженные экземпляры обновляются на месте.
+        """
+        Task.validate_status(new_status)
+        if isinstance(ids_or_filter, Mapping):
+            filters = _task_predicate(ids_or_filter)
+            if not filters:
+                raise ValueError("filter must not be empty")
+        else:
+            filters = {"id": [_coerce_id(i) for i in ids_or_filter]}
+        ids = self.db.update_tasks_where(filters, return_ids=True, status=new_status)
+        self.identity.assign(Task, ids, "status", new_status)
+        return ids if return_ids else len(ids)
+
+    def get_overdue_tasks(self, now=None, limit=None, project_id=None, assignee_id=None,
+                          columns=None):
+        # одна отметка времени на весь запрос; по умолчанию локальное время, как в Task.is_overdue
+        now = datetime.now() if now is None else _ensure_dt(now)
+        rows = self.db.get_overdue_tasks(now, limit=limit, project_id=_coerce_id(project_id),
+                                         assignee_id=_coerce_id(assignee_id), columns=columns)
+        return self._to_tasks(rows, columns)
+
+    def get_tasks_by_project(self, project_id, columns=None):
         project_id = _coerce_id(project_id)
-        res = []
-        for r in self.db.get_tasks_by_project(project_id):
-            t = Task(r["title"], r["description"], r["priority"],
-                     _ensure_dt(r["due_date"]), r["project_id"], r["assignee_id"])
-            t.id = r["id"]; t.status = r["status"]
-            res.append(t)
-        return res
-
-    def get_tasks_by_user(self, user_id):
+        return self._to_tasks(self.db.get_tasks_by_project(project_id, columns=columns), columns)
+
+    def get_tasks_by_user(self, user_id, columns=None):
         user_id = _coerce_id(user_id)
-        res = []
-        for r in self.db.get_tasks_by_user(user_id):
-            t = Task(r["title"], r["description"], r["priority"],
-                     _ensure_dt(r["due_date"]), r["project_id"], r["assignee_id"])
-            t.id = r["id"]; t.status = r["status"]
-            res.append(t)
-        return res
\ No newline at end of file
+        return self._to_tasks(self.db.get_tasks_by_user(user_id, columns=columns), columns)
@@ -1,6 +1,8 @@
-from datetime import datetime
-from models.user import User
+from collections.abc import Mapping
+from controllers.hydration import iter_to_users, to_tasks, to_user, to_users
+from controllers.identity_map import identity_map_for
 from models.task import Task
+from models.user import User
 
 
 def _coerce_id(v):
@@ -15,56 +17,103 @@ class _IntId(int):
         return obj
 
 
+# статусы задач в порядке отображения нагрузки
+_TASK_STATUSES = ("pending", "in_progress", "completed")
+
+
+def _workload(counts):
+    res = {s: counts.get(s, 0) for s in _TASK_STATUSES}
+    res["total"] = sum(res.values())
+    return res
+
+
 class UserController:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.identity = identity_map_for(db_manager)
 
     def add_user(self, username, email, role):
         u = User(username, email, role)
         u.id = self.db.add_user(u)
         return _IntId(u.id)  # int-like с .id
 
+    def add_users_many(self, items):
+        """
+        Массовое добавление. items: объекты User, словари с аргументами add_user
+        или кортежи (username, email, role). Каждая строка проходит валидацию User
+        (готовые объекты — User.validate() в DatabaseManager).
+        """
+        def build(item):
+            if isinstance(item, User):
+                return item
+            if isinstance(item, Mapping):
+                return User(**item)
+            return User(*item)
+
+        return [_IntId(i) for i in self.db.add_users_many(build(item) for item in items)]
+
     def get_user(self, user_id):
         user_id = _coerce_id(user_id)
-        r = self.db.get_user_by_id(user_id)
-        if not r:
-            return None
-        u = User(r["username"], r["email"], r["role"])
-        u.id = r["id"]
-        u.registration_date = datetime.fromisoformat(r["registration_date"])
-        return u
+        return to_user(self.db.get_user_by_id(user_id), self.identity)
 
     def get_all_users(self):
-        res = []
-        for r in self.db.get_all_users():
-            u = User(r["username"], r["email"], r["role"])
-            u.id = r["id"]
-            u.registration_date = datetime.fromisoformat(r["registration_date"])
-            res.append(u)
-        return res
-
-    def update_user(self, user_id, **kwargs):
+        return to_users(self.db.get_all_users(), self.identity)
+
+    def page_users(self, after_id=None, limit=50):
+        return to_users(self.db.page_users(_coerce_id(after_id), limit), self.identity)
+
+    def iter_users(self, batch_size=500):
+        return iter_to_users(self.db.iter_users(batch_size), self.identity)
+
+    def count_users(self, **filters):
+        return self.db.count_users(filters)
+
+    def update_user(self, user_id, returning=False, **kwargs):
+        """Как TaskController.update_task: rowcount или, с returning=True, User."""
         user_id = _coerce_id(user_id)
+        if returning or (kwargs and self.identity.get(User, user_id) is not None):
+            u = to_user(self.db.update_user(user_id, returning=True, **kwargs), self.identity)
+            return u if returning else int(u is not None)
         return self.db.update_user(user_id, **kwargs)
 
     def delete_user(self, user_id):
         user_id = _coerce_id(user_id)
-        return self.db.delete_user(user_id) > 0
+        deleted = self.db.delete_user(user_id) > 0
+        if deleted:
+            self.identity.evict(User, user_id)
+            self.identity.null_references(Task, "assignee_id", user_id)
+        return deleted
+
+    def reassign_tasks(self, from_user, to_user):
+        """Все задачи from_user -> to_user (None — без исполнителя) одним UPDATE; число задач."""
+        from_id, to_id = _coerce_id(from_user), _coerce_id(to_user)
+        ids = self.db.reassign_tasks(from_id, to_id, return_ids=True)
+        self.identity.assign(Task, ids, "assignee_id", to_id)
+        return len(ids)
+
+    def delete_users_many(self, user_ids, reassign_to=None):
+        """
+        Удалить пользователей одной транзакцией. reassign_to — кому передать их задачи,
+        без него задачи остаются без исполнителя. Возвращает число удалённых.
+        """
+        ids = [_coerce_id(u) for u in user_ids]
+        reassign_to = _coerce_id(reassign_to)
+        deleted = self.db.delete_users_many(ids, reassign_to=reassign_to)
+        for user_id in ids:
+            self.identity.evict(User, user_id)
+        self.identity.replace_references(Task, "assignee_id", ids, reassign_to)
+        return deleted
+
+    def get_user_workload(self, user_id):
+        """{"pending": n, "in_progress": n, "completed": n, "total": n} из task_counters."""
+        return _workload(self.db.get_user_task_counts(_coerce_id(user_id)))
+
+    def get_all_user_workloads(self):
+        """{user_id: нагрузка} для всех пользователей, включая тех, у кого нет задач."""
+        counts = self.db.get_all_user_task_counts()
+        return {u.id: _workload(counts.get(u.id, {})) for u in self.get_all_users()}
 
     def get_user_tasks(self, user_id):
         """Возвращает список объектов Task пользователя"""
         user_id = _coerce_id(user_id)
-        tasks = []
-        for r in self.db.get_tasks_by_user(user_id):
-            t = Task(
-                r["title"],
-                r["description"],
-                r["priority"],
-                datetime.fromisoformat(r["due_date"]),
-                r["project_id"],
-                r["assignee_id"],
-            )
-            t.id = r["id"]
-            t.status = r["status"]
-            tasks.append(t)
-        return tasks
\ No newline at end of file
+        return to_tasks(self.db.get_tasks_by_user(user_id), self.identity)
\ No newline at end of file
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class EntityCache:
+    """
+    LRU-кеш строк по (таблица, id) перед get_*_by_id.
+    max_size — сколько строк держим; ttl — срок жизни записи в секундах (None — без срока).
+    Хранятся копии словарей, наружу тоже отдаются копии: правка результата кеш не портит.
+    Методы потокобезопасны.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be > 0")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        # (таблица, id) -> (строка, момент истечения или None)
+        self._items: OrderedDict[Tuple[str, int], Tuple[Dict[str, Any], Optional[float]]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, table: str, obj_id: int) -> Optional[Dict[str, Any]]:
+        key = (table, obj_id)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            row, expires = item
+            if expires is not None and self._clock() >= expires:
+                del self._items[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        return dict(row)
+
+    def put(self, table: str, obj_id: int, row: Dict[str, Any]) -> None:
+        key = (table, obj_id)
+        expires = self._clock() + self.ttl if self.ttl is not None else None
+        row = dict(row)
+        with self._lock:
+            self._items[key] = (row, expires)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table: str, obj_id: int) -> None:
+        with self._lock:
+            self._items.pop((table, obj_id), None)
+
+    def invalidate_where(self, table: str, column: str, value: Any) -> None:
+        """Сбросить строки table, у которых column == value (эффекты ON DELETE SET NULL)."""
+        with self._lock:
+            stale = [
+                key for key, (row, _) in self._items.items()
+                if key[0] == table and row.get(column) == value
+            ]
+            for key in stale:
+                del self._items[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedCursor:
+    """Курсор-заглушка над готовым списком строк: fetchone/fetchall/итерация."""
+
+    def __init__(self, rows: List[Any]) -> None:
+        self._rows = rows
+        self._pos = 0
+
+    def fetchone(self) -> Any:
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchall(self) -> List[Any]:
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+_Params = Tuple[Any, ...]
+_Tables = Tuple[str, ...]
+
+
+class ResultCache:
+    """
+    Кеш результатов SELECT: (sql, params) -> строки.
+    Запись помечена таблицами, которые читает запрос, и их поколениями на момент чтения.
+    Любая запись в таблицу увеличивает её поколение, и помеченные ею результаты устаревают.
+    max_rows ограничивает суммарное число строк во всех результатах (LRU по запросам).
+    Методы потокобезопасны.
+    """
+
+    def __init__(self, max_rows: int = 10_000) -> None:
+        if max_rows < 1:
+            raise ValueError("max_rows must be >= 1")
+        self.max_rows = max_rows
+        # (sql, params) -> (строки, таблицы, поколения таблиц)
+        self._items: OrderedDict[
+            Tuple[str, _Params], Tuple[List[Any], _Tables, Tuple[int, ...]]
+        ] = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _snapshot(self, tables: _Tables) -> Tuple[int, ...]:
+        gens = self._generations
+        return tuple(gens.get(t, 0) for t in tables)
+
+    def get(self, sql: str, params: _Params, tables: _Tables) -> Optional[List[Any]]:
+        key = (sql, params)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            rows, tags, gens = item
+            if gens != self._snapshot(tags):
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, sql: str, params: _Params, tables: _Tables, rows: List[Any]) -> None:
+        if len(rows) > self.max_rows:
+            return
+        key = (sql, params)
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (rows, tables, self._snapshot(tables))
+            self._rows += len(rows)
+            while self._rows > self.max_rows:
+                self._drop(next(iter(self._items)))
+                self.evictions += 1
+
+    def _drop(self, key: Tuple[str, _Params]) -> None:
+        rows, _, _ = self._items.pop(key)
+        self._rows -= len(rows)
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """Таблицы изменились: результаты, которые их читали, больше не выдаются."""
+        with self._lock:
+            gens = self._generations
+            for t in tables:
+                gens[t] = gens.get(t, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "rows": self._rows,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale": self.stale,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
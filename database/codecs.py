@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Mapping, Optional
+
+# Как значения моделей лежат на диске.
+# TextCodec — исходный формат: даты ISO-строками, статусы/роли строками.
+# CompactCodec — даты целыми секундами эпохи, статусы/роли маленькими целыми кодами.
+# Наивные datetime считаются «настенным» временем без сдвига, как и в strftime('%s', ...).
+
+TASK_STATUS_CODES = {"pending": 0, "in_progress": 1, "completed": 2}
+PROJECT_STATUS_CODES = {"active": 0, "completed": 1, "on_hold": 2}
+ROLE_CODES = {"admin": 1, "manager": 2, "developer": 3}
+
+# какие колонки кодируются: дата или перечисление
+DATE_COLUMNS = {
+    "tasks": ("due_date",),
+    "projects": ("start_date", "end_date"),
+    "users": ("registration_date",),
+}
+ENUM_COLUMNS = {
+    "tasks": {"status": TASK_STATUS_CODES},
+    "projects": {"status": PROJECT_STATUS_CODES},
+    "users": {"role": ROLE_CODES},
+}
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def dt_to_epoch(v: datetime | str) -> int:
+    if isinstance(v, str):
+        v = datetime.fromisoformat(v)
+    if v.tzinfo is not None:
+        v = v.astimezone(timezone.utc).replace(tzinfo=None)
+    return (v - _EPOCH) // _SECOND
+
+
+def epoch_to_dt(v: int) -> datetime:
+    # умножение timedelta заметно быстрее, чем timedelta(seconds=v)
+    return _EPOCH + _SECOND * v
+
+
+def dt_to_str(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+# description_blob: первый байт — способ сжатия, дальше данные.
+# Маркер оставляет место для других алгоритмов без миграции уже сжатых строк.
+BLOB_ZLIB = 1
+
+
+def compress_text(data: bytes, level: int = 6) -> bytes:
+    """UTF-8 байты описания -> содержимое description_blob."""
+    return bytes((BLOB_ZLIB,)) + zlib.compress(data, level)
+
+
+def decompress_text(blob: bytes) -> str:
+    if blob[0] == BLOB_ZLIB:
+        # memoryview: без копии хвоста блоба
+        return zlib.decompress(memoryview(blob)[1:]).decode("utf-8")
+    raise ValueError(f"unknown description_blob codec: {blob[0]}")
+
+
+def description_text(description: str, blob: Optional[bytes]) -> str:
+    """Текст описания из пары колонок; регистрируется как SQL-функция для FTS и LIKE."""
+    return description if blob is None else decompress_text(blob)
+
+
+def _unpack_description(d: Dict[str, Any]) -> None:
+    # сжатое описание подменяет пустое description; сама колонка наружу не выходит
+    blob = d.pop("description_blob", None)
+    if blob is not None:
+        d["description"] = decompress_text(blob)
+
+
+class TextCodec:
+    compact = False
+
+    def encode(self, table: str, column: str, value: Any) -> Any:
+        if isinstance(value, datetime):
+            return dt_to_str(value)
+        return value
+
+    def decode_value(self, table: str, column: str, value: Any) -> Any:
+        return value
+
+    def decode_row(self, table: str, row: Mapping[str, Any]) -> Dict[str, Any]:
+        d = dict(row)
+        _unpack_description(d)
+        return d
+
+
+class CompactCodec(TextCodec):
+    compact = True
+
+    def __init__(self) -> None:
+        self._encoders: Dict[tuple, Callable[[Any], Any]] = {}
+        self._decoders: Dict[str, Dict[str, Callable[[Any], Any]]] = {}
+        # плоские кортежи колонок для горячего цикла decode_row
+        self._date_columns: Dict[str, tuple] = {}
+        self._enum_columns: Dict[str, tuple] = {}
+        for table, columns in DATE_COLUMNS.items():
+            for column in columns:
+                self._encoders[(table, column)] = dt_to_epoch
+                self._decoders.setdefault(table, {})[column] = epoch_to_dt
+        for table, enums in ENUM_COLUMNS.items():
+            for column, codes in enums.items():
+                self._encoders[(table, column)] = self._enum_encoder(table, column, codes)
+                names = {code: name for name, code in codes.items()}
+                self._decoders.setdefault(table, {})[column] = names.__getitem__
+        for table in self._decoders:
+            self._date_columns[table] = DATE_COLUMNS.get(table, ())
+            self._enum_columns[table] = tuple(
+                (column, {code: name for name, code in codes.items()})
+                for column, codes in ENUM_COLUMNS.get(table, {}).items()
+            )
+
+    @staticmethod
+    def _enum_encoder(table: str, column: str, codes: Dict[str, int]) -> Callable[[Any], int]:
+        def encode(value: Any) -> int:
+            try:
+                return codes[value]
+            except KeyError:
+                raise ValueError(f"invalid {column} for {table}: {value}") from None
+        return encode
+
+    def encode(self, table: str, column: str, value: Any) -> Any:
+        if value is None:
+            return None
+        enc = self._encoders.get((table, column))
+        return enc(value) if enc else value
+
+    def decode_value(self, table: str, column: str, value: Any) -> Any:
+        dec = self._decoders.get(table, {}).get(column)
+        return dec(value) if dec and value is not None else value
+
+    def decode_row(self, table: str, row: Mapping[str, Any]) -> Dict[str, Any]:
+        d = dict(row)
+        _unpack_description(d)
+        for column in self._date_columns[table]:
+            v = d.get(column)
+            if v is not None:
+                d[column] = _EPOCH + _SECOND * v
+        for column, names in self._enum_columns[table]:
+            v = d.get(column)
+            if v is not None:
+                d[column] = names[v]
+        return d
+
+
+TEXT = TextCodec()
+COMPACT = CompactCodec()
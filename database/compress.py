@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Сжатие описаний задач и проектов в существующей базе (DatabaseManager.compress_descriptions).
+
+    python -m database.compress database/tasks.db --threshold 1024 --vacuum
+    python -m database.compress database/tasks.db --decompress
+
+После сжатия писать в tasks могут только соединения с функцией description_text
+(DatabaseManager регистрирует её сам); --decompress возвращает обычную схему.
+"""
+
+import argparse
+
+from database.database_manager import DatabaseManager
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("db_path")
+    parser.add_argument("--threshold", type=int, default=None,
+                        help="сжимать описания от стольких байт (по умолчанию 1024)")
+    parser.add_argument("--vacuum", action="store_true", help="вернуть освобождённое место файлу")
+    parser.add_argument("--decompress", action="store_true", help="распаковать всё обратно")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db_path)
+    try:
+        db.migrate()
+        if args.decompress:
+            for table, n in db.decompress_descriptions().items():
+                print(f"{table}: {n} rows decompressed")
+            return
+        r = db.compress_descriptions(threshold=args.threshold, vacuum=args.vacuum)
+    finally:
+        db.close()
+    print(f"compressed: {r['tasks']} tasks, {r['projects']} projects")
+    print(f"descriptions: {r['text_bytes'] / 2 ** 20:.1f} MiB -> "
+          f"{r['blob_bytes'] / 2 ** 20:.1f} MiB (saved {r['saved_bytes'] / 2 ** 20:.1f} MiB)")
+    print(f"database pages in use: {r['db_bytes_before'] / 2 ** 20:.1f} MiB -> "
+          f"{r['db_bytes_after'] / 2 ** 20:.1f} MiB")
+    print(f"read overhead: {r['decode_us']:.1f} us per compressed description")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,259 +1,1582 @@
 from __future__ import annotations
 
+import functools
+import re
 import sqlite3
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 
 from models.task import Task
 from models.project import Project
 from models.user import User
+from database.cache import CachedCursor, EntityCache, ResultCache
+from database.codecs import (
+    COMPACT,
+    TEXT,
+    TextCodec,
+    compress_text,
+    decompress_text,
+    description_text,
+)
+from database.migrations import (
+    COUNTER_SCOPES,
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    convert_to_compact,
+    create_search_index,
+    drop_search_index,
+    is_compact,
+    is_compressed,
+    rebuild_task_counters,
+)
+from database.profiles import DEFAULT_PROFILE, SQLiteProfile, get_profile
+from database.write_queue import WriteQueue
 
 
-def _dt_to_str(dt: datetime) -> str:
-    return dt.isoformat(timespec="seconds")
+# сколько строк отправляем в один executemany
+_BULK_CHUNK_SIZE = 500
 
 
-def _str_to_dt(s: str) -> datetime:
-    # допускаем ISO 8601
-    return datetime.fromisoformat(s)
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+
+# размер страницы по умолчанию для iter_* (keyset-пагинация по id)
+_ITER_BATCH_SIZE = 500
+
+# порог сжатия описаний (байт UTF-8) для compress_descriptions без явного порога
+_COMPRESS_THRESHOLD = 1024
+# на скольких сжатых описаниях compress_descriptions замеряет цену распаковки
+_DECODE_SAMPLE = 1000
+
+# (операция, таблица) -> таблицы, чьё содержимое меняется вместе с ней:
+# триггеры FTS и счётчиков на tasks, каскады ON DELETE SET NULL из projects/users
+_WRITE_EFFECTS = {
+    ("write", "tasks"): ("tasks", "tasks_fts", "task_counters"),
+    ("delete", "tasks"): ("tasks", "tasks_fts", "task_counters"),
+    ("delete", "projects"): ("projects", "tasks", "tasks_fts", "task_counters"),
+    ("delete", "users"): ("users", "tasks", "tasks_fts", "task_counters"),
+}
+_WRITE_TABLE_RE = re.compile(
+    r"\s*(?:(DELETE)\s+FROM|INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?)"
+    r"\s+(\w+)",
+    re.IGNORECASE,
+)
+
+# запросы, которые можно отдать соединению-читателю
+_READ_RE = re.compile(r"\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+
+# UPDATE ... RETURNING появился в SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# по каким колонкам можно считать count_* (значения — только через параметры)
+_TASK_COLUMNS = frozenset(
+    {"id", "title", "description", "priority", "status", "due_date", "project_id", "assignee_id"}
+)
+# незавершённые статусы: IN (...) по ним использует индекс (status, due_date), а != — нет
+_OPEN_TASK_STATUSES = ("pending", "in_progress")
+# что можно менять через update_task / update_tasks_where
+_TASK_UPDATE_FIELDS = frozenset(
+    {"title", "description", "priority", "status", "due_date", "project_id", "assignee_id"}
+)
+_TASK_ORDER_COLUMNS = frozenset({"id", "title", "priority", "status", "due_date"})
+_PROJECT_COLUMNS = frozenset({"id", "name", "description", "start_date", "end_date", "status"})
+_USER_COLUMNS = frozenset({"id", "username", "email", "role", "registration_date"})
+_TABLE_COLUMNS = {"tasks": _TASK_COLUMNS, "projects": _PROJECT_COLUMNS, "users": _USER_COLUMNS}
+
+
+def _select_list(columns: Optional[Iterable[str]], table: str, prefix: str = "") -> str:
+    """
+    Проекция для SELECT: None — все колонки, иначе только перечисленные.
+    id выбирается всегда: по нему строка собирается в модель и догружает остальное.
+    """
+    if columns is None:
+        return prefix + "*"
+    allowed = _TABLE_COLUMNS[table]
+    names = ["id"]
+    for column in columns:
+        if column not in allowed:
+            raise ValueError(f"invalid column for {table}: {column}")
+        if column not in names:
+            names.append(column)
+    if "description" in names:
+        # сжатое описание лежит в description_blob; codec.decode_row подставит текст
+        names.append("description_blob")
+    return ", ".join(prefix + c for c in names)
+
+
+def _where_equals(
+    filters: Optional[Dict[str, Any]], allowed: frozenset, table: str, codec: TextCodec
+) -> Tuple[str, List[Any]]:
+    """
+    Компилирует фильтр в WHERE. Имена колонок сверяются с allowed, значения идут параметрами
+    (в формате хранения, через codec). None -> IS NULL, список/кортеж/множество -> IN (...).
+    """
+    if not filters:
+        return "", []
+    conds, params = [], []
+    for k, v in filters.items():
+        if k not in allowed:
+            raise ValueError(f"invalid filter for {table}: {k}")
+        if isinstance(v, (list, tuple, set, frozenset)):
+            cond, values = _where_in(k, [codec.encode(table, k, x) for x in v])
+        else:
+            cond, values = _where_scalar(k, v, table, codec)
+        conds.append(cond)
+        params.extend(values)
+    return " WHERE " + " AND ".join(conds), params
+
+
+def _where_in(column: str, values: List[Any]) -> Tuple[str, List[Any]]:
+    # пустой список не совпадает ни с чем
+    if not values:
+        return "0", []
+    return f"{column} IN ({', '.join('?' * len(values))})", values
+
+
+def _where_scalar(column: str, value: Any, table: str, codec: TextCodec) -> Tuple[str, List[Any]]:
+    if value is None:
+        return f"{column} IS NULL", []
+    return f"{column} = ?", [codec.encode(table, column, value)]
+
+
+def _task_where(filters: Optional[Dict[str, Any]], codec: TextCodec) -> Tuple[str, List[Any]]:
+    """Как _where_equals, плюс диапазон дедлайна: due_before (<) и due_after (>)."""
+    filters = dict(filters or {})
+    ranges = [
+        ("due_date < ?", filters.pop("due_before", None)),
+        ("due_date > ?", filters.pop("due_after", None)),
+    ]
+    where, params = _where_equals(filters, _TASK_COLUMNS, "tasks", codec)
+    conds = [where[len(" WHERE "):]] if where else []
+    for cond, value in ranges:
+        if value is not None:
+            conds.append(cond)
+            params.append(codec.encode("tasks", "due_date", value))
+    return (" WHERE " + " AND ".join(conds) if conds else ""), params
+
+
+def _pack_rows(
+    rows: List[sqlite3.Row], report: Dict[str, Any], sample: List[bytes]
+) -> List[Tuple[bytes, int]]:
+    # (блоб, id) для UPDATE; описания, которым сжатие не помогает, остаются текстом
+    packed = []
+    for obj_id, text in rows:
+        data = text.encode("utf-8")
+        blob = compress_text(data)
+        if len(blob) >= len(data):
+            continue
+        packed.append((blob, obj_id))
+        report["text_bytes"] += len(data)
+        report["blob_bytes"] += len(blob)
+        if len(sample) < _DECODE_SAMPLE:
+            sample.append(blob)
+    return packed
+
+
+def _decode_us(sample: List[bytes]) -> float:
+    # средняя цена распаковки одного описания, мкс
+    if not sample:
+        return 0.0
+    started = time.perf_counter()
+    for blob in sample:
+        decompress_text(blob)
+    return (time.perf_counter() - started) * 1e6 / len(sample)
+
+
+def _task_order_by(order_by: str) -> str:
+    """'due_date' / '-due_date' -> ORDER BY ...; id добавляется для стабильного порядка."""
+    desc = order_by.startswith("-")
+    column = order_by[1:] if desc else order_by
+    if column not in _TASK_ORDER_COLUMNS:
+        raise ValueError(f"invalid order_by for tasks: {order_by}")
+    direction = " DESC" if desc else ""
+    if column == "id":
+        return f" ORDER BY id{direction}"
+    return f" ORDER BY {column}{direction}, id{direction}"
+
+
+# маркеры подсветки совпадений в snippet()
+_SNIPPET_OPEN = "["
+_SNIPPET_CLOSE = "]"
+
+
+def _fts_match(query: str) -> str:
+    """
+    Пользовательский ввод -> выражение MATCH: каждое слово в кавычках
+    (никакого синтаксиса FTS5 из ввода) и с * для поиска по префиксу.
+    Пустая строка, если искать по индексу нечего.
+    """
+    terms = [t for t in query.split() if any(ch.isalnum() for ch in t)]
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+
+
+def _chunked(rows: Iterable[Tuple[Any, ...]], size: int) -> Iterator[List[Tuple[Any, ...]]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# текст описания -> (description, description_blob)
+_Pack = Callable[[str], Tuple[str, Optional[bytes]]]
+
+
+def _task_params(task: Task, codec: TextCodec, pack: _Pack) -> Tuple[Any, ...]:
+    return (
+        task.title,
+        *pack(task.description),
+        task.priority,
+        codec.encode("tasks", "status", task.status),
+        codec.encode("tasks", "due_date", task.due_date),
+        task.project_id,
+        task.assignee_id,
+    )
+
+
+def _project_params(project: Project, codec: TextCodec, pack: _Pack) -> Tuple[Any, ...]:
+    return (
+        project.name,
+        *pack(project.description),
+        codec.encode("projects", "start_date", project.start_date),
+        codec.encode("projects", "end_date", project.end_date),
+        codec.encode("projects", "status", project.status),
+    )
+
+
+def _user_params(user: User, codec: TextCodec) -> Tuple[Any, ...]:
+    return (
+        user.username,
+        user.email,
+        codec.encode("users", "role", user.role),
+        codec.encode("users", "registration_date", user.registration_date),
+    )
+
+
+_INSERT_TASK_SQL = """
+    INSERT INTO tasks(
+        title, description, description_blob, priority, status, due_date, project_id, assignee_id
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_PROJECT_SQL = """
+    INSERT INTO projects(name, description, description_blob, start_date, end_date, status)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_INSERT_USER_SQL = """
+    INSERT INTO users(username, email, role, registration_date)
+    VALUES (?, ?, ?, ?)
+"""
+
+# даты проекта + счётчики задач из task_counters (не больше строки на статус);
+# параметр — статус «завершено»
+_PROJECT_TASK_COUNTS_SQL = """
+    SELECT p.id, p.start_date, p.end_date,
+           COALESCE(SUM(c.n), 0) AS total,
+           COALESCE(SUM(CASE WHEN c.status = ? THEN c.n END), 0) AS completed
+    FROM projects p
+    LEFT JOIN task_counters c ON c.scope = 'project' AND c.owner_id = p.id
+"""
+
+
+def _close_quietly(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _locked(method: Callable[..., Any]) -> Callable[..., Any]:
+    # метод целиком работает с self.conn: схема, PRAGMA, обслуживание
+    @functools.wraps(method)
+    def wrapper(self: "DatabaseManager", *args: Any, **kwargs: Any) -> Any:
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _queued(method: Callable[..., Any]) -> Callable[..., Any]:
+    # метод записи: в режиме очереди выполняется пишущим потоком, вызывающий ждёт COMMIT
+    # группы. Внутри своей transaction() поток пишет сам — очередь ждала бы его COMMIT.
+    @functools.wraps(method)
+    def wrapper(self: "DatabaseManager", *args: Any, **kwargs: Any) -> Any:
+        wq = self.write_queue
+        if wq is None or self._tx_owner == threading.get_ident():
+            return method(self, *args, **kwargs)
+        return wq.submit(method, self, *args, **kwargs).result()
+    return wrapper
+
+
+class _Reader:
+    # соединение-читатель потока; держится в threading.local и закрывается вместе с потоком
+    __slots__ = ("conn", "profile", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.profile: Optional[SQLiteProfile] = None
 
 
 class DatabaseManager:
     """
     Менеджер работы с SQLite.
     Все методы используют параметризованные запросы.
+
+    Методы можно вызывать из нескольких потоков. Пишет одно соединение (self.conn)
+    под блокировкой; transaction() держит её до COMMIT. Чтение идёт через него же,
+    если оно свободно, а пока другой поток пишет — через соединение-читатель своего
+    потока: в WAL оно видит последний зафиксированный снимок и писателя не ждёт.
     """
 
-    def __init__(self, db_path: str = "database/tasks.db") -> None:
-        self.conn = sqlite3.connect(db_path)
+    def __init__(
+        self,
+        db_path: str = "database/tasks.db",
+        profile: str | SQLiteProfile = DEFAULT_PROFILE,
+        compact: bool = False,
+        cache_size: int = 0,
+        cache_ttl: Optional[float] = None,
+        result_cache_rows: int = 0,
+        data_version_interval: Optional[float] = 0.05,
+        compress_threshold: Optional[int] = None,
+        group_commit: int = 0,
+        group_commit_window: float = 0.0,
+    ) -> None:
+        if data_version_interval is not None and data_version_interval < 0:
+            raise ValueError("data_version_interval must be >= 0")
+        if compress_threshold is not None and compress_threshold < 1:
+            raise ValueError("compress_threshold must be >= 1")
+        if group_commit < 0:
+            raise ValueError("group_commit must be >= 0")
+        self._db_path = db_path
+        # писатель один, вызовы из разных потоков упорядочивает _write_lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute("PRAGMA foreign_keys = ON")
         self.conn.row_factory = sqlite3.Row
+        # нужна триггерам и представлению tasks_text в режиме сжатых описаний
+        self.conn.create_function("description_text", 2, description_text, deterministic=True)
+        # глубина вложенности transaction(); >0 — коммиты отдельных вызовов откладываются
+        self._tx_depth = 0
+        # держит поток, который пишет через self.conn (на всю transaction() — до COMMIT)
+        self._write_lock = threading.RLock()
+        # поток, открывший внешнюю transaction()
+        self._tx_owner: Optional[int] = None
+        # hook(committed) после COMMIT внешней транзакции и после каждого отката
+        self._tx_hooks: List[Callable[[bool], None]] = []
+        # соединения-читатели по одному на поток; у базы в памяти их нет —
+        # другое соединение к ":memory:" открыло бы другую, пустую базу
+        self._local = threading.local()
+        self._readers: "weakref.WeakSet[_Reader]" = weakref.WeakSet()
+        self._readers_lock = threading.Lock()
+        self._in_memory = db_path in ("", ":memory:")
+        self._profile = get_profile(profile)
+        self._apply_profile(self._profile)
+        # есть ли tasks_fts; None — ещё не проверяли
+        self._fts: Optional[bool] = None
+        # compact=True: migrate() переведёт базу в компактную раскладку (даты/статусы — INTEGER).
+        # Уже компактная база читается компактно независимо от флага.
+        self._want_compact = compact
+        self._codec: TextCodec = COMPACT if is_compact(self.conn) else TEXT
+        # compress_threshold — описания tasks/projects от стольких байт пишутся сжатыми
+        # в description_blob; migrate() переводит базу в этот режим. Чтение распаковывает
+        # сжатые строки всегда, независимо от флага. None — писать как есть.
+        self._compress_threshold = compress_threshold
+        # база в режиме сжатых описаний; None — ещё не проверяли
+        self._compressed: Optional[bool] = None
+        # cache_size > 0 — LRU-кеш строк перед get_*_by_id;
+        # сбрасывается точечно в update_*/delete_*.
+        # Записи в обход методов менеджера (сырой SQL, другие процессы) кеш не видит.
+        self.entity_cache: Optional[EntityCache] = (
+            EntityCache(cache_size, cache_ttl) if cache_size > 0 else None
+        )
+        # result_cache_rows > 0 — кеш результатов SELECT (не больше стольких строк суммарно);
+        # устаревает по поколениям таблиц, которые увеличивает каждая запись через менеджер
+        self.result_cache: Optional[ResultCache] = (
+            ResultCache(result_cache_rows) if result_cache_rows > 0 else None
+        )
+        # PRAGMA data_version меняется, когда коммитит другое соединение (другой процесс,
+        # скрипт). Перед чтением из кеша сверяем его не чаще раза в data_version_interval
+        # секунд: проверка стоит ~7 мкс, дороже попадания в кеш. None — не сверять.
+        self._data_version_interval = data_version_interval
+        self._data_version = self._read_data_version()
+        self._data_version_checked = time.monotonic()
+        # group_commit > 0 — методы записи ставятся в очередь пишущего потока и фиксируются
+        # группами до стольких операций (плюс group_commit_window секунд ожидания попутчиков);
+        # вызов по-прежнему синхронный и возвращает id/rowcount после COMMIT своей группы.
+        # Вместо очереди можно отдать операцию и получить Future: db.write_queue.submit(...).
+        self.write_queue: Optional[WriteQueue] = (
+            WriteQueue(self, group_commit, group_commit_window) if group_commit > 0 else None
+        )
 
     # ---------- Low-level helpers ----------
     def close(self) -> None:
+        if self.write_queue is not None:
+            # уже поставленные записи выполняются до закрытия соединений
+            self.write_queue.close()
+        with self._readers_lock:
+            conns = [reader.conn for reader in self._readers]
+        for conn in conns + [self.conn]:
+            _close_quietly(conn)
+
+    def _execute(
+        self,
+        sql: str,
+        params: Tuple[Any, ...] = (),
+        commit: bool = False,
+        tables: Optional[Tuple[str, ...]] = None,
+        cache: bool = True,
+    ):
+        """
+        tables — какие таблицы читает SELECT. С ними (и включённым кешем результатов)
+        строки могут прийти из кеша; cache=False — всегда из базы.
+        SELECT возвращает курсор над уже выбранными строками (см. _read).
+        """
+        if tables is not None or _READ_RE.match(sql):
+            rc = self.result_cache
+            if rc is None or tables is None or not cache:
+                return CachedCursor(self._read(sql, params))
+            self._check_data_version()
+            rows = rc.get(sql, params, tables)
+            if rows is None:
+                rows = self._read(sql, params, lambda r: rc.put(sql, params, tables, r))
+            return CachedCursor(rows)
+        with self._write_lock:
+            cur = self.conn.execute(sql, params)
+            if self.result_cache is not None:
+                self._bump_written(sql)
+            if commit and self._tx_depth == 0:
+                self.conn.commit()
+        return cur
+
+    def _read(
+        self,
+        sql: str,
+        params: Tuple[Any, ...],
+        store: Optional[Callable[[List[sqlite3.Row]], None]] = None,
+    ) -> List[sqlite3.Row]:
+        """
+        Строки SELECT. Если писатель свободен (или занят этим же потоком) — через него:
+        так поток видит свои незафиксированные записи. Иначе — через читателя потока,
+        без ожидания чужой транзакции.
+        store(rows) — положить строки в кеш; вызывается только под блокировкой писателя
+        и вне транзакции, поэтому кеш не получит ни чужой устаревший снимок, ни
+        незафиксированные строки.
+        """
+        lock = self._write_lock
+        if lock.acquire(blocking=self._in_memory):
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+                if store is not None and self._tx_depth == 0:
+                    store(rows)
+                return rows
+            finally:
+                lock.release()
+        return self._reader().execute(sql, params).fetchall()
+
+    def _reader(self) -> sqlite3.Connection:
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.create_function("description_text", 2, description_text, deterministic=True)
+            conn.execute("PRAGMA query_only = ON")
+            reader = self._local.reader = _Reader(conn)
+            with self._readers_lock:
+                self._readers.add(reader)
+        if reader.profile is not self._profile:
+            # профиль сменили через use_profile — догоняем в своём потоке
+            reader.profile = self._profile
+            for name, value in reader.profile.pragmas().items():
+                if name != "journal_mode":
+                    reader.conn.execute(f"PRAGMA {name} = {value}").fetchall()
+        return reader.conn
+
+    def _bump_written(self, sql: str) -> None:
+        # запись -> новые поколения затронутых таблиц; SELECT сюда не подходит по регулярке
+        m = _WRITE_TABLE_RE.match(sql)
+        if m is not None:
+            table = m.group(2).lower()
+            op = "delete" if m.group(1) else "write"
+            self.result_cache.bump(_WRITE_EFFECTS.get((op, table), (table,)))
+
+    def _read_data_version(self) -> int:
+        return int(self.conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def _check_data_version(self) -> None:
+        """Сбросить кеши, если с прошлой проверки коммитило другое соединение."""
+        interval = self._data_version_interval
+        if interval is None:
+            return
+        now = time.monotonic()
+        if now - self._data_version_checked < interval:
+            return
+        # писатель занят другим потоком — сверимся при следующем чтении
+        if not self._write_lock.acquire(blocking=False):
+            return
         try:
-            self.conn.close()
-        except Exception:
-            pass
+            self._data_version_checked = now
+            version = self._read_data_version()
+            if version != self._data_version:
+                self._data_version = version
+                self._forget_cached()
+        finally:
+            self._write_lock.release()
+
+    def _forget_cached(self) -> None:
+        # после отката или перестройки схемы кеши могут хранить то, чего в базе нет
+        if self.entity_cache is not None:
+            self.entity_cache.clear()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def _rows(self, table: str, rows: Iterable[sqlite3.Row]) -> List[Dict[str, Any]]:
+        # строки -> словари с датами/статусами в модельном виде
+        decode = self._codec.decode_row
+        return [decode(table, r) for r in rows]
+
+    def _row(self, table: str, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        return self._codec.decode_row(table, row) if row else None
+
+    def _get_by_id(self, table: str, obj_id: int) -> Optional[Dict[str, Any]]:
+        cache = self.entity_cache
+        if cache is not None:
+            self._check_data_version()
+            cached = cache.get(table, obj_id)
+            if cached is not None:
+                return cached
+        store = (
+            functools.partial(self._store_entity, cache, table, obj_id)
+            if cache is not None else None
+        )
+        rows = self._read(f"SELECT * FROM {table} WHERE id = ?", (obj_id,), store)
+        return self._row(table, rows[0]) if rows else None
+
+    def _store_entity(
+        self, cache: EntityCache, table: str, obj_id: int, rows: List[sqlite3.Row]
+    ) -> None:
+        if rows:
+            cache.put(table, obj_id, self._row(table, rows[0]))
+
+    def _update_row(
+        self, table: str, obj_id: int, sql: str, params: Tuple[Any, ...], returning: bool
+    ) -> Union[int, Optional[Dict[str, Any]]]:
+        """
+        UPDATE одной строки по id. returning=False — rowcount.
+        returning=True — обновлённая строка или None одним запросом (UPDATE ... RETURNING *);
+        на SQLite < 3.35 — UPDATE и SELECT до COMMIT, в той же транзакции.
+        """
+        if not returning:
+            cur = self._execute(sql, params, commit=True)
+            self._invalidate(table, obj_id)
+            return cur.rowcount
+        with self._write_lock:
+            if _HAS_RETURNING:
+                # строки RETURNING выбираются до COMMIT: пока запрос не дочитан, фиксировать нельзя
+                rows = self._execute(sql + " RETURNING *", params).fetchall()
+            else:
+                cur = self._execute(sql, params)
+                rows = (
+                    self.conn.execute(f"SELECT * FROM {table} WHERE id = ?", (obj_id,)).fetchall()
+                    if cur.rowcount else []
+                )
+            if self._tx_depth == 0:
+                self.conn.commit()
+            self._invalidate(table, obj_id)
+            row = self._row(table, rows[0]) if rows else None
+            # внутри транзакции строка не зафиксирована и может откатиться: в общий кеш
+            # кладём только после успешного COMMIT
+            if row is not None and self._tx_depth == 0 and self.entity_cache is not None:
+                self.entity_cache.put(table, obj_id, row)
+        return row
+
+    def _invalidate(self, table: str, obj_id: int) -> None:
+        if self.entity_cache is not None:
+            self.entity_cache.invalidate(table, obj_id)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Счётчики кеша get_*_by_id (hits/misses/evictions/hit_rate); None — кеш выключен."""
+        return self.entity_cache.stats() if self.entity_cache is not None else None
 
-    def _execute(self, sql: str, params: Tuple[Any, ...] = (), commit: bool = False):
-        cur = self.conn.execute(sql, params)
-        if commit:
+    def result_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Счётчики кеша результатов (entries/rows/hits/misses/stale/hit_rate); None — выключен."""
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def write_queue_stats(self) -> Optional[Dict[str, Any]]:
+        """Счётчики очереди записи (groups/ops/max_group/avg_group/busy_retries).
+
+        None — очередь выключена.
+        """
+        return self.write_queue.stats() if self.write_queue is not None else None
+
+    # ---------- Performance profiles ----------
+    @_locked
+    def _apply_profile(self, profile: SQLiteProfile) -> None:
+        if self.conn.in_transaction:
+            raise ValueError("cannot change profile inside a transaction")
+        for name, value in profile.pragmas().items():
+            # значения берутся только из SQLiteProfile, не от пользователя
+            self.conn.execute(f"PRAGMA {name} = {value}").fetchall()
+
+    def use_profile(self, profile: str | SQLiteProfile) -> SQLiteProfile:
+        """Переключает профиль на лету, возвращает предыдущий."""
+        new = get_profile(profile)
+        self._apply_profile(new)
+        previous, self._profile = self._profile, new
+        return previous
+
+    @contextmanager
+    def profile(self, profile: str | SQLiteProfile):
+        """
+        Временный профиль, например на время импорта:
+
+            with db.profile("bulk_load"):
+                db.add_tasks_many(tasks)
+        """
+        previous = self.use_profile(profile)
+        try:
+            yield self
+        finally:
+            self.use_profile(previous)
+
+    @_locked
+    def settings(self) -> Dict[str, Any]:
+        """Профиль и фактические значения PRAGMA текущего соединения."""
+        def pragma(name: str) -> Any:
+            return self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+        return {
+            "profile": self._profile.name,
+            "journal_mode": str(pragma("journal_mode")).upper(),
+            "synchronous": _SYNCHRONOUS_NAMES.get(pragma("synchronous"), pragma("synchronous")),
+            "mmap_size": pragma("mmap_size"),
+            "cache_size": pragma("cache_size"),
+            "temp_store": _TEMP_STORE_NAMES.get(pragma("temp_store"), pragma("temp_store")),
+            "busy_timeout": pragma("busy_timeout"),
+            "foreign_keys": bool(pragma("foreign_keys")),
+        }
+
+    # ---------- Transactions ----------
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все записи внутри блока фиксируются одним COMMIT на выходе.
+        Вложенные блоки работают через SAVEPOINT и откатываются независимо.
+
+            with db.transaction():
+                db.add_task(...)
+                db.update_task(...)
+        """
+        # другие потоки на это время читают через своих читателей, а пишущие ждут COMMIT
+        with self._write_lock:
+            depth = self._tx_depth
+            self._tx_begin(depth)
+            try:
+                yield self
+            except BaseException:
+                self._tx_rollback(depth)
+                raise
+            self._tx_commit(depth)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Открыт ли сейчас блок transaction() (в любом потоке)."""
+        return self._tx_depth > 0
+
+    def add_transaction_hook(self, hook: Callable[[bool], None]) -> None:
+        """
+        hook(committed) вызывается после COMMIT внешнего блока transaction() (True)
+        и после отката любого блока, в том числе вложенного (False). Так загруженные
+        объекты (IdentityMap) узнают, что изменения транзакции не зафиксированы.
+        """
+        self._tx_hooks.append(hook)
+
+    def _tx_ended(self, committed: bool) -> None:
+        for hook in self._tx_hooks:
+            hook(committed)
+
+    def _tx_begin(self, depth: int) -> None:
+        if depth == 0:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+            self._tx_owner = threading.get_ident()
+        else:
+            self.conn.execute(f"SAVEPOINT sp_{depth}")
+        self._tx_depth = depth + 1
+
+    def _tx_rollback(self, depth: int) -> None:
+        self._tx_depth = depth
+        # кеши могли запомнить строки, записанные внутри откатываемого блока
+        self._forget_cached()
+        if depth == 0:
+            self._tx_owner = None
+            self.conn.rollback()
+        else:
+            self.conn.execute(f"ROLLBACK TO sp_{depth}")
+            self.conn.execute(f"RELEASE sp_{depth}")
+        self._tx_ended(False)
+
+    def _tx_commit(self, depth: int) -> None:
+        if depth:
+            self._tx_depth = depth
+            self.conn.execute(f"RELEASE sp_{depth}")
+            return
+        try:
             self.conn.commit()
-        return cur
+        except BaseException:
+            # COMMIT не прошёл (например, отложенный внешний ключ): транзакция осталась
+            # открытой — откатываем, иначе следующий BEGIN упадёт на ней же
+            self._tx_rollback(depth)
+            raise
+        self._tx_depth = depth
+        self._tx_owner = None
+        self._tx_ended(True)
+
+    def _insert_many(self, sql: str, rows: Iterable[Tuple[Any, ...]], chunk_size: int) -> List[int]:
+        """
+        Вставка пачками через executemany в одной транзакции.
+        Таблицы с AUTOINCREMENT, а транзакция держит блокировку записи,
+        поэтому id одной пачки идут подряд и заканчиваются last_insert_rowid().
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        ids: List[int] = []
+        with self.transaction():
+            for chunk in _chunked(rows, chunk_size):
+                self.conn.executemany(sql, chunk)
+                if self.result_cache is not None:
+                    self._bump_written(sql)
+                last = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids.extend(range(last - len(chunk) + 1, last + 1))
+        return ids
+
+    # ---------- Pagination ----------
+    def _page(
+        self,
+        table: str,
+        after_id: Optional[int],
+        limit: int,
+        columns: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        # keyset: WHERE id > последний_id идёт по первичному ключу без OFFSET-сканирования
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        rows = self._execute(
+            f"SELECT {_select_list(columns, table)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            (int(after_id or 0), int(limit)),
+        ).fetchall()
+        return self._rows(table, rows)
+
+    def _iter(
+        self, table: str, batch_size: int, columns: Optional[Iterable[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        after_id = 0
+        while True:
+            page = self._page(table, after_id, batch_size, columns)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1]["id"]
+
+    def _count(
+        self, table: str, filters: Optional[Dict[str, Any]], allowed: frozenset, cache: bool = True
+    ) -> int:
+        where, params = _where_equals(filters, allowed, table, self._codec)
+        cur = self._execute(
+            f"SELECT COUNT(*) FROM {table}{where}", tuple(params), tables=(table,), cache=cache
+        )
+        return int(cur.fetchone()[0])
+
+    # ---------- Schema ----------
+    @_locked
+    def schema_version(self) -> int:
+        return int(self.conn.execute("PRAGMA user_version").fetchone()[0])
+
+    @_locked
+    def migrate(self) -> List[int]:
+        """
+        Применяет недостающие миграции по порядку, каждую в своей транзакции.
+        Если схема актуальна — ни одного DDL, только чтение user_version.
+        С compact=True в конце переводит базу в компактную раскладку (один раз),
+        с compress_threshold — в режим сжатых описаний.
+        Возвращает номера применённых версий.
+        """
+        current = self.schema_version()
+        if current >= SCHEMA_VERSION:
+            if self._want_compact and not self._codec.compact:
+                self.convert_to_compact()
+            self._ensure_compressed_mode()
+            return []
+        applied: List[int] = []
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            with self.transaction():
+                migration.apply(self.conn)
+                self.conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            applied.append(migration.version)
+        self._fts = None
+        self._compressed = None
+        self._forget_cached()
+        if self._want_compact:
+            self.convert_to_compact()
+        self._ensure_compressed_mode()
+        return applied
+
+    def _ensure_compressed_mode(self) -> None:
+        # compress_threshold задан: новые записи сжимаются, уже записанные — compress_descriptions
+        if self._compress_threshold is not None and not self._is_compressed():
+            with self.transaction():
+                self._set_search_mode(compressed=True)
+
+    @property
+    def compact(self) -> bool:
+        """True, если база в компактной раскладке (даты — секунды эпохи, статусы — коды)."""
+        return self._codec.compact
+
+    @_locked
+    def convert_to_compact(self) -> bool:
+        """
+        Переводит существующую базу в компактную раскладку на месте, одной транзакцией.
+        Модельный API (datetime/str) не меняется — перевод делается на границе с БД.
+        Возвращает False, если база уже компактная.
+        """
+        if is_compact(self.conn):
+            self._codec = COMPACT
+            return False
+        if self._tx_depth or self.conn.in_transaction:
+            raise ValueError("cannot convert schema inside a transaction")
+        # пересоздание таблиц по документации SQLite требует выключенных внешних ключей,
+        # а PRAGMA foreign_keys внутри транзакции игнорируется
+        self.conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with self.transaction():
+                convert_to_compact(self.conn)
+                if self.conn.execute("PRAGMA foreign_key_check").fetchone():
+                    raise sqlite3.IntegrityError("foreign key check failed after conversion")
+        finally:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+        self._codec = COMPACT
+        self._fts = None
+        self._forget_cached()
+        return True
+
+    def _has_fts(self) -> bool:
+        if self._fts is None:
+            row = self._execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+            ).fetchone()
+            self._fts = row is not None
+        return self._fts
+
+    # ---------- Compressed descriptions ----------
+    def _is_compressed(self) -> bool:
+        if self._compressed is None:
+            with self._write_lock:
+                self._compressed = is_compressed(self.conn)
+        return self._compressed
+
+    def _pack_description(self, text: str) -> Tuple[str, Optional[bytes]]:
+        # сжимаем, только если база в режиме сжатия (его FTS-триггеры читают блоб)
+        # и сжатие действительно экономит место
+        threshold = self._compress_threshold
+        if threshold is not None and len(text) * 4 >= threshold and self._is_compressed():
+            data = text.encode("utf-8")
+            if len(data) >= threshold:
+                blob = compress_text(data)
+                if len(blob) < len(data):
+                    return "", blob
+        return text, None
+
+    def _set_search_mode(self, compressed: bool) -> None:
+        # вызывать внутри транзакции; индекс перестраивается по новому источнику текста
+        drop_search_index(self.conn)
+        create_search_index(self.conn, compressed)
+        self._compressed = compressed
+        self._fts = None
+
+    def _used_bytes(self) -> int:
+        # занятые страницы: свободные после UPDATE остаются в файле до VACUUM
+        pages, free, size = (
+            int(self.conn.execute(f"PRAGMA {name}").fetchone()[0])
+            for name in ("page_count", "freelist_count", "page_size")
+        )
+        return (pages - free) * size
+
+    @_locked
+    def compress_descriptions(
+        self, threshold: Optional[int] = None, vacuum: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Переводит базу в режим сжатых описаний и сжимает уже записанные описания
+        tasks/projects от threshold байт (по умолчанию — compress_threshold менеджера или 1 КиБ;
+        порог не меньше 1, как у compress_threshold).
+        Дальнейшие записи через этот менеджер сжимаются с тем же порогом.
+        vacuum=True — вернуть освобождённые страницы файлу (иначе они переиспользуются).
+        Отчёт: сколько строк сжато, байты текста и блобов, занятые страницы базы
+        до и после, средняя цена распаковки одного описания (мкс).
+        """
+        threshold = self._resolve_threshold(threshold)
+        if self._tx_depth or self.conn.in_transaction:
+            raise ValueError("cannot compress descriptions inside a transaction")
+        report: Dict[str, Any] = {
+            "tasks": 0, "projects": 0, "text_bytes": 0, "blob_bytes": 0,
+            "db_bytes_before": self._used_bytes(),
+        }
+        sample: List[bytes] = []
+        with self.transaction():
+            # без индекса: построчные триггеры FTS на каждый UPDATE дороже одного rebuild
+            drop_search_index(self.conn)
+            for table in ("tasks", "projects"):
+                self._compress_table(table, threshold, report, sample)
+            self._set_search_mode(compressed=True)
+        self._compress_threshold = threshold
+        self._forget_cached()
+        if vacuum:
+            self.conn.execute("VACUUM")
+        report["saved_bytes"] = report["text_bytes"] - report["blob_bytes"]
+        report["db_bytes_after"] = self._used_bytes()
+        report["decode_us"] = _decode_us(sample)
+        return report
+
+    def _resolve_threshold(self, threshold: Optional[int]) -> int:
+        # None — порог менеджера или 1 КиБ; явное значение проверяется, как в __init__
+        if threshold is None:
+            threshold = self._compress_threshold
+        if threshold is None:
+            return _COMPRESS_THRESHOLD
+        if threshold < 1:
+            raise ValueError("threshold must be >= 1")
+        return threshold
+
+    def _compress_table(
+        self, table: str, threshold: int, report: Dict[str, Any], sample: List[bytes]
+    ) -> None:
+        # пачками по id: только ещё не сжатые описания от threshold байт
+        after_id = 0
+        while True:
+            rows = self.conn.execute(
+                f"SELECT id, description FROM {table} WHERE id > ?"
+                " AND description_blob IS NULL AND length(CAST(description AS BLOB)) >= ?"
+                " ORDER BY id LIMIT ?",
+                (after_id, threshold, _BULK_CHUNK_SIZE),
+            ).fetchall()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            packed = _pack_rows(rows, report, sample)
+            self.conn.executemany(
+                f"UPDATE {table} SET description = '', description_blob = ? WHERE id = ?",
+                packed,
+            )
+            report[table] += len(packed)
+
+    @_locked
+    def decompress_descriptions(self) -> Dict[str, int]:
+        """
+        Обратный перевод: все описания снова текстом, FTS-триггеры без SQL-функции
+        (база опять доступна любым клиентам SQLite). Запись сжатых описаний выключается.
+        Возвращает число распакованных строк по таблицам.
+        """
+        if self._tx_depth or self.conn.in_transaction:
+            raise ValueError("cannot decompress descriptions inside a transaction")
+        report = {}
+        with self.transaction():
+            drop_search_index(self.conn)
+            for table in ("tasks", "projects"):
+                report[table] = self.conn.execute(
+                    f"UPDATE {table} SET description = description_text(description, "
+                    "description_blob), description_blob = NULL WHERE description_blob IS NOT NULL"
+                ).rowcount
+            self._set_search_mode(compressed=False)
+        self._compress_threshold = None
+        self._forget_cached()
+        return report
 
     # ---------- Tables ----------
+    # Таблицы и индексы создаются миграциями (database/migrations.py);
+    # методы оставлены для совместимости и просто доводят схему до актуальной.
     def create_task_table(self) -> None:
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL DEFAULT '',
-                priority INTEGER NOT NULL CHECK(priority IN (1,2,3)),
-                status TEXT NOT NULL CHECK(status IN ('pending','in_progress','completed')) DEFAULT 'pending',
-                due_date TEXT NOT NULL,
-                project_id INTEGER NULL,
-                assignee_id INTEGER NULL,
-                FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE SET NULL,
-                FOREIGN KEY(assignee_id) REFERENCES users(id) ON DELETE SET NULL
-            )
-            """,
-            commit=True,
-        )
+        self.migrate()
 
     def create_project_table(self) -> None:
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT NOT NULL DEFAULT '',
-                start_date TEXT NOT NULL,
-                end_date TEXT NOT NULL,
-                status TEXT NOT NULL CHECK(status IN ('active','completed','on_hold')) DEFAULT 'active'
-            )
-            """,
-            commit=True,
-        )
+        self.migrate()
 
     def create_user_table(self) -> None:
-        self._execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                email TEXT NOT NULL,
-                role TEXT NOT NULL CHECK(role IN ('admin','manager','developer')),
-                registration_date TEXT NOT NULL
-            )
-            """,
-            commit=True,
-        )
+        self.migrate()
 
-    # Совместимость с тестами: единый вызов создания всех таблиц
     def create_tables(self) -> None:
-        # порядок важен из-за внешних ключей
-        self.create_user_table()
-        self.create_project_table()
-        self.create_task_table()
+        self.migrate()
 
     # ---------- Tasks CRUD ----------
+    @_queued
     def add_task(self, task: Task) -> int:
-        cur = self._execute(
-            """
-            INSERT INTO tasks(title, description, priority, status, due_date, project_id, assignee_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                task.title,
-                task.description,
-                task.priority,
-                task.status,
-                _dt_to_str(task.due_date),
-                task.project_id,
-                task.assignee_id,
-            ),
-            commit=True,
-        )
+        params = _task_params(task, self._codec, self._pack_description)
+        cur = self._execute(_INSERT_TASK_SQL, params, commit=True)
         return int(cur.lastrowid)
 
+    @_queued
+    def add_tasks_many(
+        self, tasks: Iterable[Task], chunk_size: int = _BULK_CHUNK_SIZE
+    ) -> List[int]:
+        """
+        Массовая вставка задач. Возвращает id в порядке входных задач.
+        Каждая задача проходит Task.validate(): объекты могли изменить после создания.
+        """
+        pack = self._pack_description
+        rows = (_task_params(t.validate(), self._codec, pack) for t in tasks)
+        return self._insert_many(_INSERT_TASK_SQL, rows, chunk_size)
+
     def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
-        row = self._execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
-        return dict(row) if row else None
+        return self._get_by_id("tasks", task_id)
+
+    def get_all_tasks(
+        self, cache: bool = True, columns: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        columns — проекция, например ("title", "status"): остальные колонки
+        (в первую очередь длинные description) не читаются. Так же у всех списков задач.
+        """
+        rows = self._execute(
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks ORDER BY id",
+            tables=("tasks",),
+            cache=cache,
+        ).fetchall()
+        return self._rows("tasks", rows)
+
+    def get_task_columns(
+        self, task_ids: Iterable[int], columns: Iterable[str], cache: bool = True
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Догрузка колонок для пачки задач: {id: {колонка: значение}}.
+        Отсутствующие id в ответ не попадают.
+        """
+        select = _select_list(columns, "tasks")
+        ids = sorted(set(task_ids))
+        res: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), _BULK_CHUNK_SIZE):
+            chunk = tuple(ids[start:start + _BULK_CHUNK_SIZE])
+            rows = self._execute(
+                f"SELECT {select} FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+                tables=("tasks",),
+                cache=cache,
+            ).fetchall()
+            for row in self._rows("tasks", rows):
+                res[row["id"]] = row
+        return res
+
+    def page_tasks(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+        columns: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Следующие limit задач с id > after_id (keyset-пагинация)."""
+        return self._page("tasks", after_id, limit, columns)
 
-    def get_all_tasks(self) -> List[Dict[str, Any]]:
-        rows = self._execute("SELECT * FROM tasks ORDER BY id").fetchall()
-        return [dict(r) for r in rows]
+    def iter_tasks(
+        self, batch_size: int = _ITER_BATCH_SIZE, columns: Optional[Iterable[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Потоковый обход всех задач страницами по batch_size строк."""
+        return self._iter("tasks", batch_size, columns)
 
-    def update_task(self, task_id: int, **kwargs) -> int:
-        allowed = {"title", "description", "priority", "status", "due_date", "project_id", "assignee_id"}
+    def find_tasks(
+        self,
+        order_by: str = "id",
+        limit: Optional[int] = None,
+        cache: bool = True,
+        columns: Optional[Iterable[str]] = None,
+        **filters: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Один параметризованный SELECT по фильтрам:
+        find_tasks(status=["pending", "in_progress"], priority=1, project_id=3,
+                   due_before=datetime(...), order_by="-due_date", limit=100)
+        """
+        where, params = _task_where(filters, self._codec)
+        params.append(-1 if limit is None else int(limit))
+        sql = (
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks{where}"
+            f"{_task_order_by(order_by)} LIMIT ?"
+        )
+        rows = self._execute(sql, tuple(params), tables=("tasks",), cache=cache).fetchall()
+        return self._rows("tasks", rows)
+
+    def get_overdue_tasks(
+        self,
+        now: datetime,
+        limit: Optional[int] = None,
+        project_id: Optional[int] = None,
+        assignee_id: Optional[int] = None,
+        cache: bool = True,
+        columns: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Просроченные задачи: status != 'completed' AND due_date <= now.
+        Условие записано как status IN (...) AND due_date <= ?, чтобы идти по индексу
+        (status, due_date). project_id/assignee_id=None — без фильтра.
+        """
+        conds = [f"status IN ({', '.join('?' * len(_OPEN_TASK_STATUSES))})", "due_date <= ?"]
+        encode = self._codec.encode
+        params: List[Any] = [encode("tasks", "status", s) for s in _OPEN_TASK_STATUSES]
+        params.append(encode("tasks", "due_date", now))
+        for column, value in (("project_id", project_id), ("assignee_id", assignee_id)):
+            if value is not None:
+                conds.append(f"{column} = ?")
+                params.append(value)
+        params.append(-1 if limit is None else int(limit))
+        rows = self._execute(
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks WHERE {' AND '.join(conds)}"
+            " ORDER BY due_date, id LIMIT ?",
+            tuple(params),
+            tables=("tasks",),
+            cache=cache,
+        ).fetchall()
+        return self._rows("tasks", rows)
+
+    def count_tasks(self, filters: Optional[Dict[str, Any]] = None, cache: bool = True) -> int:
+        """COUNT(*) с теми же фильтрами, что у find_tasks, например {"status": "pending"}."""
+        where, params = _task_where(filters, self._codec)
+        cur = self._execute(
+            f"SELECT COUNT(*) FROM tasks{where}", tuple(params), tables=("tasks",), cache=cache
+        )
+        return int(cur.fetchone()[0])
+
+    @_queued
+    def update_task(
+        self, task_id: int, returning: bool = False, **kwargs
+    ) -> Union[int, Optional[Dict[str, Any]]]:
+        """
+        Обновить поля. Возвращает rowcount, а с returning=True — обновлённую строку
+        (None, если её нет) тем же запросом, без отдельного SELECT.
+        """
         if not kwargs:
-            return 0
-        for k in kwargs:
-            if k not in allowed:
-                raise ValueError(f"invalid field for task: {k}")
-        fields = []
-        params: List[Any] = []
-        for k, v in kwargs.items():
-            if k == "due_date" and isinstance(v, datetime):
-                v = _dt_to_str(v)
-            fields.append(f"{k} = ?")
-            params.append(v)
+            return self.get_task_by_id(task_id) if returning else 0
+        set_sql, params = self._task_set(kwargs)
         params.append(task_id)
-        sql = f"UPDATE tasks SET {', '.join(fields)} WHERE id = ?"
-        cur = self._execute(sql, tuple(params), commit=True)
-        return cur.rowcount
+        sql = f"UPDATE tasks SET {set_sql} WHERE id = ?"
+        return self._update_row("tasks", task_id, sql, tuple(params), returning)
+
+    def _task_set(self, fields: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        # SET-часть UPDATE tasks: имена по белому списку, значения — параметрами
+        for k in fields:
+            if k not in _TASK_UPDATE_FIELDS:
+                raise ValueError(f"invalid field for task: {k}")
+        return self._set_clause("tasks", fields)
+
+    def _set_clause(self, table: str, fields: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        # description пишется парой колонок: текст или '' + сжатый блоб
+        encode = self._codec.encode
+        assignments, params = [], []
+        for k, v in fields.items():
+            if k == "description":
+                assignments.append("description = ?, description_blob = ?")
+                params.extend(self._pack_description(v))
+            else:
+                assignments.append(f"{k} = ?")
+                params.append(encode(table, k, v))
+        return ", ".join(assignments), params
+
+    @_queued
+    def update_tasks_where(
+        self, filters: Dict[str, Any], return_ids: bool = False, **fields: Any
+    ) -> Union[int, List[int]]:
+        """
+        Один UPDATE по фильтру find_tasks (например {"project_id": 3, "status": "pending"}
+        или {"id": [1, 2, 3]}). Поля — как у update_task. Возвращает число изменённых строк,
+        с return_ids=True — их id по возрастанию. Пустой фильтр запрещён: обновить всю
+        таблицу можно только явно перечислив условие.
+        """
+        if not filters:
+            raise ValueError("filters must not be empty")
+        if not fields:
+            raise ValueError("nothing to update")
+        ids = filters.get("id")
+        if isinstance(ids, (list, tuple, set, frozenset)) and len(ids) > _BULK_CHUNK_SIZE:
+            return self._update_tasks_chunked(filters, ids, return_ids, fields)
+        set_sql, set_params = self._task_set(fields)
+        where, where_params = _task_where(filters, self._codec)
+        sql = f"UPDATE tasks SET {set_sql}{where}"
+        params = tuple(set_params + where_params)
+        # id нужны и для точечного сброса кеша строк
+        if not return_ids and self.entity_cache is None:
+            with self.transaction():
+                return self._execute(sql, params).rowcount
+        changed = self._update_tasks_ids(sql, params, where, tuple(where_params))
+        return changed if return_ids else len(changed)
+
+    def _update_tasks_chunked(
+        self, filters: Dict[str, Any], ids: Iterable[int], return_ids: bool, fields: Dict[str, Any]
+    ) -> Union[int, List[int]]:
+        # длинный список id — пачками, чтобы не упереться в лимит параметров SQLite
+        rest = {k: v for k, v in filters.items() if k != "id"}
+        with self.transaction():
+            parts = [
+                self.update_tasks_where({**rest, "id": list(chunk)}, return_ids, **fields)
+                for chunk in _chunked(ids, _BULK_CHUNK_SIZE)
+            ]
+        return sorted(i for p in parts for i in p) if return_ids else sum(parts)
 
+    def _update_tasks_ids(
+        self, sql: str, params: Tuple[Any, ...], where: str, where_params: Tuple[Any, ...]
+    ) -> List[int]:
+        # UPDATE с id изменённых строк: RETURNING или (старый SQLite) SELECT перед UPDATE
+        with self.transaction():
+            if _HAS_RETURNING:
+                changed = sorted(r[0] for r in self._execute(sql + " RETURNING id", params))
+            else:
+                select = f"SELECT id FROM tasks{where} ORDER BY id"
+                changed = [r[0] for r in self._execute(select, where_params)]
+                self._execute(sql, params)
+        for task_id in changed:
+            self._invalidate("tasks", task_id)
+        return changed
+
+    @_queued
     def delete_task(self, task_id: int) -> int:
         cur = self._execute("DELETE FROM tasks WHERE id = ?", (task_id,), commit=True)
+        self._invalidate("tasks", task_id)
         return cur.rowcount
 
-    def search_tasks(self, query: str) -> List[Dict[str, Any]]:
+    def search_tasks(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        rank: bool = False,
+        snippet: bool = False,
+        cache: bool = True,
+        columns: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск по названию и описанию.
+        Через FTS5 ищутся слова по префиксу; rank=True сортирует по релевантности (bm25),
+        иначе по id. snippet=True добавляет в строки ключ "snippet" с подсветкой совпадений.
+        Без FTS5 (или для ввода без слов) — прежний LIKE по подстроке, snippet там None.
+        """
+        match = _fts_match(query)
+        if match and self._has_fts():
+            snippet_sql = (
+                f", snippet(tasks_fts, -1, '{_SNIPPET_OPEN}', '{_SNIPPET_CLOSE}', '…', 12)"
+                " AS snippet"
+                if snippet else ""
+            )
+            order = "tasks_fts.rank" if rank else "t.id"
+            try:
+                rows = self._execute(
+                    f"""
+                    SELECT {_select_list(columns, "tasks", "t.")}{snippet_sql}
+                    FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+                    WHERE tasks_fts MATCH ?
+                    ORDER BY {order}
+                    LIMIT ?
+                    """,
+                    (match, -1 if limit is None else int(limit)),
+                    tables=("tasks", "tasks_fts"),
+                    cache=cache,
+                ).fetchall()
+                return self._rows("tasks", rows)
+            except sqlite3.OperationalError:
+                # повреждённый/несовместимый индекс не должен ломать поиск
+                pass
         q = f"%{query}%"
+        description = (
+            "description_text(description, description_blob)"
+            if self._is_compressed() else "description"
+        )
         rows = self._execute(
-            "SELECT * FROM tasks WHERE title LIKE ? OR description LIKE ? ORDER BY id", (q, q)
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks"
+            f" WHERE title LIKE ? OR {description} LIKE ? ORDER BY id LIMIT ?",
+            (q, q, -1 if limit is None else int(limit)),
+            tables=("tasks",),
+            cache=cache,
         ).fetchall()
-        return [dict(r) for r in rows]
+        result = self._rows("tasks", rows)
+        if snippet:
+            for r in result:
+                r["snippet"] = None
+        return result
 
-    def get_tasks_by_project(self, project_id: int) -> List[Dict[str, Any]]:
+    def get_tasks_by_project(
+        self, project_id: int, cache: bool = True, columns: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
         rows = self._execute(
-            "SELECT * FROM tasks WHERE project_id = ? ORDER BY id", (project_id,)
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks WHERE project_id = ? ORDER BY id",
+            (project_id,),
+            tables=("tasks",), cache=cache,
         ).fetchall()
-        return [dict(r) for r in rows]
+        return self._rows("tasks", rows)
 
-    def get_tasks_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+    def get_tasks_by_user(
+        self, user_id: int, cache: bool = True, columns: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
         rows = self._execute(
-            "SELECT * FROM tasks WHERE assignee_id = ? ORDER BY id", (user_id,)
+            f"SELECT {_select_list(columns, 'tasks')} FROM tasks WHERE assignee_id = ? ORDER BY id",
+            (user_id,),
+            tables=("tasks",), cache=cache,
         ).fetchall()
-        return [dict(r) for r in rows]
+        return self._rows("tasks", rows)
 
     # ---------- Projects CRUD ----------
+    @_queued
     def add_project(self, project: Project) -> int:
         cur = self._execute(
-            """
-            INSERT INTO projects(name, description, start_date, end_date, status)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                project.name,
-                project.description,
-                _dt_to_str(project.start_date),
-                _dt_to_str(project.end_date),
-                project.status,
-            ),
+            _INSERT_PROJECT_SQL,
+            _project_params(project, self._codec, self._pack_description),
             commit=True,
         )
         return int(cur.lastrowid)
 
+    @_queued
+    def add_projects_many(
+        self, projects: Iterable[Project], chunk_size: int = _BULK_CHUNK_SIZE
+    ) -> List[int]:
+        """Массовая вставка проектов (каждый через Project.validate()); id в порядке входа."""
+        pack = self._pack_description
+        rows = (_project_params(p.validate(), self._codec, pack) for p in projects)
+        return self._insert_many(_INSERT_PROJECT_SQL, rows, chunk_size)
+
     def get_project_by_id(self, project_id: int) -> Optional[Dict[str, Any]]:
-        row = self._execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
-        return dict(row) if row else None
+        return self._get_by_id("projects", project_id)
 
-    def get_all_projects(self) -> List[Dict[str, Any]]:
-        rows = self._execute("SELECT * FROM projects ORDER BY id").fetchall()
-        return [dict(r) for r in rows]
+    def get_all_projects(self, cache: bool = True) -> List[Dict[str, Any]]:
+        rows = self._execute(
+            "SELECT * FROM projects ORDER BY id", tables=("projects",), cache=cache
+        ).fetchall()
+        return self._rows("projects", rows)
 
-    def update_project(self, project_id: int, **kwargs) -> int:
+    def page_projects(
+        self, after_id: Optional[int] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        return self._page("projects", after_id, limit)
+
+    def iter_projects(self, batch_size: int = _ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        return self._iter("projects", batch_size)
+
+    def count_projects(self, filters: Optional[Dict[str, Any]] = None, cache: bool = True) -> int:
+        return self._count("projects", filters, _PROJECT_COLUMNS, cache)
+
+    def get_project_task_counts(
+        self, project_id: int, cache: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Одним запросом: даты проекта, всего задач и сколько завершено.
+        Счётчики берутся из task_counters, tasks не сканируется. None, если проекта нет.
+        """
+        row = self._execute(
+            _PROJECT_TASK_COUNTS_SQL + " WHERE p.id = ? GROUP BY p.id",
+            (self._codec.encode("tasks", "status", "completed"), project_id),
+            tables=("projects", "task_counters"),
+            cache=cache,
+        ).fetchone()
+        return self._row("projects", row)
+
+    def get_all_project_task_counts(self, cache: bool = True) -> List[Dict[str, Any]]:
+        """То же для всех проектов одним GROUP BY."""
+        rows = self._execute(
+            _PROJECT_TASK_COUNTS_SQL + " GROUP BY p.id ORDER BY p.id",
+            (self._codec.encode("tasks", "status", "completed"),),
+            tables=("projects", "task_counters"),
+            cache=cache,
+        ).fetchall()
+        return self._rows("projects", rows)
+
+    @_queued
+    def update_project(
+        self, project_id: int, returning: bool = False, **kwargs
+    ) -> Union[int, Optional[Dict[str, Any]]]:
+        """Как update_task: rowcount или, с returning=True, обновлённая строка."""
         allowed = {"name", "description", "start_date", "end_date", "status"}
         if not kwargs:
-            return 0
+            return self.get_project_by_id(project_id) if returning else 0
         for k in kwargs:
             if k not in allowed:
                 raise ValueError(f"invalid field for project: {k}")
-        fields, params = [], []
-        for k, v in kwargs.items():
-            if k in {"start_date", "end_date"} and isinstance(v, datetime):
-                v = _dt_to_str(v)
-            fields.append(f"{k} = ?")
-            params.append(v)
+        set_sql, params = self._set_clause("projects", kwargs)
         params.append(project_id)
-        sql = f"UPDATE projects SET {', '.join(fields)} WHERE id = ?"
-        cur = self._execute(sql, tuple(params), commit=True)
-        return cur.rowcount
+        sql = f"UPDATE projects SET {set_sql} WHERE id = ?"
+        return self._update_row("projects", project_id, sql, tuple(params), returning)
 
+    @_queued
     def delete_project(self, project_id: int) -> int:
         cur = self._execute("DELETE FROM projects WHERE id = ?", (project_id,), commit=True)
+        self._invalidate("projects", project_id)
+        if self.entity_cache is not None:
+            # ON DELETE SET NULL обнулил project_id у задач проекта
+            self.entity_cache.invalidate_where("tasks", "project_id", project_id)
         return cur.rowcount
 
+    @_queued
+    def move_tasks(
+        self, from_project_id: int, to_project_id: Optional[int], return_ids: bool = False
+    ) -> Union[int, List[int]]:
+        """Перенести все задачи проекта в другой (None — без проекта) одним UPDATE."""
+        if from_project_id == to_project_id:
+            raise ValueError("source and target project are the same")
+        return self.update_tasks_where(
+            {"project_id": from_project_id}, return_ids, project_id=to_project_id
+        )
+
+    # ---------- Task counters ----------
+    def rebuild_task_counters(self) -> None:
+        """Пересчитать task_counters по tasks (после ручных правок базы)."""
+        with self.transaction():
+            rebuild_task_counters(self.conn)
+        if self.result_cache is not None:
+            self.result_cache.bump(("task_counters",))
+
+    def verify_task_counters(self) -> List[Dict[str, Any]]:
+        """
+        Сверяет task_counters с фактическими GROUP BY по tasks.
+        Пустой список — расхождений нет.
+        """
+        actual: Dict[Tuple[str, int, Any], int] = {}
+        for scope, column in COUNTER_SCOPES.items():
+            for r in self._execute(
+                f"SELECT {column}, status, COUNT(*) FROM tasks "
+                f"WHERE {column} IS NOT NULL GROUP BY {column}, status"
+            ):
+                actual[(scope, r[0], r[1])] = r[2]
+        stored = {
+            (r[0], r[1], r[2]): r[3]
+            for r in self._execute(
+                "SELECT scope, owner_id, status, n FROM task_counters WHERE n != 0"
+            )
+        }
+        return [
+            {"scope": k[0], "owner_id": k[1], "status": k[2],
+             "stored": stored.get(k, 0), "actual": actual.get(k, 0)}
+            for k in sorted(actual.keys() | stored.keys(), key=repr)
+            if stored.get(k, 0) != actual.get(k, 0)
+        ]
+
+    def get_user_task_counts(self, user_id: int, cache: bool = True) -> Dict[str, int]:
+        """{статус: количество задач} пользователя — чтение по первичному ключу task_counters."""
+        rows = self._execute(
+            "SELECT status, n FROM task_counters WHERE scope = 'user' AND owner_id = ?",
+            (user_id,),
+            tables=("task_counters",),
+            cache=cache,
+        ).fetchall()
+        decode = self._codec.decode_value
+        return {decode("tasks", "status", r["status"]): r["n"] for r in rows if r["n"]}
+
+    def get_all_user_task_counts(self, cache: bool = True) -> Dict[int, Dict[str, int]]:
+        """{user_id: {статус: количество}} для пользователей, у которых есть задачи."""
+        res: Dict[int, Dict[str, int]] = {}
+        decode = self._codec.decode_value
+        for r in self._execute(
+            "SELECT owner_id, status, n FROM task_counters WHERE scope = 'user' AND n != 0",
+            tables=("task_counters",),
+            cache=cache,
+        ):
+            res.setdefault(r["owner_id"], {})[decode("tasks", "status", r["status"])] = r["n"]
+        return res
+
     # ---------- Users CRUD ----------
+    @_queued
     def add_user(self, user: User) -> int:
-        cur = self._execute(
-            """
-            INSERT INTO users(username, email, role, registration_date)
-            VALUES (?, ?, ?, ?)
-            """,
-            (user.username, user.email, user.role, _dt_to_str(user.registration_date)),
-            commit=True,
-        )
+        cur = self._execute(_INSERT_USER_SQL, _user_params(user, self._codec), commit=True)
         return int(cur.lastrowid)
 
+    @_queued
+    def add_users_many(
+        self, users: Iterable[User], chunk_size: int = _BULK_CHUNK_SIZE
+    ) -> List[int]:
+        """Массовая вставка пользователей (каждый через User.validate()); id в порядке входа."""
+        rows = (_user_params(u.validate(), self._codec) for u in users)
+        return self._insert_many(_INSERT_USER_SQL, rows, chunk_size)
+
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
-        row = self._execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
-        return dict(row) if row else None
+        return self._get_by_id("users", user_id)
 
-    def get_all_users(self) -> List[Dict[str, Any]]:
-        rows = self._execute("SELECT * FROM users ORDER BY id").fetchall()
-        return [dict(r) for r in rows]
+    def get_all_users(self, cache: bool = True) -> List[Dict[str, Any]]:
+        rows = self._execute(
+            "SELECT * FROM users ORDER BY id", tables=("users",), cache=cache
+        ).fetchall()
+        return self._rows("users", rows)
+
+    def page_users(self, after_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return self._page("users", after_id, limit)
 
-    def update_user(self, user_id: int, **kwargs) -> int:
+    def iter_users(self, batch_size: int = _ITER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        return self._iter("users", batch_size)
+
+    def count_users(self, filters: Optional[Dict[str, Any]] = None, cache: bool = True) -> int:
+        return self._count("users", filters, _USER_COLUMNS, cache)
+
+    @_queued
+    def update_user(
+        self, user_id: int, returning: bool = False, **kwargs
+    ) -> Union[int, Optional[Dict[str, Any]]]:
+        """Как update_task: rowcount или, с returning=True, обновлённая строка."""
         allowed = {"username", "email", "role", "registration_date"}
         if not kwargs:
-            return 0
+            return self.get_user_by_id(user_id) if returning else 0
         for k in kwargs:
             if k not in allowed:
                 raise ValueError(f"invalid field for user: {k}")
         fields, params = [], []
         for k, v in kwargs.items():
-            if k == "registration_date" and isinstance(v, datetime):
-                v = _dt_to_str(v)
             fields.append(f"{k} = ?")
-            params.append(v)
+            params.append(self._codec.encode("users", k, v))
         params.append(user_id)
         sql = f"UPDATE users SET {', '.join(fields)} WHERE id = ?"
-        cur = self._execute(sql, tuple(params), commit=True)
-        return cur.rowcount
+        return self._update_row("users", user_id, sql, tuple(params), returning)
+
+    @_queued
+    def reassign_tasks(
+        self, from_user_id: int, to_user_id: Optional[int], return_ids: bool = False
+    ) -> Union[int, List[int]]:
+        """Передать все задачи пользователя другому (None — снять исполнителя) одним UPDATE."""
+        if from_user_id == to_user_id:
+            raise ValueError("source and target user are the same")
+        return self.update_tasks_where(
+            {"assignee_id": from_user_id}, return_ids, assignee_id=to_user_id
+        )
+
+    @_queued
+    def delete_users_many(self, user_ids: Iterable[int], reassign_to: Optional[int] = None) -> int:
+        """
+        Удалить пользователей одной транзакцией. С reassign_to их задачи сначала
+        переходят к нему одним UPDATE ... WHERE assignee_id IN (...); без него
+        исполнитель обнуляется каскадом ON DELETE SET NULL (по индексу assignee_id).
+        Возвращает число удалённых пользователей.
+        """
+        ids = sorted(set(user_ids))
+        if reassign_to is not None and reassign_to in ids:
+            raise ValueError("cannot reassign tasks to a user being deleted")
+        with self.transaction():
+            deleted = sum(
+                self._delete_users_chunk(chunk, reassign_to)
+                for chunk in _chunked(ids, _BULK_CHUNK_SIZE)
+            )
+        self._forget_users(ids, tasks_nulled=reassign_to is None)
+        return deleted
+
+    def _delete_users_chunk(self, chunk: List[int], reassign_to: Optional[int]) -> int:
+        # вызывать внутри транзакции: переназначение задач и DELETE одной пачки id
+        if reassign_to is not None:
+            self.update_tasks_where({"assignee_id": chunk}, assignee_id=reassign_to)
+        marks = ", ".join("?" * len(chunk))
+        return self._execute(f"DELETE FROM users WHERE id IN ({marks})", tuple(chunk)).rowcount
+
+    def _forget_users(self, ids: List[int], tasks_nulled: bool) -> None:
+        # кеш строк: удалённые пользователи и задачи, обнулённые каскадом SET NULL
+        for user_id in ids:
+            self._invalidate("users", user_id)
+        if self.entity_cache is not None and tasks_nulled:
+            for user_id in ids:
+                self.entity_cache.invalidate_where("tasks", "assignee_id", user_id)
 
+    @_queued
     def delete_user(self, user_id: int) -> int:
         cur = self._execute("DELETE FROM users WHERE id = ?", (user_id,), commit=True)
+        self._invalidate("users", user_id)
+        if self.entity_cache is not None:
+            self.entity_cache.invalidate_where("tasks", "assignee_id", user_id)
         return cur.rowcount
\ No newline at end of file
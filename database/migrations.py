@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List
+
+from database.codecs import (
+    DATE_COLUMNS,
+    ENUM_COLUMNS,
+    PROJECT_STATUS_CODES,
+    ROLE_CODES,
+    TASK_STATUS_CODES,
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Шаг схемы. Версия пишется в PRAGMA user_version после успешного apply,
+    поэтому каждый шаг выполняется ровно один раз.
+    """
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _run(conn: sqlite3.Connection, *statements: str) -> None:
+    # executescript делает неявный COMMIT, поэтому выполняем по одному выражению
+    for sql in statements:
+        conn.execute(sql)
+
+
+def _check_in(column: str, values) -> str:
+    return f"CHECK({column} IN ({','.join(repr(v) for v in values)}))"
+
+
+def table_ddl(
+    table: str, compact: bool = False, name: str | None = None, description_blob: bool = True
+) -> str:
+    """
+    CREATE TABLE для users/projects/tasks.
+    compact=True — даты INTEGER (секунды эпохи), статусы/роли INTEGER-кодами (database/codecs.py).
+    description_blob — колонка сжатого описания (codecs.compress_text), тогда description = ''.
+    Её добавляет миграция 5; миграция 1 создаёт таблицы без неё (description_blob=False).
+    Колонка последняя: чтение остальных колонок не проходит через её overflow-страницы.
+    """
+    name = name or table
+    blob = ",\n            description_blob BLOB NULL" if description_blob else ""
+    if compact:
+        date_type = "INTEGER"
+        task_status = _check_in("status", TASK_STATUS_CODES.values()) + " DEFAULT 0"
+        project_status = _check_in("status", PROJECT_STATUS_CODES.values()) + " DEFAULT 0"
+        role = "role INTEGER NOT NULL " + _check_in("role", ROLE_CODES.values())
+        status_type = "INTEGER"
+    else:
+        date_type = "TEXT"
+        task_status = _check_in("status", TASK_STATUS_CODES) + " DEFAULT 'pending'"
+        project_status = _check_in("status", PROJECT_STATUS_CODES) + " DEFAULT 'active'"
+        role = "role TEXT NOT NULL " + _check_in("role", ROLE_CODES)
+        status_type = "TEXT"
+    if table == "users":
+        return f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            email TEXT NOT NULL,
+            {role},
+            registration_date {date_type} NOT NULL
+        )
+        """
+    if table == "projects":
+        return f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            start_date {date_type} NOT NULL,
+            end_date {date_type} NOT NULL,
+            status {status_type} NOT NULL {project_status}{blob}
+        )
+        """
+    if table == "tasks":
+        return f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            priority INTEGER NOT NULL CHECK(priority IN (1,2,3)),
+            status {status_type} NOT NULL {task_status},
+            due_date {date_type} NOT NULL,
+            project_id INTEGER NULL,
+            assignee_id INTEGER NULL{blob},
+            FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE SET NULL,
+            FOREIGN KEY(assignee_id) REFERENCES users(id) ON DELETE SET NULL
+        )
+        """
+    raise ValueError(f"unknown table: {table}")
+
+
+def _base_tables(conn: sqlite3.Connection) -> None:
+    # IF NOT EXISTS: базы, созданные до появления миграций, имеют user_version = 0.
+    # DDL версии 1 не меняется: колонки последующих версий добавляют их миграции
+    _run(conn, *(table_ddl(t, description_blob=False) for t in ("users", "projects", "tasks")))
+
+
+def _hot_path_indexes(conn: sqlite3.Connection) -> None:
+    # project_id/assignee_id: выборки по проекту/исполнителю и каскады ON DELETE SET NULL;
+    # (status, due_date): просроченные задачи
+    _run(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_tasks_project_id ON tasks(project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assignee_id ON tasks(assignee_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_due_date ON tasks(status, due_date)",
+    )
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'"
+    ).fetchone()
+    return row is not None
+
+
+def _task_search_index(conn: sqlite3.Connection) -> None:
+    create_search_index(conn, compressed=False)
+
+
+def is_compressed(conn: sqlite3.Connection) -> bool:
+    """Режим сжатых описаний: FTS читает текст через представление tasks_text."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'tasks_text'"
+    ).fetchone()
+    return row is not None
+
+
+def drop_search_index(conn: sqlite3.Connection) -> None:
+    _run(
+        conn,
+        "DROP TRIGGER IF EXISTS tasks_fts_ai",
+        "DROP TRIGGER IF EXISTS tasks_fts_ad",
+        "DROP TRIGGER IF EXISTS tasks_fts_au",
+        "DROP TABLE IF EXISTS tasks_fts",
+        "DROP VIEW IF EXISTS tasks_text",
+    )
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"SELECT * FROM pragma_table_info('{table}')")]
+
+
+def create_search_index(
+    conn: sqlite3.Connection, compressed: bool, rebuild: bool = True
+) -> None:
+    """
+    FTS5-индекс tasks_fts с триггерами. compressed=True — текст описания берётся через
+    SQL-функцию description_text(description, description_blob): её регистрирует
+    DatabaseManager, поэтому в этом режиме писать в tasks могут только соединения с ней.
+    rebuild=False — индекс уже заполнен, пересоздаются только недостающие триггеры.
+    """
+    if compressed:
+        # представление — ещё и признак режима (is_compressed), поэтому создаётся и без FTS5
+        content = "tasks_text"
+        text = "description_text({0}.description, {0}.description_blob)"
+        _run(
+            conn,
+            f"""
+            CREATE VIEW IF NOT EXISTS tasks_text AS
+            SELECT id, title, {text.format("tasks")} AS description FROM tasks
+            """,
+        )
+    else:
+        content = "tasks"
+        text = "{0}.description"
+    # без FTS5 search_tasks остаётся на LIKE
+    if not fts5_available(conn):
+        return
+    # до миграции 5 колонки description_blob ещё нет
+    watched = "title, description"
+    if "description_blob" in _columns(conn, "tasks"):
+        watched += ", description_blob"
+    new_text, old_text = text.format("new"), text.format("old")
+    # external content: текст хранится только в tasks, в индексе — токены
+    _run(
+        conn,
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description,
+            content='{content}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, {new_text});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, {old_text});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_au
+        AFTER UPDATE OF {watched} ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, {old_text});
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, {new_text});
+        END
+        """,
+    )
+    if rebuild:
+        conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+# scope -> колонка tasks, по которой ведётся счётчик
+COUNTER_SCOPES = {"project": "project_id", "user": "assignee_id"}
+
+
+def _counter_statements(event: str) -> str:
+    # тело триггера: +1 для new.* и/или -1 для old.* по каждому scope
+    parts = []
+    for scope, column in COUNTER_SCOPES.items():
+        if event in ("delete", "update"):
+            parts.append(
+                f"UPDATE task_counters SET n = n - 1 WHERE scope = '{scope}' "
+                f"AND owner_id = old.{column} AND status = old.status;"
+            )
+        if event in ("insert", "update"):
+            # WHERE перед ON CONFLICT обязателен: иначе парсер считает ON частью JOIN
+            parts.append(
+                f"INSERT INTO task_counters(scope, owner_id, status, n) "
+                f"SELECT '{scope}', new.{column}, new.status, 1 WHERE new.{column} IS NOT NULL "
+                f"ON CONFLICT(scope, owner_id, status) DO UPDATE SET n = n + 1;"
+            )
+    return "\n".join(parts)
+
+
+def rebuild_task_counters(conn: sqlite3.Connection) -> None:
+    """Пересчитывает task_counters с нуля по таблице tasks."""
+    selects = " UNION ALL ".join(
+        f"SELECT '{scope}', {column}, status, COUNT(*) FROM tasks "
+        f"WHERE {column} IS NOT NULL GROUP BY {column}, status"
+        for scope, column in COUNTER_SCOPES.items()
+    )
+    _run(
+        conn,
+        "DELETE FROM task_counters",
+        f"INSERT INTO task_counters(scope, owner_id, status, n) {selects}",
+    )
+
+
+def _task_counters(conn: sqlite3.Connection) -> None:
+    # status без типа: хранится в том же виде, что и tasks.status
+    _run(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS task_counters (
+            scope TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            status NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, owner_id, status)
+        ) WITHOUT ROWID
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_ai AFTER INSERT ON tasks BEGIN
+            {_counter_statements("insert")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_ad AFTER DELETE ON tasks BEGIN
+            {_counter_statements("delete")}
+        END
+        """,
+        # каскады ON DELETE SET NULL тоже UPDATE, поэтому удаление проекта/пользователя учтено
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_au
+        AFTER UPDATE OF status, project_id, assignee_id ON tasks BEGIN
+            {_counter_statements("update")}
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS projects_counters_ad AFTER DELETE ON projects BEGIN
+            DELETE FROM task_counters WHERE scope = 'project' AND owner_id = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_counters_ad AFTER DELETE ON users BEGIN
+            DELETE FROM task_counters WHERE scope = 'user' AND owner_id = old.id;
+        END
+        """,
+    )
+    rebuild_task_counters(conn)
+
+
+def is_compact(conn: sqlite3.Connection) -> bool:
+    """Компактная раскладка определяется по типу колонки tasks.due_date."""
+    row = conn.execute(
+        "SELECT type FROM pragma_table_info('tasks') WHERE name = 'due_date'"
+    ).fetchone()
+    return row is not None and str(row[0]).upper() == "INTEGER"
+
+
+def _compact_select(table: str, columns: List[str]) -> str:
+    # выражения SELECT, переводящие текстовую строку в компактную
+    exprs = []
+    for column in columns:
+        if column in DATE_COLUMNS.get(table, ()):
+            exprs.append(f"CAST(strftime('%s', {column}) AS INTEGER)")
+        elif column in ENUM_COLUMNS.get(table, {}):
+            codes = ENUM_COLUMNS[table][column]
+            cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in codes.items())
+            exprs.append(f"CASE {column} {cases} END")
+        else:
+            exprs.append(column)
+    return ", ".join(exprs)
+
+
+def convert_to_compact(conn: sqlite3.Connection) -> None:
+    """
+    Перестраивает users/projects/tasks в компактную раскладку на месте
+    (create new -> copy -> drop -> rename, как рекомендует документация SQLite).
+    Вызывать внутри транзакции и с PRAGMA foreign_keys = OFF.
+    Индексы и триггеры tasks пропадают вместе со старой таблицей и создаются заново.
+    """
+    compressed = is_compressed(conn)
+    # представление tasks_text помешало бы переименованию таблицы
+    drop_search_index(conn)
+    for table in ("users", "projects", "tasks"):
+        columns = _columns(conn, table)
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        ddl = table_ddl(
+            table, compact=True, name=f"{table}_compact",
+            description_blob="description_blob" in columns,
+        )
+        _run(
+            conn,
+            ddl,
+            f"INSERT INTO {table}_compact({', '.join(columns)}) "
+            f"SELECT {_compact_select(table, columns)} FROM {table}",
+            f"DROP TABLE {table}",
+            f"ALTER TABLE {table}_compact RENAME TO {table}",
+        )
+        if seq is not None:
+            # не даём AUTOINCREMENT повторно выдать id удалённых строк
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (seq[0], table))
+    _hot_path_indexes(conn)
+    create_search_index(conn, compressed)
+    _task_counters(conn)
+
+
+def _description_blobs(conn: sqlite3.Connection) -> None:
+    # и новые, и старые базы получают колонку здесь; NULL в строке почти не занимает места
+    for table in ("tasks", "projects"):
+        if "description_blob" not in _columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN description_blob BLOB NULL")
+    # триггер обновления индекса должен реагировать и на description_blob; индекс не меняется
+    conn.execute("DROP TRIGGER IF EXISTS tasks_fts_au")
+    create_search_index(conn, compressed=False, rebuild=False)
+
+
+# строго по возрастанию версии
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base tables", _base_tables),
+    Migration(2, "hot-path indexes on tasks", _hot_path_indexes),
+    Migration(3, "FTS5 search index for tasks", _task_search_index),
+    Migration(4, "trigger-maintained task counters", _task_counters),
+    Migration(5, "description_blob columns for compressed descriptions", _description_blobs),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
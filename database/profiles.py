@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """
+    Набор PRAGMA, применяемых к соединению.
+    cache_size < 0 — размер в КиБ (как в самом SQLite), > 0 — в страницах.
+    """
+    name: str
+    synchronous: str
+    mmap_size: int
+    cache_size: int
+    temp_store: str
+    busy_timeout: int
+    journal_mode: str = "WAL"
+
+    def pragmas(self) -> Dict[str, object]:
+        # journal_mode идёт первым: synchronous=NORMAL безопасен только в WAL
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+            "temp_store": self.temp_store,
+            "busy_timeout": self.busy_timeout,
+        }
+
+
+PROFILES: Dict[str, SQLiteProfile] = {
+    # каждый COMMIT доходит до диска
+    "durable": SQLiteProfile(
+        name="durable",
+        synchronous="FULL",
+        mmap_size=0,
+        cache_size=-2_000,
+        temp_store="DEFAULT",
+        busy_timeout=5_000,
+    ),
+    # WAL + NORMAL: при сбое питания можно потерять последние коммиты, но не целостность
+    "balanced": SQLiteProfile(
+        name="balanced",
+        synchronous="NORMAL",
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-16_000,
+        temp_store="MEMORY",
+        busy_timeout=5_000,
+    ),
+    # для импорта: без fsync, большой кеш; после загрузки вернуть прежний профиль
+    "bulk_load": SQLiteProfile(
+        name="bulk_load",
+        synchronous="OFF",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-262_144,
+        temp_store="MEMORY",
+        busy_timeout=30_000,
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def get_profile(profile: str | SQLiteProfile) -> SQLiteProfile:
+    if isinstance(profile, SQLiteProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"unknown profile: {profile}") from None
@@ -0,0 +1,193 @@
+"""
+Очередь записи с групповым коммитом.
+
+Один пишущий поток забирает операции из очереди и выполняет их на соединении
+писателя DatabaseManager группами: одна транзакция (BEGIN IMMEDIATE ... COMMIT)
+на группу, каждая операция — в своём SAVEPOINT, чтобы ошибка одной не откатывала
+соседей. Future операции получает результат после COMMIT группы.
+
+Группа — всё, что накопилось в очереди, пока шёл предыдущий коммит, но не больше
+max_batch операций; window > 0 — ещё столько секунд ждать новых операций.
+«database is locked» от других процессов не роняет группу: BEGIN IMMEDIATE
+повторяется с экспоненциальной паузой, пока не истечёт retry_for секунд.
+"""
+
+from __future__ import annotations
+
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from database.database_manager import DatabaseManager
+
+# паузы между попытками взять блокировку записи, секунды
+_BACKOFF_START = 0.001
+_BACKOFF_MAX = 0.1
+
+_Op = Tuple[Future, Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+class WriteQueue:
+    """
+    Пишущий поток DatabaseManager. submit(fn, *args) -> Future; fn выполняется
+    в пишущем потоке внутри групповой транзакции (обычно это метод записи менеджера).
+    """
+
+    def __init__(
+        self,
+        db: "DatabaseManager",
+        max_batch: int = 100,
+        window: float = 0.0,
+        retry_for: float = 30.0,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        if window < 0:
+            raise ValueError("window must be >= 0")
+        if retry_for < 0:
+            raise ValueError("retry_for must be >= 0")
+        self.max_batch = max_batch
+        self.window = window
+        self.retry_for = retry_for
+        self._db = db
+        self._queue: "queue.SimpleQueue[Optional[_Op]]" = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.groups = 0
+        self.ops = 0
+        self.max_group = 0
+        self.busy_retries = 0
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def thread_id(self) -> Optional[int]:
+        return self._thread.ident
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        fut: Future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def close(self) -> None:
+        """Выполнить уже поставленные операции и остановить поток."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "groups": self.groups,
+            "ops": self.ops,
+            "max_group": self.max_group,
+            "avg_group": self.ops / self.groups if self.groups else 0.0,
+            "busy_retries": self.busy_retries,
+        }
+
+    # ---------- пишущий поток ----------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            group, stop = self._collect(item)
+            self._commit(group)
+            if stop:
+                return
+
+    def _collect(self, first: _Op) -> Tuple[List[_Op], bool]:
+        group = [first]
+        deadline = time.monotonic() + self.window
+        while len(group) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _begin(self) -> None:
+        # IMMEDIATE: блокировку записи берём сразу, и «занято» случается только здесь,
+        # а не посреди группы
+        conn = self._db.conn
+        delay = _BACKOFF_START
+        deadline = time.monotonic() + self.retry_for
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or time.monotonic() + delay > deadline:
+                    raise
+            delay = self._backoff(delay)
+
+    def _backoff(self, delay: float) -> float:
+        self.busy_retries += 1
+        time.sleep(delay * random.uniform(0.5, 1.0))
+        return min(delay * 2, _BACKOFF_MAX)
+
+    def _commit(self, group: List[_Op]) -> None:
+        group = [op for op in group if op[0].set_running_or_notify_cancel()]
+        if not group:
+            return
+        try:
+            results = self._apply_group(group)
+        except Exception as e:
+            # BEGIN или COMMIT не удались — не зафиксировано ничего из группы
+            results = [(False, e)] * len(group)
+        else:
+            self.groups += 1
+            self.ops += len(group)
+            self.max_group = max(self.max_group, len(group))
+        for (fut, _, _, _), (ok, value) in zip(group, results):
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+
+    def _apply_group(self, group: List[_Op]) -> List[Tuple[bool, Any]]:
+        db = self._db
+        with db._write_lock:
+            self._begin()
+            try:
+                with db.transaction():
+                    return [self._apply(op) for op in group]
+            except BaseException:
+                self._abort()
+                raise
+
+    def _apply(self, op: _Op) -> Tuple[bool, Any]:
+        _, fn, args, kwargs = op
+        try:
+            with self._db.transaction():
+                return True, fn(*args, **kwargs)
+        except Exception as e:
+            return False, e
+
+    def _abort(self) -> None:
+        # группа не зафиксирована: пишущий поток не должен остаться посреди транзакции,
+        # иначе каждый следующий BEGIN IMMEDIATE упадёт
+        db = self._db
+        db._forget_cached()
+        if db.conn.in_transaction:
+            db.conn.rollback()
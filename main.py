@@ -29,9 +29,7 @@ def main():
         # Инициализация базы данных
         os.makedirs("database", exist_ok=True)
         db_manager = DatabaseManager("database/tasks.db")
-        db_manager.create_user_table()
-        db_manager.create_project_table()
-        db_manager.create_task_table()
+        db_manager.migrate()
 
         # Инициализация контроллеров
         task_controller = TaskController(db_manager)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Mapping
 
 
 _ALLOWED_PROJECT_STATUSES = {"active", "completed", "on_hold"}
@@ -14,7 +14,27 @@ def _ensure_dt(x: datetime | str) -> datetime:
     return datetime.fromisoformat(x)
 
 
-@dataclass
+def time_progress(start_date: datetime, end_date: datetime, now: Optional[datetime] = None) -> int:
+    """
+    Временной прогресс: 0% до старта, 100% после окончания, иначе доля пройденного времени.
+    now передают, когда считают сразу много проектов на один момент.
+    """
+    now = datetime.utcnow() if now is None else now
+    if now <= start_date:
+        return 0
+    if now >= end_date:
+        return 100
+    total = (end_date - start_date).total_seconds()
+    done = (now - start_date).total_seconds()
+    return max(0, min(100, int(done * 100 / total))) if total > 0 else 100
+
+
+def _check_dates(start_date: datetime, end_date: datetime) -> None:
+    if end_date < start_date:
+        raise ValueError("end_date must be >= start_date")
+
+
+@dataclass(slots=True, weakref_slot=True)
 class Project:
     id: Optional[int] = field(default=None, init=False)
     name: str = ""
@@ -29,28 +49,47 @@ class Project:
         self.description = str(description)
         self.start_date = _ensure_dt(start_date)
         self.end_date = _ensure_dt(end_date)
-        if self.end_date < self.start_date:
-            raise ValueError("end_date must be >= start_date")
+        _check_dates(self.start_date, self.end_date)
         self.status = "active"
 
-    def update_status(self, new_status: str) -> None:
-        if new_status not in _ALLOWED_PROJECT_STATUSES:
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Project":
+        """Сборка из строки БД без валидации: значения проверены при записи."""
+        p = cls.__new__(cls)
+        p.load_row(row)
+        return p
+
+    def load_row(self, row: Mapping[str, Any]) -> None:
+        """Перезаписать поля значениями строки БД (без валидации, как from_row)."""
+        self.id = row["id"]
+        self.name = row["name"]
+        self.description = row["description"]
+        start, end = row["start_date"], row["end_date"]
+        self.start_date = start if isinstance(start, datetime) else datetime.fromisoformat(start)
+        self.end_date = end if isinstance(end, datetime) else datetime.fromisoformat(end)
+        self.status = row["status"]
+
+    @staticmethod
+    def validate_status(status: str) -> str:
+        if status not in _ALLOWED_PROJECT_STATUSES:
             raise ValueError("invalid project status")
-        self.status = new_status
+        return status
+
+    def update_status(self, new_status: str) -> None:
+        self.status = self.validate_status(new_status)
+
+    def validate(self) -> "Project":
+        """Проверки конструктора для текущих значений: объект могли изменить после создания."""
+        _check_dates(_ensure_dt(self.start_date), _ensure_dt(self.end_date))
+        self.validate_status(self.status)
+        return self
 
     def get_progress(self) -> int:
         """
         Временной прогресс по проекту (если нет задач).
         0% до старта, 100% после окончания, иначе доля пройденного времени.
         """
-        now = datetime.utcnow()
-        if now <= self.start_date:
-            return 0
-        if now >= self.end_date:
-            return 100
-        total = (self.end_date - self.start_date).total_seconds()
-        done = (now - self.start_date).total_seconds()
-        return max(0, min(100, int(done * 100 / total))) if total > 0 else 100
+        return time_progress(self.start_date, self.end_date)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -72,6 +111,9 @@ class Project:
             return (self.id or 0) == other
         return NotImplemented
 
+    def __hash__(self) -> int:
+        return hash(self.id or 0)
+
     def __req__(self, other):
         if isinstance(other, int):
             return other == (self.id or 0)
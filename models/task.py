@@ -2,11 +2,18 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Mapping
 
 
 _ALLOWED_STATUSES = {"pending", "in_progress", "completed"}
 
+# колонки строки tasks; все, кроме id, можно не выбирать в списках и догрузить позже
+ROW_FIELDS = (
+    "id", "title", "description", "priority", "status", "due_date", "project_id", "assignee_id"
+)
+_ROW_LEN = len(ROW_FIELDS)
+_MISSING = object()
+
 
 def _ensure_dt(x: datetime | str) -> datetime:
     if isinstance(x, datetime):
@@ -15,7 +22,7 @@ def _ensure_dt(x: datetime | str) -> datetime:
     return datetime.fromisoformat(x)
 
 
-@dataclass
+@dataclass(slots=True, weakref_slot=True)
 class Task:
     # обязательные по заданию поля
     id: Optional[int] = field(default=None, init=False)
@@ -26,6 +33,8 @@ class Task:
     due_date: datetime = field(default_factory=datetime.utcnow)
     project_id: Optional[int] = None
     assignee_id: Optional[int] = None
+    # загрузчик колонок, не выбранных проекцией (controllers.hydration.DeferredLoader)
+    _deferred: Any = field(default=None, init=False, repr=False, compare=False)
 
     # конструктор по заданию
     def __init__(
@@ -40,19 +49,97 @@ class Task:
         self.id = None
         self.title = str(title).strip()
         self.description = str(description)
-        self.priority = int(priority)
-        if self.priority not in (1, 2, 3):
-            raise ValueError("priority must be 1, 2 or 3")
+        self.priority = self.validate_priority(int(priority))
         self.status = "pending"
         self.due_date = _ensure_dt(due_date)
         self.project_id = project_id
         self.assignee_id = assignee_id
+        self._deferred = None
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Task":
+        """
+        Сборка из строки БД без валидации: значения проверены при записи
+        (CHECK в схеме и конструктор), повторно их не разбираем.
+        """
+        t = cls.__new__(cls)
+        t._deferred = None
+        t.load_row(row)
+        return t
+
+    def load_row(self, row: Mapping[str, Any]) -> None:
+        """
+        Перезаписать поля значениями строки БД (без валидации, как from_row).
+        Колонки, которых нет в строке (проекция), не трогаются: загруженные значения
+        остаются, незаполненные догружаются при первом обращении.
+        """
+        if len(row) < _ROW_LEN:
+            self._load_partial(row)
+            return
+        try:
+            self.id = row["id"]
+            self.title = row["title"]
+            self.description = row["description"]
+            self.priority = row["priority"]
+            self.status = row["status"]
+            # без вызова _ensure_dt: это горячий цикл при загрузке списков
+            due = row["due_date"]
+            self.due_date = due if isinstance(due, datetime) else datetime.fromisoformat(due)
+            self.project_id = row["project_id"]
+            self.assignee_id = row["assignee_id"]
+        except KeyError:
+            # лишние ключи (snippet) при неполной проекции
+            self._load_partial(row)
+            return
+        # загрузчик снимаем только после записи всех полей: другой поток не должен
+        # застать пустой слот без загрузчика
+        self._deferred = None
+
+    def _load_partial(self, row: Mapping[str, Any]) -> None:
+        # только выбранные колонки; уже заполненные слоты не снимаются
+        get = row.get
+        for name in ROW_FIELDS:
+            value = get(name, _MISSING)
+            if value is _MISSING:
+                continue
+            if name == "due_date" and not isinstance(value, datetime):
+                value = datetime.fromisoformat(value)
+            setattr(self, name, value)
+
+    def load_deferred(self, row: Mapping[str, Any]) -> None:
+        """Дописать догруженные колонки, не трогая уже заполненные."""
+        self._load_partial(row)
+        self._deferred = None
+
+    def __getattr__(self, name: str) -> Any:
+        # вызывается только для незаполненного слота: колонка не была выбрана проекцией
+        if name not in ROW_FIELDS or self._deferred is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        self._deferred.load(self)
+        return object.__getattribute__(self, name)
+
+    @staticmethod
+    def validate_status(status: str) -> str:
+        if status not in _ALLOWED_STATUSES:
+            raise ValueError("invalid status")
+        return status
+
+    @staticmethod
+    def validate_priority(priority: int) -> int:
+        if priority not in (1, 2, 3):
+            raise ValueError("priority must be 1, 2 or 3")
+        return priority
+
+    def validate(self) -> "Task":
+        """Проверки конструктора для текущих значений: объект могли изменить после создания."""
+        self.validate_priority(self.priority)
+        self.validate_status(self.status)
+        _ensure_dt(self.due_date)
+        return self
 
     # методы по заданию
     def update_status(self, new_status: str) -> None:
-        if new_status not in _ALLOWED_STATUSES:
-            raise ValueError("invalid status")
-        self.status = new_status
+        self.status = self.validate_status(new_status)
 
     def is_overdue(self) -> bool:
         return self.status != "completed" and self.due_date <= datetime.now()
@@ -79,6 +166,11 @@ class Task:
             return (self.id or 0) == other
         return NotImplemented
 
+    # согласован с __eq__ (task == 5 -> hash как у 5); id меняется при сохранении,
+    # поэтому в множества и ключи словарей кладут уже сохранённые объекты
+    def __hash__(self) -> int:
+        return hash(self.id or 0)
+
     # обратное сравнение: 1 == task
     def __req__(self, other):
         if isinstance(other, int):
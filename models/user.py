@@ -2,12 +2,32 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Mapping
 
 _ALLOWED_ROLES = {"admin", "manager", "developer"}
 
 
-@dataclass
+def _check_email(email: str) -> str:
+    # Простая, но строгая валидация e-mail (для тестов достаточно)
+    if (
+        "@" not in email
+        or email.startswith("@")
+        or email.endswith("@")
+        or " " in email
+        or email.count("@") != 1
+        or "." not in email.split("@", 1)[1]
+    ):
+        raise ValueError("invalid email")
+    return email
+
+
+def _check_role(role: str) -> str:
+    if role not in _ALLOWED_ROLES:
+        raise ValueError("invalid role")
+    return role
+
+
+@dataclass(slots=True, weakref_slot=True)
 class User:
     id: Optional[int] = field(default=None, init=False)
     username: str = ""
@@ -18,46 +38,39 @@ class User:
     def __init__(self, username: str, email: str, role: str) -> None:
         self.id = None
         self.username = str(username).strip()
-        self.email = str(email).strip()
-
-        # Простая, но строгая валидация e-mail (для тестов достаточно)
-        if (
-            "@" not in self.email
-            or self.email.startswith("@")
-            or self.email.endswith("@")
-            or " " in self.email
-            or self.email.count("@") != 1
-            or "." not in self.email.split("@", 1)[1]
-        ):
-            raise ValueError("invalid email")
-
-        role = str(role).strip()
-        if role not in _ALLOWED_ROLES:
-            raise ValueError("invalid role")
-
-        self.role = role
+        self.email = _check_email(str(email).strip())
+        self.role = _check_role(str(role).strip())
         self.registration_date = datetime.utcnow()
 
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "User":
+        """Сборка из строки БД без валидации e-mail и роли: они проверены при записи."""
+        u = cls.__new__(cls)
+        u.load_row(row)
+        return u
+
+    def load_row(self, row: Mapping[str, Any]) -> None:
+        """Перезаписать поля значениями строки БД (без валидации, как from_row)."""
+        self.id = row["id"]
+        self.username = row["username"]
+        self.email = row["email"]
+        self.role = row["role"]
+        reg = row["registration_date"]
+        self.registration_date = reg if isinstance(reg, datetime) else datetime.fromisoformat(reg)
+
     def update_info(self, username: str | None = None, email: str | None = None, role: str | None = None) -> None:
         if username is not None:
             self.username = str(username).strip()
         if email is not None:
-            email = str(email).strip()
-            if (
-                "@" not in email
-                or email.startswith("@")
-                or email.endswith("@")
-                or " " in email
-                or email.count("@") != 1
-                or "." not in email.split("@", 1)[1]
-            ):
-                raise ValueError("invalid email")
-            self.email = email
+            self.email = _check_email(str(email).strip())
         if role is not None:
-            role = str(role).strip()
-            if role not in _ALLOWED_ROLES:
-                raise ValueError("invalid role")
-            self.role = role
+            self.role = _check_role(str(role).strip())
+
+    def validate(self) -> "User":
+        """Проверки конструктора для текущих значений: объект могли изменить после создания."""
+        _check_email(self.email)
+        _check_role(self.role)
+        return self
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -79,6 +92,9 @@ class User:
             return (self.id or 0) == other
         return NotImplemented
 
+    def __hash__(self) -> int:
+        return hash(self.id or 0)
+
     # чтобы работало сравнение 1 == user
     def __req__(self, other):
         if isinstance(other, int):
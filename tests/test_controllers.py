@@ -1,11 +1,20 @@
+import asyncio
 import tempfile
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 from datetime import datetime, timedelta
 
 from database.database_manager import DatabaseManager
+from controllers.async_controllers import AsyncControllers, AsyncDatabaseManager
 from controllers.task_controller import TaskController
 from controllers.project_controller import ProjectController
 from controllers.user_controller import UserController
+from models.project import Project
+from models.task import Task
+from models.user import User
 
 
 class TestControllers:
@@ -41,7 +50,9 @@ class TestControllers:
 
     def test_project_progress_by_tasks(self):
         u = self.users.add_user("dev", "d@a.b", "developer")
-        p = self.projects.add_project("proj", "", datetime.now(), datetime.now() + timedelta(days=2))
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=2)
+        )
         t1 = self.tasks.add_task("t1", "", 1, datetime.now() + timedelta(days=1), p.id, u.id)
         t2 = self.tasks.add_task("t2", "", 2, datetime.now() + timedelta(days=1), p.id, u.id)
         # 0
@@ -52,3 +63,378 @@ class TestControllers:
         # 2
         self.tasks.update_task_status(t2.id, "completed")
         assert self.projects.get_project_progress(p.id) == 100
+
+    def test_bulk_add_validates_every_row(self):
+        uids = self.users.add_users_many(
+            [("a", "a@a.b", "developer"), {"username": "b", "email": "b@a.b", "role": "admin"}]
+        )
+        assert [u.username for u in self.users.get_all_users()] == ["a", "b"]
+        pids = self.projects.add_projects_many(
+            [("p", "", datetime.now(), datetime.now() + timedelta(days=1))]
+        )
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([
+            ("t1", "", 1, due, pids[0], uids[0]),
+            {"title": "t2", "description": "", "priority": "2", "due_date": due,
+             "project_id": pids[0], "assignee_id": uids[1]},
+        ])
+        assert [self.tasks.get_task(i).title for i in ids] == ["t1", "t2"]
+        with pytest.raises(ValueError):
+            self.tasks.add_tasks_many(
+                [("ok", "", 1, due, None, None), ("bad", "", 9, due, None, None)]
+            )
+        assert len(self.tasks.get_all_tasks()) == 2
+        # готовые объекты, изменённые после создания, тоже проверяются
+        bad = Task("bad", "", 1, due, None, None)
+        bad.status = "done"
+        bad_project = Project("p", "", datetime.now(), datetime.now())
+        bad_project.end_date = datetime.now() - timedelta(days=1)
+        bad_user = User("c", "c@a.b", "developer")
+        bad_user.email = "not-an-email"
+        with pytest.raises(ValueError):
+            self.tasks.add_tasks_many([bad])
+        with pytest.raises(ValueError):
+            self.projects.add_projects_many([bad_project])
+        with pytest.raises(ValueError):
+            self.users.add_users_many([bad_user])
+        # кортеж другой длины не обрезается молча
+        with pytest.raises(ValueError):
+            self.tasks.add_tasks_many([("t", "", 1, due, None, None, "completed")])
+        with pytest.raises(ValueError):
+            self.tasks.add_tasks_many([("t", "", 1, due)])
+        assert len(self.tasks.get_all_tasks()) == 2
+        assert len(self.users.get_all_users()) == 2
+
+    def test_add_task_with_initial_status(self):
+        due = datetime.now() + timedelta(days=1)
+        t = self.tasks.add_task("t", "", 1, due, None, None, status="completed")
+        assert self.tasks.get_task(t).status == "completed"
+        with pytest.raises(ValueError):
+            self.tasks.add_task("t", "", 1, datetime.now(), None, None, status="bad")
+
+    def test_paging_and_streaming_models(self):
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=1)
+        )
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many(("t%d" % i, "", 2, due, p, None) for i in range(12))
+        page = self.tasks.page_tasks(limit=5)
+        assert [t.id for t in page] == ids[:5]
+        assert [t.id for t in self.tasks.page_tasks(after_id=page[-1], limit=5)] == ids[5:10]
+        titles = [t.title for t in self.tasks.iter_tasks(batch_size=4)]
+        assert titles == ["t%d" % i for i in range(12)]
+        assert self.tasks.count_tasks(project_id=p) == 12
+        assert [x.name for x in self.projects.iter_projects()] == ["proj"]
+        assert self.projects.count_projects(status="active") == 1
+
+    def test_find_tasks(self):
+        u = self.users.add_user("dev", "d@a.b", "developer")
+        now = datetime.now()
+        self.tasks.add_task("a", "", 1, now + timedelta(days=3), None, u)
+        b = self.tasks.add_task("b", "", 2, now + timedelta(days=1), None, u)
+        self.tasks.add_task("c", "", 2, now + timedelta(days=2), None, None)
+        found = self.tasks.find_tasks(priority="2", assignee_id=u)
+        assert [t.id for t in found] == [b]
+        assert [t.title for t in self.tasks.find_tasks(order_by="due_date", limit=2)] == ["b", "c"]
+        due_before = now + timedelta(days=2, hours=1)
+        assert self.tasks.count_tasks(status="pending", due_before=due_before) == 2
+
+    def test_all_project_progress_in_one_pass(self):
+        now = datetime.now()
+        p1 = self.projects.add_project("p1", "", now, now + timedelta(days=2))
+        past = self.projects.add_project(
+            "past", "", now - timedelta(days=5), now - timedelta(days=1)
+        )
+        future = self.projects.add_project(
+            "future", "", now + timedelta(days=1), now + timedelta(days=5)
+        )
+        t1 = self.tasks.add_task("t1", "", 1, now, p1, None)
+        self.tasks.add_task("t2", "", 1, now, p1, None)
+        self.tasks.add_task("t3", "", 1, now, p1, None)
+        self.tasks.update_task_status(t1, "completed")
+        progress = self.projects.get_all_project_progress()
+        assert progress[p1.id] == 100.0 / 3
+        assert progress[past.id] == 100.0
+        assert progress[future.id] == 0.0
+        assert self.projects.get_project_progress(past) == 100.0
+        assert self.projects.get_project_progress(999) == 0.0
+
+    def test_user_workload(self):
+        u = self.users.add_user("dev", "d@a.b", "developer")
+        idle = self.users.add_user("idle", "i@a.b", "developer")
+        t = self.tasks.add_task("a", "", 1, datetime.now(), None, u)
+        self.tasks.add_task("b", "", 1, datetime.now(), None, u)
+        self.tasks.update_task_status(t, "in_progress")
+        assert self.users.get_user_workload(u) == {
+            "pending": 1, "in_progress": 1, "completed": 0, "total": 2
+        }
+        workloads = self.users.get_all_user_workloads()
+        assert workloads[idle.id]["total"] == 0
+        assert workloads[u.id]["total"] == 2
+
+    def test_identity_map_one_instance_per_row(self):
+        u = self.users.add_user("dev", "d@a.b", "developer")
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=2)
+        )
+        t = self.tasks.add_task("t", "", 1, datetime.now() + timedelta(days=1), p.id, u.id)
+        task = self.tasks.get_task(t.id)
+        assert self.tasks.get_all_tasks()[0] is task
+        assert self.users.get_user_tasks(u.id)[0] is task
+
+        # запись обновляет живой экземпляр на месте
+        assert self.tasks.update_task_status(t.id, "in_progress") is task
+        assert task.status == "in_progress"
+        self.tasks.update_task(t.id, title="renamed")
+        assert task.title == "renamed"
+        with pytest.raises(ValueError):
+            self.tasks.update_task_status(t.id, "bad")
+        assert task.status == "in_progress"
+
+        # ON DELETE SET NULL отражается на загруженных задачах
+        self.projects.delete_project(p.id)
+        self.users.delete_user(u.id)
+        assert task.project_id is None and task.assignee_id is None
+        assert self.tasks.delete_task(t.id)
+        assert self.tasks.identity.get(type(task), t.id) is None
+
+    def test_models_hash_by_id(self):
+        ids = self.users.add_users_many([("a", "a@a.b", "developer"), ("b", "b@a.b", "admin")])
+        before = set(self.users.get_all_users())
+        self.users.delete_user(ids[0])
+        after = set(self.users.get_all_users())
+        assert before - after == {ids[0].id}
+        assert after <= before
+
+    def test_status_change_is_one_statement(self):
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=2)
+        )
+        t = self.tasks.add_task("t", "", 1, datetime.now() + timedelta(days=1), p.id, None)
+        task = self.tasks.get_task(t.id)
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        try:
+            assert self.tasks.update_task_status(t.id, "completed") is task
+            assert self.projects.update_project_status(p.id, "on_hold").status == "on_hold"
+            with pytest.raises(ValueError):
+                self.tasks.update_task_status(t.id, "bad")
+        finally:
+            self.db.conn.set_trace_callback(None)
+        assert task.status == "completed"
+        # ни одного SELECT до или после; трассировка показывает и шаги триггеров, их не считаем
+        kinds = [s.split()[0] for s in statements]
+        assert "SELECT" not in kinds
+        assert kinds.count("COMMIT") == 2
+        assert self.tasks.update_task(t.id, returning=True, priority=3).priority == 3
+        assert self.tasks.update_task(t.id + 100, title="x") == 0
+
+    def test_bulk_status_change(self):
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=2)
+        )
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "", 1, due, p, None)] * 5)
+        first = self.tasks.get_task(ids[0])
+        assert self.tasks.update_tasks_status(ids[:2], "in_progress") == 2
+        assert first.status == "in_progress"
+        closed = self.tasks.update_tasks_status({"project_id": p}, "completed", return_ids=True)
+        assert closed == [i.id for i in ids] and first.status == "completed"
+        assert self.projects.get_project_progress(p) == 100
+        with pytest.raises(ValueError):
+            self.tasks.update_tasks_status(ids, "bad")
+        with pytest.raises(ValueError):
+            self.tasks.update_tasks_status({}, "pending")
+
+    def test_bulk_status_change_none_filter_is_null(self):
+        p = self.projects.add_project(
+            "proj", "", datetime.now(), datetime.now() + timedelta(days=2)
+        )
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "", 1, due, p, None), ("t", "", 1, due, None, None)])
+        # None — условие IS NULL, а не отсутствие условия: задачу проекта p не трогаем
+        changed = self.tasks.update_tasks_status(
+            {"project_id": None, "status": "pending"}, "completed", return_ids=True
+        )
+        assert changed == [ids[1].id]
+        assert self.tasks.get_task(ids[0].id).status == "pending"
+        with pytest.raises(ValueError):
+            self.tasks.update_tasks_status({"due_before": None}, "completed")
+
+    def test_projected_lists_load_descriptions_lazily(self, monkeypatch):
+        import controllers.hydration as hydration
+        monkeypatch.setattr(hydration, "_DEFERRED_WINDOW", 4)
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many(
+            [(f"t{i}", f"desc {i}", 1, due, None, None) for i in range(10)]
+        )
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        try:
+            tasks = self.tasks.get_all_tasks(columns=("title", "status"))
+            assert "description" not in statements[0]
+            # первое обращение грузит окно пачки одним запросом, следующие — без запросов
+            assert [t.description for t in tasks[:4]] == [f"desc {i}" for i in range(4)]
+            assert len(statements) == 2
+            assert tasks[4].priority == 1 and len(statements) == 3
+            self.tasks.load_deferred(tasks)
+            assert len(statements) == 4
+        finally:
+            self.db.conn.set_trace_callback(None)
+        assert tasks[9].to_dict()["description"] == "desc 9"
+        # полная загрузка того же экземпляра снимает отложенность, проекция — снова ставит
+        assert self.tasks.get_task(ids[0]) is tasks[0] and tasks[0]._deferred is None
+        self.tasks.update_task(ids[1], description="new")
+        again = self.tasks.find_tasks(status="pending", columns=("title",))
+        assert again[1] is tasks[1] and again[1].description == "new"
+        streamed = list(self.tasks.iter_tasks(batch_size=3, columns=("title",)))
+        assert [t.description for t in streamed][-1] == "desc 9"
+
+    def test_rollback_refreshes_loaded_instances(self):
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "", 1, due, None, None)] * 3)
+        task = self.tasks.get_task(ids[0])
+        with pytest.raises(RuntimeError):
+            with self.db.transaction():
+                self.tasks.update_task_status(ids[0], "completed")
+                other = self.tasks.get_task(ids[1])
+                self.tasks.update_tasks_status([ids[1]], "in_progress")
+                new = self.tasks.get_task(self.tasks.add_task("new", "", 1, due, None, None))
+                assert task.status == "completed" and other.status == "in_progress"
+                raise RuntimeError("boom")
+        # незафиксированные значения у живых экземпляров не остаются
+        assert task.status == "pending" and other.status == "pending"
+        assert self.tasks.get_task(ids[0]) is task
+        assert self.tasks.identity.get(Task, new.id) is None
+        # откат вложенного блока возвращает значения внешней транзакции
+        with self.db.transaction():
+            self.tasks.update_task_status(ids[2], "in_progress")
+            third = self.tasks.get_task(ids[2])
+            with pytest.raises(RuntimeError):
+                with self.db.transaction():
+                    self.tasks.update_task_status(ids[2], "completed")
+                    raise RuntimeError("boom")
+            assert third.status == "in_progress"
+        assert self.tasks.get_task(ids[2]).status == "in_progress"
+
+    def test_projected_reload_keeps_loaded_fields(self):
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "desc", 2, due, None, None)])
+        task = self.tasks.get_task(ids[0])
+        self.db.update_task(ids[0].id, title="renamed")
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        try:
+            # проекция живого экземпляра обновляет выбранные колонки и не снимает остальные
+            again = self.tasks.get_all_tasks(columns=("title",))
+            assert again[0] is task and task.title == "renamed"
+            assert task.description == "desc" and task.priority == 2
+            assert len(statements) == 1
+        finally:
+            self.db.conn.set_trace_callback(None)
+
+    def test_reassign_move_and_bulk_delete(self):
+        a, b, c = self.users.add_users_many(
+            [("a", "a@a.b", "developer"), ("b", "b@a.b", "developer"), ("c", "c@a.b", "manager")]
+        )
+        p1 = self.projects.add_project("p1", "", datetime.now(), datetime.now() + timedelta(days=2))
+        p2 = self.projects.add_project("p2", "", datetime.now(), datetime.now() + timedelta(days=2))
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "", 1, due, p1, a)] * 3 + [("t", "", 1, due, p2, b)])
+        first = self.tasks.get_task(ids[0])
+
+        assert self.users.reassign_tasks(a, c) == 3
+        assert first.assignee_id == c.id
+        assert self.users.get_user_workload(c)["total"] == 3
+        assert self.projects.move_tasks(p1, p2) == 3
+        assert first.project_id == p2.id
+        with pytest.raises(ValueError):
+            self.projects.move_tasks(p2, p2)
+
+        with pytest.raises(ValueError):
+            self.users.delete_users_many([b, c], reassign_to=c)
+        assert self.users.delete_users_many([b, c], reassign_to=a) == 2
+        assert first.assignee_id == a.id
+        assert self.users.get_user_workload(a)["total"] == 4
+        assert self.users.delete_users_many([a]) == 1
+        assert first.assignee_id is None
+        assert self.db.count_tasks({"assignee_id": None}) == 4
+        assert self.db.verify_task_counters() == []
+
+    @pytest.mark.parametrize("group_commit", [0, 16])
+    def test_controllers_from_thread_pool(self, group_commit):
+        db = DatabaseManager(
+            self.temp_db.name, cache_size=64, result_cache_rows=1000, group_commit=group_commit
+        )
+        try:
+            tasks, projects = TaskController(db), ProjectController(db)
+            u = UserController(db).add_user("dev", "d@a.b", "developer")
+            p = projects.add_project("p", "", datetime.now(), datetime.now() + timedelta(days=2))
+            due = datetime.now() + timedelta(days=1)
+
+            def work(i):
+                t = tasks.get_task(tasks.add_task(f"t{i}", "", 1, due, p.id, u.id))
+                status = "completed" if i % 2 else "in_progress"
+                tasks.update_task_status(t.id, status)
+                assert t.status == status and tasks.get_task(t.id) is t
+                assert any(x is t for x in tasks.get_tasks_by_project(p.id))
+                return t.id
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                ids = list(pool.map(work, range(40)))
+            assert len(set(ids)) == 40
+            assert len(tasks.get_all_tasks()) == 40
+            assert projects.get_project_progress(p.id) == 50
+            assert db.verify_task_counters() == []
+        finally:
+            db.close()
+
+    def test_async_facade_gather_and_stream(self):
+        u = self.users.add_user("dev", "d@a.b", "developer")
+        p = self.projects.add_project("p", "", datetime.now(), datetime.now() + timedelta(days=2))
+        due = datetime.now() + timedelta(days=1)
+        ids = self.tasks.add_tasks_many([("t", "", 1, due, p, u)] * 25)
+
+        async def screen():
+            async with AsyncControllers(self.db, max_workers=3) as c:
+                task, project, user = await asyncio.gather(
+                    c.tasks.get_task(ids[0]), c.projects.get_project(p), c.users.get_user(u)
+                )
+                streamed = [t async for t in c.tasks.iter_tasks(batch_size=10)]
+                new = await c.tasks.add_task("x", "", 2, due, p, u)
+                thread = await c.tasks.run(threading.current_thread)
+                return task, project, user, streamed, new, thread.name
+
+        task, project, user, streamed, new, thread = asyncio.run(screen())
+        assert thread.startswith("db-async")
+        # те же экземпляры, что у синхронных контроллеров той же базы
+        assert task is self.tasks.get_task(ids[0]) and project.id == p.id and user.id == u.id
+        assert [t.id for t in streamed] == ids
+        assert self.tasks.count_tasks() == 26 and self.tasks.get_task(new).priority == 2
+
+        async def raw():
+            async with AsyncDatabaseManager(self.db, max_workers=2) as adb:
+                rows = [r["id"] async for r in adb.iter_tasks(batch_size=7)]
+                return rows, await adb.get_task_by_id(new)
+
+        rows, row = asyncio.run(raw())
+        assert rows == ids + [new] and row["title"] == "x"
+
+    def test_async_facade_refuses_context_managers(self):
+        due = datetime.now() + timedelta(days=1)
+
+        def add_two(db):
+            # транзакция целиком в одном потоке исполнителя
+            with db.transaction():
+                return [db.add_task(Task(t, "", 1, due, None, None)) for t in ("a", "b")]
+
+        async def run():
+            async with AsyncDatabaseManager(self.db, max_workers=2) as adb:
+                for name in ("transaction", "profile"):
+                    with pytest.raises(TypeError, match="context manager"):
+                        getattr(adb, name)("bulk_load")
+                return await adb.run(add_two, adb.sync)
+
+        ids = asyncio.run(run())
+        assert [self.db.get_task_by_id(i)["title"] for i in ids] == ["a", "b"]
+        assert self.db._tx_depth == 0 and not self.db.conn.in_transaction
@@ -1,10 +1,17 @@
 import tempfile
 import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
 from datetime import datetime, timedelta
 
 from models.task import Task
 from models.project import Project
+from database.cache import EntityCache
 from database.database_manager import DatabaseManager
+from database.profiles import SQLiteProfile
 from models.user import User
 
 
@@ -55,4 +62,614 @@ class TestDatabase:
         assert len(self.db.search_tasks("t1")) == 1
         assert len(self.db.get_tasks_by_project(pid)) == 1
         assert len(self.db.get_tasks_by_user(uid)) == 1
-        assert len(self.db.get_all_tasks()) == 1
\ No newline at end of file
+        assert len(self.db.get_all_tasks()) == 1
+
+    def test_bulk_insert_returns_ids_in_order(self):
+        uids = self.db.add_users_many(User(f"u{i}", f"u{i}@a.b", "developer") for i in range(5))
+        assert [self.db.get_user_by_id(i)["username"] for i in uids] == [f"u{i}" for i in range(5)]
+        pids = self.db.add_projects_many(
+            [Project(f"p{i}", "", datetime(2024, 1, 1), datetime(2024, 2, 1)) for i in range(3)]
+        )
+        due = datetime.now() + timedelta(days=1)
+        tasks = [Task(f"t{i}", "", 1 + i % 3, due, pids[i % 3], uids[i % 5]) for i in range(1234)]
+        tids = self.db.add_tasks_many(tasks, chunk_size=100)
+        assert len(tids) == 1234
+        assert self.db.get_task_by_id(tids[0])["title"] == "t0"
+        assert self.db.get_task_by_id(tids[-1])["title"] == "t1233"
+        assert len(self.db.get_all_tasks()) == 1234
+
+    def test_bulk_insert_is_atomic(self):
+        due = datetime.now() + timedelta(days=1)
+        # внешний ключ на несуществующего пользователя: падает уже INSERT
+        orphan = Task("orphan", "", 1, due, None, 999)
+        with pytest.raises(sqlite3.IntegrityError):
+            self.db.add_tasks_many([Task("ok", "", 1, due, None, None), orphan])
+        assert self.db.get_all_tasks() == []
+        # изменённый после создания объект проверяется заново, до базы не доходит
+        bad = Task("bad", "", 1, due, None, None)
+        bad.priority = 7
+        with pytest.raises(ValueError):
+            self.db.add_tasks_many([Task("ok", "", 1, due, None, None), bad])
+        assert self.db.get_all_tasks() == []
+
+    def test_transaction_commits_once_and_rolls_back(self):
+        due = datetime.now() + timedelta(days=1)
+        with self.db.transaction():
+            tid = self.db.add_task(Task("a", "", 1, due, None, None))
+            self.db.update_task(tid, status="completed")
+            assert self.db.conn.in_transaction
+        assert not self.db.conn.in_transaction
+        assert self.db.get_task_by_id(tid)["status"] == "completed"
+
+        with pytest.raises(RuntimeError):
+            with self.db.transaction():
+                self.db.add_task(Task("b", "", 1, due, None, None))
+                raise RuntimeError("boom")
+        assert [r["title"] for r in self.db.get_all_tasks()] == ["a"]
+
+    def test_failed_commit_rolls_back(self):
+        due = datetime.now() + timedelta(days=1)
+        with pytest.raises(sqlite3.IntegrityError):
+            with self.db.transaction():
+                # проверка внешнего ключа переносится на COMMIT
+                self.db.conn.execute("PRAGMA defer_foreign_keys = ON")
+                self.db.add_task(Task("bad", "", 1, due, None, 999))
+        assert not self.db.conn.in_transaction
+        assert self.db.count_tasks() == 0
+        with self.db.transaction():
+            self.db.add_task(Task("ok", "", 1, due, None, None))
+        assert [r["title"] for r in self.db.get_all_tasks()] == ["ok"]
+
+    def test_nested_transaction_uses_savepoint(self):
+        due = datetime.now() + timedelta(days=1)
+        with self.db.transaction():
+            self.db.add_task(Task("outer", "", 1, due, None, None))
+            with pytest.raises(ValueError):
+                with self.db.transaction():
+                    self.db.add_task(Task("inner", "", 1, due, None, None))
+                    raise ValueError("inner failed")
+        assert [r["title"] for r in self.db.get_all_tasks()] == ["outer"]
+
+    def test_readers_do_not_wait_for_writer_thread(self):
+        due = datetime.now() + timedelta(days=1)
+        tid = self.db.add_task(Task("a", "", 1, due, None, None))
+        in_tx, release = threading.Event(), threading.Event()
+
+        def writer():
+            with self.db.transaction():
+                self.db.update_task(tid, status="completed")
+                # свой поток видит незафиксированное
+                assert self.db.get_task_by_id(tid)["status"] == "completed"
+                in_tx.set()
+                assert release.wait(5)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            w = pool.submit(writer)
+            assert in_tx.wait(5)
+            # другой поток читает снимок до COMMIT и не ждёт его
+            assert pool.submit(self.db.get_task_by_id, tid).result(5)["status"] == "pending"
+            assert len(pool.submit(self.db.get_all_tasks).result(5)) == 1
+            # а запись из другого потока ждёт
+            add = pool.submit(self.db.add_task, Task("b", "", 1, due, None, None))
+            with pytest.raises(TimeoutError):
+                add.result(0.2)
+            release.set()
+            w.result(5)
+            add.result(5)
+        assert self.db.get_task_by_id(tid)["status"] == "completed"
+        assert len(self.db.get_all_tasks()) == 2
+
+    def test_uncommitted_returning_row_stays_out_of_entity_cache(self):
+        db = DatabaseManager(self.temp_db.name, cache_size=8)
+        try:
+            tid = db.add_task(Task("a", "", 1, datetime.now() + timedelta(days=1), None, None))
+            assert db.get_task_by_id(tid)["title"] == "a"
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                with pytest.raises(RuntimeError):
+                    with db.transaction():
+                        row = db.update_task(tid, returning=True, title="dirty")
+                        assert row["title"] == "dirty"
+                        # другой поток не видит незафиксированную строку ни в базе, ни в кеше
+                        assert pool.submit(db.get_task_by_id, tid).result(5)["title"] == "a"
+                        raise RuntimeError("rollback")
+                assert pool.submit(db.get_task_by_id, tid).result(5)["title"] == "a"
+            assert db.get_task_by_id(tid)["title"] == "a"
+            # вне транзакции строка RETURNING попадает в кеш после COMMIT
+            db.update_task(tid, returning=True, title="b")
+            hits = db.cache_stats()["hits"]
+            assert db.get_task_by_id(tid)["title"] == "b"
+            assert db.cache_stats()["hits"] == hits + 1
+        finally:
+            db.close()
+
+    def test_group_commit_queue(self):
+        uid = self.db.add_user(User("u", "u@a.b", "developer"))
+        db = DatabaseManager(self.temp_db.name, group_commit=50, group_commit_window=0.05)
+        try:
+            due = datetime.now() + timedelta(days=1)
+            futures = [
+                db.write_queue.submit(db.add_task, Task(f"t{i}", "", 1, due, None, uid))
+                for i in range(20)
+            ]
+            # несуществующий исполнитель: падает только эта операция, соседи фиксируются
+            bad = db.write_queue.submit(db.add_task, Task("bad", "", 1, due, None, uid + 100))
+            ids = [f.result(5) for f in futures]
+            with pytest.raises(sqlite3.IntegrityError):
+                bad.result(5)
+            assert ids == sorted(set(ids))
+            assert db.write_queue_stats()["groups"] < 20
+            # обычные методы ждут COMMIT своей группы и возвращают то же, что и без очереди
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                counts = list(pool.map(lambda t: db.update_task(t, status="completed"), ids))
+            assert counts == [1] * 20
+            assert db.count_tasks({"status": "completed"}) == 20
+            # внутри своей транзакции поток пишет сам, мимо очереди
+            with db.transaction():
+                db.delete_task(ids[0])
+            assert db.write_queue_stats()["ops"] == 41
+        finally:
+            db.close()
+        assert self.db.count_tasks() == 19
+        assert self.db.write_queue_stats() is None
+        with pytest.raises(RuntimeError):
+            db.write_queue.submit(db.add_task, Task("late", "", 1, due, None, None))
+
+    def test_group_commit_recovers_from_failed_commit(self):
+        db = DatabaseManager(self.temp_db.name, group_commit=10)
+        due = datetime.now() + timedelta(days=1)
+
+        def deferred_violation():
+            # внешний ключ проверяется на COMMIT группы — падает вся группа
+            db.conn.execute("PRAGMA defer_foreign_keys = ON")
+            return db.add_task(Task("bad", "", 1, due, None, 999))
+
+        try:
+            with pytest.raises(sqlite3.IntegrityError):
+                db.write_queue.submit(deferred_violation).result(5)
+            assert not db.conn.in_transaction
+            assert db.add_task(Task("ok", "", 1, due, None, None)) == 1
+            assert [r["title"] for r in db.get_all_tasks()] == ["ok"]
+        finally:
+            db.close()
+        with pytest.raises(ValueError):
+            DatabaseManager(self.temp_db.name, group_commit=-1)
+
+    def test_group_commit_waits_out_busy_database(self):
+        nowait = SQLiteProfile("nowait", "NORMAL", 0, -2_000, "MEMORY", busy_timeout=0)
+        db = DatabaseManager(self.temp_db.name, profile=nowait, group_commit=10)
+        other = sqlite3.connect(self.temp_db.name)
+        try:
+            # другой процесс держит блокировку записи
+            other.execute("BEGIN IMMEDIATE")
+            fut = db.write_queue.submit(
+                db.add_task, Task("t", "", 1, datetime.now() + timedelta(days=1), None, None)
+            )
+            with pytest.raises(TimeoutError):
+                fut.result(0.05)
+            other.rollback()
+            assert fut.result(5) == 1
+            assert db.write_queue_stats()["busy_retries"] > 0
+        finally:
+            other.close()
+            db.close()
+
+    def test_profiles_switch_and_restore(self):
+        s = self.db.settings()
+        assert s["profile"] == "balanced"
+        assert s["journal_mode"] == "WAL"
+        assert s["synchronous"] == "NORMAL"
+        with self.db.profile("bulk_load"):
+            s = self.db.settings()
+            assert s["profile"] == "bulk_load"
+            assert s["synchronous"] == "OFF"
+            assert s["temp_store"] == "MEMORY"
+        assert self.db.settings()["profile"] == "balanced"
+        self.db.use_profile("durable")
+        assert self.db.settings()["synchronous"] == "FULL"
+        assert self.db.settings()["foreign_keys"] is True
+        with pytest.raises(ValueError):
+            self.db.use_profile("turbo")
+
+    def test_migrations_are_applied_once_with_indexes(self):
+        from database.migrations import SCHEMA_VERSION
+        assert self.db.schema_version() == SCHEMA_VERSION
+        assert self.db.migrate() == []
+        indexes = {r[0] for r in self.db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks'"
+        )}
+        expected = {"idx_tasks_project_id", "idx_tasks_assignee_id", "idx_tasks_status_due_date"}
+        assert expected <= indexes
+        plan = " ".join(str(tuple(r)) for r in self.db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE project_id = ?", (1,)
+        ))
+        assert "idx_tasks_project_id" in plan
+
+    def test_migration_1_ddl_is_frozen(self):
+        from database.migrations import MIGRATIONS
+        conn = sqlite3.connect(":memory:")
+        try:
+            MIGRATIONS[0].apply(conn)
+            columns = [r[1] for r in conn.execute("SELECT * FROM pragma_table_info('tasks')")]
+        finally:
+            conn.close()
+        # колонку description_blob добавляет только миграция 5 — и новым, и старым базам
+        assert "description_blob" not in columns
+        tasks = [r[1] for r in self.db.conn.execute("SELECT * FROM pragma_table_info('tasks')")]
+        assert tasks[-1] == "description_blob"
+
+    def test_migrate_legacy_database_without_user_version(self):
+        path = self.temp_db.name + ".legacy"
+        legacy = sqlite3.connect(path)
+        legacy.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                       "username TEXT NOT NULL, "
+                       "email TEXT NOT NULL, role TEXT NOT NULL, registration_date TEXT NOT NULL)")
+        legacy.execute("INSERT INTO users(username, email, role, registration_date) "
+                       "VALUES ('old', 'o@a.b', 'admin', '2024-01-01T00:00:00')")
+        legacy.commit()
+        legacy.close()
+        db = DatabaseManager(path)
+        try:
+            assert db.migrate()
+            assert db.get_user_by_id(1)["username"] == "old"
+        finally:
+            db.close()
+            os.unlink(path)
+
+    def test_full_text_search(self):
+        due = datetime.now() + timedelta(days=1)
+        a = self.db.add_task(Task("Починить логин", "ошибка авторизации", 1, due, None, None))
+        b = self.db.add_task(Task("Логин через SSO", "логин логин", 2, due, None, None))
+        self.db.add_task(Task("Отчёт", "квартальный", 3, due, None, None))
+        assert [r["id"] for r in self.db.search_tasks("логин")] == [a, b]
+        assert [r["id"] for r in self.db.search_tasks("логин", rank=True)][0] == b
+        assert len(self.db.search_tasks("логин", limit=1)) == 1
+        assert [r["id"] for r in self.db.search_tasks("автор")] == [a]
+        hit = self.db.search_tasks("квартал", snippet=True)[0]
+        assert "[квартальный]" in hit["snippet"]
+        # триггеры поддерживают индекс в актуальном состоянии
+        self.db.update_task(a, title="Починить вход")
+        self.db.delete_task(b)
+        assert self.db.search_tasks("логин") == []
+        assert [r["id"] for r in self.db.search_tasks("вход")] == [a]
+
+    def test_search_falls_back_to_like_without_fts(self):
+        due = datetime.now() + timedelta(days=1)
+        tid = self.db.add_task(Task("substring", "", 1, due, None, None))
+        self.db._fts = False
+        assert [r["id"] for r in self.db.search_tasks("bstr")] == [tid]
+        assert self.db.search_tasks("bstr", snippet=True)[0]["snippet"] is None
+
+    def test_keyset_pagination_iteration_and_count(self):
+        due = datetime.now() + timedelta(days=1)
+        ids = self.db.add_tasks_many(Task(f"t{i}", "", 1, due, None, None) for i in range(25))
+        self.db.update_task(ids[3], status="completed")
+        first = self.db.page_tasks(limit=10)
+        assert [r["id"] for r in first] == ids[:10]
+        second = self.db.page_tasks(after_id=first[-1]["id"], limit=10)
+        assert [r["id"] for r in second] == ids[10:20]
+        assert [r["id"] for r in self.db.iter_tasks(batch_size=7)] == ids
+        assert self.db.count_tasks() == 25
+        assert self.db.count_tasks({"status": "completed"}) == 1
+        assert self.db.count_tasks({"project_id": None}) == 25
+        assert self.db.count_users() == 0
+        with pytest.raises(ValueError):
+            self.db.count_tasks({"1=1; --": 1})
+
+    def test_column_projection(self):
+        due = datetime.now() + timedelta(days=1)
+        ids = self.db.add_tasks_many(
+            Task(f"t{i}", "long " * 100, 1, due, None, None) for i in range(3)
+        )
+        rows = self.db.get_all_tasks(columns=("title", "status"))
+        assert rows[0] == {"id": ids[0], "title": "t0", "status": "pending"}
+        assert set(self.db.find_tasks(columns=["due_date"], limit=1)[0]) == {"id", "due_date"}
+        assert set(self.db.search_tasks("t1", columns=("title",))[0]) == {"id", "title"}
+        assert [r["id"] for r in self.db.iter_tasks(batch_size=2, columns=("title",))] == ids
+        loaded = self.db.get_task_columns([ids[2], ids[0], 10_000], ["description"])
+        assert loaded == {i: {"id": i, "description": "long " * 100} for i in (ids[0], ids[2])}
+        with pytest.raises(ValueError):
+            self.db.get_all_tasks(columns=("title", "1; DROP TABLE tasks"))
+
+    def test_find_tasks_compiles_filters(self):
+        base = datetime(2030, 1, 1)
+        pid = self.db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+        ids = self.db.add_tasks_many(
+            Task(f"t{i}", "", 1 + i % 3, base + timedelta(days=i), pid if i % 2 else None, None)
+            for i in range(10)
+        )
+        self.db.update_task(ids[1], status="completed")
+        rows = self.db.find_tasks(project_id=pid, status=["pending", "in_progress"])
+        assert [r["id"] for r in rows] == [ids[3], ids[5], ids[7], ids[9]]
+        rows = self.db.find_tasks(due_after=base + timedelta(days=2),
+                                  due_before=base + timedelta(days=6),
+                                  order_by="-due_date", limit=2)
+        assert [r["id"] for r in rows] == [ids[5], ids[4]]
+        assert self.db.count_tasks({"priority": 1, "project_id": None}) == 2
+        with pytest.raises(ValueError):
+            self.db.find_tasks(order_by="description; DROP TABLE tasks")
+
+    def test_overdue_tasks_in_sql(self):
+        now = datetime(2030, 1, 10, 12, 0)
+        uid = self.db.add_user(User("u", "u@a.b", "developer"))
+        late = self.db.add_task(Task("late", "", 1, now - timedelta(days=2), None, uid))
+        self.db.add_task(Task("future", "", 1, now + timedelta(hours=1), None, uid))
+        done = self.db.add_task(Task("done", "", 1, now - timedelta(days=3), None, None))
+        self.db.update_task(done, status="completed")
+        edge = self.db.add_task(Task("edge", "", 2, now, None, None))
+        assert [r["id"] for r in self.db.get_overdue_tasks(now)] == [late, edge]
+        assert [r["id"] for r in self.db.get_overdue_tasks(now, assignee_id=uid)] == [late]
+        assert len(self.db.get_overdue_tasks(now, limit=1)) == 1
+        plan = " ".join(str(tuple(r)) for r in self.db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE status IN ('pending', 'in_progress') "
+            "AND due_date <= ?", ("2030-01-10T12:00:00",)
+        ))
+        assert "idx_tasks_status_due_date" in plan
+
+    def test_task_counters_follow_writes_and_cascades(self):
+        uid = self.db.add_user(User("u", "u@a.b", "developer"))
+        pid = self.db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+        due = datetime.now()
+        ids = self.db.add_tasks_many(Task(f"t{i}", "", 1, due, pid, uid) for i in range(4))
+        self.db.update_task(ids[0], status="completed")
+        self.db.update_task(ids[1], status="in_progress", assignee_id=None)
+        self.db.delete_task(ids[2])
+        assert self.db.get_user_task_counts(uid) == {"completed": 1, "pending": 1}
+        counts = self.db.get_project_task_counts(pid)
+        assert (counts["total"], counts["completed"]) == (3, 1)
+        self.db.delete_user(uid)
+        assert self.db.get_user_task_counts(uid) == {}
+        self.db.delete_project(pid)
+        assert self.db.verify_task_counters() == []
+        self.db.conn.execute("DELETE FROM task_counters")
+        self.db.conn.commit()
+        assert self.db.verify_task_counters() == []  # все задачи без проекта и исполнителя
+        self.db.add_task(Task("x", "", 1, due, None, self.db.add_user(User("v", "v@a.b", "admin"))))
+        self.db.conn.execute("DELETE FROM task_counters")
+        self.db.conn.commit()
+        assert self.db.verify_task_counters()
+        self.db.rebuild_task_counters()
+        assert self.db.verify_task_counters() == []
+
+    def test_convert_to_compact_in_place(self):
+        uid = self.db.add_user(User("u", "u@a.b", "manager"))
+        pid = self.db.add_project(
+            Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1, 9, 30))
+        )
+        due = datetime(2030, 5, 17, 8, 15, 42)
+        keep = self.db.add_task(Task("сохранить", "описание", 2, due, pid, uid))
+        gone = self.db.add_task(Task("удалить", "", 1, due, pid, uid))
+        self.db.update_task(keep, status="in_progress")
+        self.db.delete_task(gone)
+        self.db.close()
+
+        self.db = DatabaseManager(self.temp_db.name, compact=True)
+        assert not self.db.compact
+        self.db.migrate()
+        assert self.db.compact
+        raw = self.db.conn.execute(
+            "SELECT status, due_date FROM tasks WHERE id = ?", (keep,)
+        ).fetchone()
+        assert (type(raw[0]), type(raw[1])) == (int, int)
+        row = self.db.get_task_by_id(keep)
+        assert row["status"] == "in_progress" and row["due_date"] == due
+        assert self.db.get_user_by_id(uid)["role"] == "manager"
+        assert self.db.get_project_by_id(pid)["end_date"] == datetime(2024, 2, 1, 9, 30)
+        assert [r["id"] for r in self.db.search_tasks("сохран")] == [keep]
+        found = self.db.find_tasks(status="in_progress", due_after=due - timedelta(1))
+        assert [r["id"] for r in found] == [keep]
+        assert self.db.get_user_task_counts(uid) == {"in_progress": 1}
+        assert self.db.verify_task_counters() == []
+        # AUTOINCREMENT не выдаёт повторно id удалённой задачи
+        assert self.db.add_task(Task("new", "", 1, due, None, None)) > gone
+        # открытие без флага всё равно читает компактно
+        self.db.close()
+        self.db = DatabaseManager(self.temp_db.name)
+        assert self.db.compact and self.db.get_task_by_id(keep)["due_date"] == due
+
+    def test_compress_descriptions_in_place(self):
+        due = datetime.now() + timedelta(days=1)
+        long_text = "квартальный отчёт по продажам " * 20
+        big = self.db.add_task(Task("big", long_text, 1, due, None, None))
+        small = self.db.add_task(Task("small", "коротко", 1, due, None, None))
+        pid = self.db.add_project(
+            Project("p", long_text, datetime(2024, 1, 1), datetime(2024, 2, 1))
+        )
+        report = self.db.compress_descriptions(threshold=200)
+        assert (report["tasks"], report["projects"]) == (1, 1)
+        assert 0 < report["blob_bytes"] < report["text_bytes"] and report["decode_us"] > 0
+        raw = self.db.conn.execute(
+            "SELECT id, description, description_blob FROM tasks ORDER BY id").fetchall()
+        assert raw[0][1] == "" and raw[0][2][0] == 1 and raw[1][1:] == ("коротко", None)
+        # чтение прозрачно: строки, проекции, догрузка колонок, поиск
+        assert self.db.get_task_by_id(big)["description"] == long_text
+        assert self.db.get_all_tasks(columns=("description",))[0]["description"] == long_text
+        assert self.db.get_task_columns([big], ["description"])[big]["description"] == long_text
+        assert self.db.get_project_by_id(pid)["description"] == long_text
+        hit = self.db.search_tasks("продаж", snippet=True)
+        assert [r["id"] for r in hit] == [big] and "[продажам]" in hit[0]["snippet"]
+        self.db._fts = False
+        assert [r["id"] for r in self.db.search_tasks("по продажам")] == [big]
+        self.db._fts = None
+        # новые записи сжимаются тем же порогом, короткое описание снимает блоб
+        new = self.db.add_task(Task("new", long_text, 1, due, None, None))
+        self.db.update_task(big, description="уже коротко")
+        blobs = dict(self.db.conn.execute("SELECT id, description_blob FROM tasks"))
+        assert blobs[new] is not None and blobs[big] is None and blobs[small] is None
+        assert [r["id"] for r in self.db.search_tasks("продаж")] == [new]
+        assert self.db.decompress_descriptions() == {"tasks": 1, "projects": 1}
+        assert self.db.conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE instr(sql, 'description_text(')"
+        ).fetchone()[0] == 0
+        assert self.db.get_task_by_id(new)["description"] == long_text
+        assert [r["id"] for r in self.db.search_tasks("продаж")] == [new]
+
+    def test_compress_threshold_is_validated_like_init(self):
+        tid = self.db.add_task(Task("t", "ab" * 40, 1, datetime(2030, 1, 1), None, None))
+        # 0 не подменяется порогом по умолчанию, а отклоняется, как compress_threshold=0
+        for bad in (0, -1):
+            with pytest.raises(ValueError):
+                self.db.compress_descriptions(threshold=bad)
+        assert self.db._compress_threshold is None
+        assert self.db.compress_descriptions(threshold=1)["tasks"] == 1
+        assert self.db.get_task_by_id(tid)["description"] == "ab" * 40
+
+    def test_compress_threshold_survives_compact_conversion(self):
+        self.db.close()
+        self.db = DatabaseManager(self.temp_db.name, compact=True, compress_threshold=64)
+        self.db.migrate()
+        tid = self.db.add_task(Task("t", "слово " * 50, 1, datetime(2030, 1, 1), None, None))
+        assert self.db.conn.execute(
+            "SELECT description_blob IS NOT NULL FROM tasks WHERE id = ?", (tid,)).fetchone()[0]
+        assert [r["id"] for r in self.db.search_tasks("слово")] == [tid]
+        with pytest.raises(ValueError):
+            DatabaseManager(self.temp_db.name, compress_threshold=0)
+
+    def test_entity_cache_read_through_and_invalidation(self):
+        db = DatabaseManager(self.temp_db.name, cache_size=2)
+        try:
+            uid = db.add_user(User("u", "u@a.b", "developer"))
+            pid = db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+            tid = db.add_task(Task("t", "", 1, datetime(2024, 1, 5), pid, uid))
+            db.get_task_by_id(tid)
+            row = db.get_task_by_id(tid)
+            row["title"] = "mutated"  # копия: кеш не портится
+            assert db.get_task_by_id(tid)["title"] == "t"
+            assert db.cache_stats()["hits"] == 2 and db.cache_stats()["misses"] == 1
+
+            db.update_task(tid, title="t2")
+            assert db.get_task_by_id(tid)["title"] == "t2"
+            # ON DELETE SET NULL сбрасывает закешированные задачи
+            db.delete_user(uid)
+            assert db.get_task_by_id(tid)["assignee_id"] is None
+            db.delete_project(pid)
+            assert db.get_task_by_id(tid)["project_id"] is None
+
+            # откат транзакции забывает строки, прочитанные внутри неё
+            with pytest.raises(RuntimeError):
+                with db.transaction():
+                    db.update_task(tid, title="rolled back")
+                    assert db.get_task_by_id(tid)["title"] == "rolled back"
+                    raise RuntimeError
+            assert db.get_task_by_id(tid)["title"] == "t2"
+        finally:
+            db.close()
+        assert self.db.cache_stats() is None
+
+    def test_entity_cache_lru_and_ttl(self):
+        now = [0.0]
+        cache = EntityCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.put("users", 1, {"id": 1})
+        cache.put("users", 2, {"id": 2})
+        assert cache.get("users", 1) == {"id": 1}
+        cache.put("users", 3, {"id": 3})  # вытесняет 2: к 1 обращались позже
+        assert cache.get("users", 2) is None
+        assert cache.get("users", 1) is not None
+        now[0] = 10
+        assert cache.get("users", 1) is None
+        stats = cache.stats()
+        counts = (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"])
+        assert counts == (2, 2, 1, 1)
+        assert stats["hit_rate"] == 0.5
+        with pytest.raises(ValueError):
+            EntityCache(max_size=0)
+
+    def test_result_cache_generations(self):
+        db = DatabaseManager(self.temp_db.name, result_cache_rows=3)
+        try:
+            uid = db.add_user(User("u", "u@a.b", "developer"))
+            pid = db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+            tid = db.add_task(Task("alpha", "", 1, datetime(2024, 1, 5), pid, uid))
+            assert [r["id"] for r in db.get_tasks_by_project(pid)] == [tid]
+            assert db.get_tasks_by_project(pid) == db.get_tasks_by_project(pid, cache=False)
+            assert db.result_cache_stats()["hits"] == 1
+
+            # запись в tasks делает устаревшими и задачи, и счётчики, и поиск
+            assert db.get_all_project_task_counts()[0]["total"] == 1
+            assert len(db.search_tasks("alpha")) == 1
+            db.add_tasks_many([Task("alpha 2", "", 1, datetime(2024, 1, 6), pid, uid)])
+            assert len(db.get_tasks_by_project(pid)) == 2
+            assert db.get_all_project_task_counts()[0]["total"] == 2
+            assert len(db.search_tasks("alpha")) == 2
+
+            # каскад ON DELETE SET NULL из projects виден в выборках по tasks
+            db.delete_project(pid)
+            assert db.get_tasks_by_project(pid) == []
+            assert db.count_tasks({"project_id": None}) == 2
+
+            # запись в другую таблицу результаты по tasks не трогает
+            before = db.result_cache_stats()["hits"]
+            db.update_user(uid, role="manager")
+            db.count_tasks({"project_id": None})
+            assert db.result_cache_stats()["hits"] == before + 1
+            # суммарно не больше 3 строк
+            db.get_all_tasks()
+            assert db.result_cache_stats()["rows"] <= 3
+        finally:
+            db.close()
+        assert self.db.result_cache_stats() is None
+
+    def test_caches_follow_commits_from_other_connections(self, monkeypatch):
+        uid = self.db.add_user(User("u", "u@a.b", "developer"))
+        clock = [1000.0]
+        monkeypatch.setattr("database.database_manager.time.monotonic", lambda: clock[0])
+        db = DatabaseManager(self.temp_db.name, cache_size=8, result_cache_rows=100,
+                             data_version_interval=30)
+        try:
+            assert db.get_user_by_id(uid)["role"] == "developer"
+            assert len(db.get_all_users()) == 1
+            # коммит другого соединения (self.db — как второй процесс)
+            self.db.update_user(uid, role="admin")
+            self.db.add_user(User("v", "v@a.b", "developer"))
+            # в пределах интервала data_version не перечитывается
+            clock[0] += 10
+            assert db.get_user_by_id(uid)["role"] == "developer"
+            clock[0] += 30
+            assert db.get_user_by_id(uid)["role"] == "admin"
+            assert len(db.get_all_users()) == 2
+        finally:
+            db.close()
+        with pytest.raises(ValueError):
+            DatabaseManager(self.temp_db.name, data_version_interval=-1)
+
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_update_returning(self, monkeypatch, has_returning):
+        monkeypatch.setattr("database.database_manager._HAS_RETURNING", has_returning)
+        uid = self.db.add_user(User("u", "u@a.b", "developer"))
+        pid = self.db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+        tid = self.db.add_task(Task("t", "", 1, datetime(2024, 1, 5), pid, uid))
+        row = self.db.update_task(
+            tid, returning=True, status="completed", due_date=datetime(2024, 3, 1)
+        )
+        assert row["status"] == "completed" and row["due_date"] == "2024-03-01T00:00:00"
+        assert self.db.update_project(pid, returning=True, status="on_hold")["status"] == "on_hold"
+        assert self.db.update_user(uid, returning=True, role="admin")["role"] == "admin"
+        assert self.db.update_task(tid + 100, returning=True, title="x") is None
+        assert self.db.update_task(tid, title="y") == 1
+        # RETURNING дочитан до COMMIT: изменения видны из другого соединения
+        other = sqlite3.connect(self.temp_db.name)
+        try:
+            assert other.execute("SELECT title, status FROM tasks").fetchone() == ("y", "completed")
+        finally:
+            other.close()
+
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_update_tasks_where(self, monkeypatch, has_returning):
+        monkeypatch.setattr("database.database_manager._HAS_RETURNING", has_returning)
+        pid = self.db.add_project(Project("p", "", datetime(2024, 1, 1), datetime(2024, 2, 1)))
+        due = datetime(2024, 1, 5)
+        ids = self.db.add_tasks_many(
+            Task(f"t{i}", "", 1 + i % 3, due, pid, None) for i in range(1200)
+        )
+        changed = self.db.update_tasks_where(
+            {"project_id": pid, "priority": 1}, status="in_progress"
+        )
+        assert changed == 400
+        done = self.db.update_tasks_where({"id": ids[:700]}, return_ids=True, status="completed")
+        assert done == ids[:700]  # 700 id — две пачки в одной транзакции
+        assert self.db.count_tasks({"status": "completed"}) == 700
+        assert self.db.count_tasks({"status": "in_progress"}) == 400 - 234  # 234 из них закрыли
+        assert self.db.verify_task_counters() == []
+        with pytest.raises(ValueError):
+            self.db.update_tasks_where({}, status="completed")
+        with pytest.raises(ValueError):
+            self.db.update_tasks_where({"project_id": pid}, id=1)
@@ -1,3 +1,5 @@
+import tracemalloc
+
 import pytest
 from datetime import datetime, timedelta
 
@@ -6,6 +8,42 @@ from models.project import Project
 from models.user import User
 
 
+def _bytes_per_model(make, n=100_000):
+    # значения полей общие для всех экземпляров: считаем только сами объекты
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = [make() for _ in range(n)]
+        per_item = (tracemalloc.get_traced_memory()[0] - before) / n
+    finally:
+        tracemalloc.stop()
+    assert len(items) == n
+    return per_item
+
+
+@pytest.mark.parametrize("cls, row", [
+    (Task, {"id": 1, "title": "T", "description": "", "priority": 1, "status": "pending",
+            "due_date": datetime(2025, 1, 1), "project_id": None, "assignee_id": None}),
+    (Project, {"id": 1, "name": "P", "description": "", "status": "active",
+               "start_date": datetime(2025, 1, 1), "end_date": datetime(2025, 2, 1)}),
+    (User, {"id": 1, "username": "u", "email": "u@x.io", "role": "developer",
+            "registration_date": datetime(2025, 1, 1)}),
+])
+def test_models_are_slotted(cls, row, record_property):
+    # поля в слотах, у экземпляров нет __dict__
+    assert "__slots__" in vars(cls)
+    obj = cls.from_row(row)
+    assert not hasattr(obj, "__dict__")
+    with pytest.raises(AttributeError):
+        obj.extra = 1
+    assert obj == 1 and int(obj) == 1
+    # 100k экземпляров: Task ~120 байт, Project ~96, User ~88 (CPython 3.11, 64 бит),
+    # те же поля в __dict__ — ~160. Граница с запасом на отладочные сборки и другие версии.
+    per_model = _bytes_per_model(lambda: cls.from_row(row))
+    record_property(f"{cls.__name__}_bytes_per_model", round(per_model))
+    assert per_model < 200
+
+
 class TestTaskModel:
     def test_create_and_to_dict(self):
         due = datetime.now() + timedelta(days=1)
@@ -27,6 +65,23 @@ class TestTaskModel:
         with pytest.raises(ValueError):
             t.update_status("bad")
 
+    def test_from_row(self):
+        row = {"id": 7, "title": "T", "description": "D", "priority": 2, "status": "completed",
+               "due_date": "2025-01-02T03:04:05", "project_id": 1, "assignee_id": None}
+        t = Task.from_row(row)
+        assert t.id == 7 and t.status == "completed"
+        assert t.due_date == datetime(2025, 1, 2, 3, 4, 5)
+        assert t.to_dict() == row
+
+    def test_partial_row_defers_missing_columns(self):
+        t = Task.from_row({"id": 7, "title": "T", "due_date": "2025-01-02T03:04:05"})
+        assert t.title == "T" and t.due_date == datetime(2025, 1, 2, 3, 4, 5)
+        # без загрузчика незаполненное поле — обычный AttributeError
+        with pytest.raises(AttributeError):
+            t.description
+        t.load_deferred({"id": 7, "description": "D", "priority": 2})
+        assert t.description == "D" and t.priority == 2
+
     def test_is_overdue(self):
         due = datetime.now() - timedelta(hours=1)
         t = Task("T", "D", 1, due, None, None)
@@ -50,6 +105,13 @@ class TestProjectModel:
         with pytest.raises(ValueError):
             p.update_status("bad")
 
+    def test_from_row(self):
+        row = {"id": 3, "name": "P", "description": "", "status": "on_hold",
+               "start_date": datetime(2025, 1, 1), "end_date": "2025-02-01T00:00:00"}
+        p = Project.from_row(row)
+        assert p.id == 3 and p.status == "on_hold"
+        assert p.end_date == datetime(2025, 2, 1)
+
     def test_dates_validation(self):
         start = datetime(2024, 1, 10)
         end = datetime(2024, 1, 5)
@@ -73,6 +135,13 @@ class TestUserModel:
         with pytest.raises(ValueError):
             User("n", "a@b.com", "badrole")
 
+    def test_from_row_skips_validation(self):
+        # строки из БД уже проверены при записи; конструктор бы их отверг
+        u = User.from_row({"id": 5, "username": "n", "email": "legacy-mail", "role": "developer",
+                           "registration_date": "2025-01-01T00:00:00"})
+        assert u.id == 5 and u.email == "legacy-mail"
+        assert u.registration_date == datetime(2025, 1, 1)
+
     def test_update_info(self):
         u = User("name", "a@b.com", "developer")
         u.update_info(username="nn", email="x@y.z", role="manager")
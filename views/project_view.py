@@ -62,9 +62,11 @@ class ProjectView:
         return datetime.fromisoformat(s.strip())
 
     def _reload(self, items):
+        # держим показанные проекты, чтобы refresh_table не собирал их заново
+        self._shown = list(items)
         for i in self.tree.get_children():
             self.tree.delete(i)
-        for p in items:
+        for p in self._shown:
             self.tree.insert("", tk.END, values=(
                 p.id, p.name, p.status,
                 p.start_date.date().isoformat(),
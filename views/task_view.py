@@ -2,6 +2,9 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+# колонки таблицы; списки читают только их, description догрузится при обращении
+_TABLE_COLUMNS = ("id", "title", "priority", "status", "due_date", "project_id", "assignee_id")
+
 
 class TaskView:
     def __init__(self, parent, task_controller, project_controller, user_controller):
@@ -78,9 +81,8 @@ class TaskView:
     def _build_table(self):
         tbl = ttk.Frame(self.frame)
         tbl.pack(fill=tk.BOTH, expand=True, padx=10, pady=6)
-        cols = ("id", "title", "priority", "status", "due_date", "project_id", "assignee_id")
-        self.tree = ttk.Treeview(tbl, columns=cols, show="headings")
-        for c in cols:
+        self.tree = ttk.Treeview(tbl, columns=_TABLE_COLUMNS, show="headings")
+        for c in _TABLE_COLUMNS:
             self.tree.heading(c, text=c)
             self.tree.column(c, stretch=True, width=120)
         self.tree.pack(fill=tk.BOTH, expand=True)
@@ -102,31 +104,32 @@ class TaskView:
             return datetime.strptime(s, "%Y-%m-%d %H:%M")
 
     def _reload(self, items):
+        # задачи таблицы живы, пока показаны: повторная загрузка обновит их на месте
+        self._shown = list(items)
         for i in self.tree.get_children():
             self.tree.delete(i)
-        for t in items:
+        for t in self._shown:
             self.tree.insert("", tk.END, values=(
                 t.id, t.title, t.priority, t.status, t.due_date.isoformat(sep=" ", timespec="minutes"),
                 t.project_id, t.assignee_id
             ))
 
     def refresh_table(self):
-        self._reload(self.ctrl.get_all_tasks())
+        self._reload(self.ctrl.get_all_tasks(columns=_TABLE_COLUMNS))
 
     # ---- Actions ----
     def _on_add(self):
         try:
-            t = self.ctrl.add_task(
+            # статус, если выбран не "pending", уходит в тот же INSERT
+            self.ctrl.add_task(
                 self.title_var.get(),
                 self.desc_var.get(),
                 int(self.priority_var.get()),
                 self._parse_due(),
                 int(self.project_var.get()) if self.project_var.get() else None,
                 int(self.user_var.get()) if self.user_var.get() else None,
+                status=self.status_var.get() or None,
             )
-            # можно сразу обновить статус, если выбран не "pending"
-            if self.status_var.get() != "pending":
-                t = self.ctrl.update_task_status(t.id, self.status_var.get())
             self.refresh_table()
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
@@ -162,14 +165,10 @@ class TaskView:
         if not q:
             self.refresh_table()
         else:
-            self._reload(self.ctrl.search_tasks(q))
+            self._reload(self.ctrl.search_tasks(q, rank=True, columns=_TABLE_COLUMNS))
 
     def _apply_filters(self):
-        items = self.ctrl.get_all_tasks()
         s = self.filter_status_var.get()
         p = self.filter_priority_var.get()
-        if s:
-            items = [t for t in items if t.status == s]
-        if p:
-            items = [t for t in items if str(t.priority) == p]
-        self._reload(items)
\ No newline at end of file
+        self._reload(self.ctrl.find_tasks(status=s or None, priority=int(p) if p else None,
+                                          columns=_TABLE_COLUMNS))
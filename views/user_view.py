@@ -57,9 +57,11 @@ class UserView:
         return int(self.tree.item(sel[0])["values"][0])
 
     def _reload(self, users):
+        # ссылки на показанных пользователей
+        self._shown = list(users)
         for i in self.tree.get_children():
             self.tree.delete(i)
-        for u in users:
+        for u in self._shown:
             self.tree.insert("", tk.END, values=(u.id, u.username, u.email, u.role))
 
     def refresh_table(self):